@@ -0,0 +1,130 @@
+"""
+Admission control untuk pekerjaan CPU berat (decode + GLCM + inferensi).
+
+Thread request (gunicorn gthread / dev server threaded) hanya menerima
+upload lalu menyerahkan pekerjaan ke thread pool berukuran tetap (decode PIL
+dan operasi NumPy melepas GIL; /predict/batch tetap memakai process pool
+sendiri di dalam slotnya). Jumlah pekerjaan
+yang boleh menunggu dibatasi: kalau antrian penuh, request langsung ditolak
+(HTTP 429 + Retry-After) daripada menumpuk dan membuat semua request lambat.
+
+Setiap pekerjaan punya deadline. Pekerjaan yang belum mulai saat deadline
+lewat dibatalkan (client biasanya sudah timeout / pergi), sehingga worker
+tidak membuang waktu untuk hasil yang tidak akan dibaca.
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+def _timed_call(fn, *args):
+    """Dijalankan di pool: hasil fn + durasi prosesnya (tanpa waktu antri)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class Overloaded(Exception):
+    """Antrian penuh; retry_after = perkiraan detik sampai ada slot"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Pekerjaan tidak selesai sebelum deadline request"""
+
+
+class AdmissionController:
+    def __init__(self, max_workers=4, max_queue=16, deadline=30.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.deadline = deadline
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._in_flight = 0
+        # Rata-rata waktu proses (EWMA) untuk menghitung Retry-After
+        self._service_time = 0.1
+
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.completed = 0
+
+    def _get_executor(self):
+        # Pool dibuat ulang di proses hasil fork (thread pool tidak ikut ter-fork)
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='predict')
+            self._pid = os.getpid()
+            self._in_flight = 0
+        return self._executor
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    def retry_after(self):
+        """Perkiraan detik sampai antrian sekarang habis diproses"""
+        waves = math.ceil(self._in_flight / max(1, self.max_workers))
+        return max(1, math.ceil(waves * self._service_time))
+
+    def run(self, fn, *args, timeout=None):
+        """
+        Jalankan fn(*args) di pool dan tunggu hasilnya.
+        timeout: batas detik dari client (dipotong ke deadline server).
+        Raise Overloaded kalau antrian penuh, DeadlineExceeded kalau terlambat.
+        """
+        deadline = self.deadline if timeout is None else min(timeout, self.deadline)
+
+        with self._lock:
+            executor = self._get_executor()
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise Overloaded(self.retry_after())
+            self._in_flight += 1
+            self.admitted += 1
+            # Bawa context request supaya stage() tetap masuk Server-Timing
+            future = executor.submit(contextvars.copy_context().run, _timed_call, fn, *args)
+        # Slot baru dilepas saat pekerjaan benar-benar selesai / batal
+        future.add_done_callback(self._release)
+
+        try:
+            result, _ = future.result(timeout=deadline)
+        except (FutureTimeoutError, CancelledError):
+            # Batalkan kalau belum mulai; yang sudah jalan dibiarkan selesai
+            future.cancel()
+            with self._lock:
+                self.expired += 1
+            raise DeadlineExceeded(f"Request exceeded its {deadline:.1f} s deadline")
+        return result
+
+    def _release(self, future):
+        seconds = None
+        if not future.cancelled() and future.exception() is None:
+            seconds = future.result()[1]
+        with self._lock:
+            self._in_flight -= 1
+            if seconds is not None:
+                self.completed += 1
+                self._service_time = 0.8 * self._service_time + 0.2 * seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "completed": self.completed,
+                "service_time": self._service_time,
+            }
@@ -1,81 +1,121 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, request, jsonify, Response, url_for, g
 import numpy as np
 from PIL import Image
-from skimage.feature import graycomatrix, graycoprops
-from skimage.color import rgb2gray
-from skimage.io import imread
-import cv2
 import io
 import base64
 import sqlite3
 from datetime import datetime
 import uuid
 import os
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+import threading
+import multiprocessing
+import html
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from log_writer import PredictionLogWriter
+from prediction_cache import PredictionCache, content_key
+from processed_store import ProcessedImageStore
+from ingest import ImageTooLarge, decode_grayscale, image_features
+from model_reload import ModelReloader
+from log_partitions import init_partitions, insert_rows, is_legacy, maintain, partition_stats
+from log_query import (EXPORT_FIELDS, EXPORT_FORMATS, QueryError,
+                       fetch_logs, iter_export, parse_log_query)
+from stats_rollup import BUCKETS as ROLLUP_BUCKETS, init_rollups, read_time_series, read_totals
+from probability_store import encode_probabilities, ensure_json_probabilities
+import metrics
+from metrics import stage
+from admission import AdmissionController, DeadlineExceeded, Overloaded
+from micro_batch import MicroBatcher
 
 app = Flask(__name__)
 
+# Lokasi database log prediksi
+DB_PATH = os.environ.get('PREDICTION_DB', 'prediction_logs.db')
+
+# Log dipartisi per bulan. Retention: simpan N bulan terakhir (0 = selamanya);
+# partisi lebih tua dari LOG_ARCHIVE_AFTER_MONTHS dipindah ke LOG_ARCHIVE_DIR (gzip).
+LOG_RETENTION_MONTHS = int(os.environ.get('LOG_RETENTION_MONTHS', 0))
+LOG_ARCHIVE_AFTER_MONTHS = int(os.environ.get('LOG_ARCHIVE_AFTER_MONTHS', 0))
+LOG_ARCHIVE_DIR = os.environ.get('LOG_ARCHIVE_DIR', 'log_archive')
+
+# Durasi tiap tahap startup (detik), dilaporkan oleh startup_bench.py
+startup_timings = {}
+
 # ====================================
 # 1. INISIALISASI DATABASE
 # ====================================
 def init_database():
-    conn = sqlite3.connect('prediction_logs.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS predictions (
-            id TEXT PRIMARY KEY,
-            timestamp TEXT,
-            prediction_class TEXT,
-            prediction_label TEXT,
-            confidence REAL,
-            contrast REAL,
-            correlation REAL,
-            energy REAL,
-            homogeneity REAL,
-            image_name TEXT,
-            all_probabilities TEXT
-        )
-    ''')
+    if is_legacy(conn):
+        # Database lama (satu tabel predictions): tambahkan kolom versi model
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(predictions)')]
+        if 'model_version' not in columns:
+            cursor.execute('ALTER TABLE predictions ADD COLUMN model_version TEXT')
+        conn.commit()
+    
+    # Partisi bulanan (tabel lama dipindah sekali) + view predictions.
+    # Setiap partisi punya index untuk /logs dan trigger rollup untuk /stats.
+    init_partitions(conn)
     
+    # Konversi all_probabilities format lama (repr Python) ke JSON, sampai tuntas
+    converted, skipped = ensure_json_probabilities(conn)
+    if skipped:
+        app.logger.warning("%d baris all_probabilities lama tidak bisa dibaca, dibiarkan apa adanya",
+                           skipped)
+    
+    # Rollup statistik untuk /stats, diperbarui trigger setiap insert
+    init_rollups(cursor)
     conn.commit()
+    
+    maintain_log_storage(conn)
     conn.close()
 
+def maintain_log_storage(conn):
+    """Retention + arsip partisi lama; dipanggil saat startup dan berkala oleh writer log"""
+    result = maintain(conn, LOG_RETENTION_MONTHS, LOG_ARCHIVE_AFTER_MONTHS, LOG_ARCHIVE_DIR)
+    if result["dropped"] or result["archived"] or result["deleted_archives"]:
+        app.logger.info("Perawatan log: dihapus %s, diarsip %s, arsip dihapus %s",
+                        result["dropped"], list(result["archived"]), result["deleted_archives"])
+    return result
+
 # Fungsi untuk save log ke database
 def save_prediction_log(prediction_data, image_name=None):
-    conn = sqlite3.connect('prediction_logs.db')
-    cursor = conn.cursor()
-    
-    log_id = str(uuid.uuid4())
+    return save_prediction_logs([(prediction_data, image_name)])[0]
+
+def save_prediction_logs(entries):
+    """
+    Simpan banyak log prediksi sekaligus lewat writer background.
+    entries: list of (prediction_data, image_name). Return list log_id sesuai urutan.
+    """
     timestamp = datetime.now().isoformat()
+    log_ids = []
+    rows = []
     
-    cursor.execute('''
-        INSERT INTO predictions 
-        (id, timestamp, prediction_class, prediction_label, confidence, 
-         contrast, correlation, energy, homogeneity, image_name, all_probabilities)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        log_id,
-        timestamp,
-        prediction_data['prediction'],
-        prediction_data['prediction_label'],
-        prediction_data['confidence'],
-        prediction_data['glcm_features']['contrast'],
-        prediction_data['glcm_features']['correlation'],
-        prediction_data['glcm_features']['energy'],
-        prediction_data['glcm_features']['homogeneity'],
-        image_name,
-        str(prediction_data['probabilities'])
-    ))
+    for prediction_data, image_name in entries:
+        log_id = str(uuid.uuid4())
+        log_ids.append(log_id)
+        rows.append((
+            log_id,
+            timestamp,
+            str(prediction_data['prediction']),
+            str(prediction_data['prediction_label']),
+            prediction_data['confidence'],
+            prediction_data['glcm_features']['contrast'],
+            prediction_data['glcm_features']['correlation'],
+            prediction_data['glcm_features']['energy'],
+            prediction_data['glcm_features']['homogeneity'],
+            image_name,
+            encode_probabilities(prediction_data['probabilities']),
+            prediction_data.get('model_version')
+        ))
     
-    conn.commit()
-    conn.close()
+    # Masuk antrian; ditulis dalam batch ke partisi bulannya oleh thread writer (tanpa fsync di request)
+    log_writer.submit(rows)
     
-    return log_id
+    return log_ids
 
 # ====================================
 # 2. INISIALISASI
@@ -83,83 +123,453 @@ def save_prediction_log(prediction_data, image_name=None):
 # Init database dulu
 init_database()
 
-# Load model
-model = joblib.load("models/naive_bayes_glcm.pkl")
+# Gambar grayscale disimpan sementara di disk dan dirender saat diminta
+PROCESSED_MAX_DIM = int(os.environ.get('PROCESSED_MAX_DIM', 1024))
+processed_store = ProcessedImageStore(
+    os.environ.get('PROCESSED_DIR', 'processed_cache'),
+    max_bytes=int(os.environ.get('PROCESSED_MAX_BYTES', 512 * 1024 * 1024))
+)
+
+# Writer log di background (flush tiap LOG_FLUSH_INTERVAL detik / LOG_FLUSH_SIZE baris)
+# Thread writer juga menjalankan perawatan partisi tiap LOG_MAINTENANCE_INTERVAL detik
+log_writer = PredictionLogWriter(
+    DB_PATH,
+    insert_rows,
+    max_queue=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+    flush_interval=float(os.environ.get('LOG_FLUSH_INTERVAL', 0.5)),
+    flush_size=int(os.environ.get('LOG_FLUSH_SIZE', 200)),
+    maintenance=maintain_log_storage,
+    maintenance_interval=float(os.environ.get('LOG_MAINTENANCE_INTERVAL', 3600))
+).start()
+
+# Load model (sekali di proses master kalau pakai gunicorn preload_app,
+# sehingga semua worker berbagi model secara copy-on-write)
+MODEL_PATH = "models/naive_bayes_glcm.pkl"
+# Scorer NumPy memakai file .npz di sebelah MODEL_PATH, dibuat dengan: python export_model.py
+USE_FAST_MODEL = os.environ.get('USE_FAST_MODEL', '1') == '1'
+
+# Model bisa diganti tanpa restart: watcher cek file tiap MODEL_WATCH_INTERVAL detik
+# (0 = nonaktif) atau POST /admin/reload-model. Model baru divalidasi dulu.
+model_reloader = ModelReloader(
+    MODEL_PATH,
+    use_fast=USE_FAST_MODEL,
+    watch_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 5)),
+    max_accuracy_drop=float(os.environ.get('MODEL_MAX_ACCURACY_DROP', 0.05)),
+    on_swap=lambda loaded: prediction_cache.clear(),
+    logger=app.logger
+)
+MODEL_RELOAD_TOKEN = os.environ.get('MODEL_RELOAD_TOKEN')
+
+_start = time.perf_counter()
+model_reloader.load_initial()
+startup_timings['model_load'] = time.perf_counter() - _start
+
+def current_model():
+    """Model aktif (LoadedModel); ambil sekali per request supaya model & versi konsisten"""
+    return model_reloader.current
+
+# Cache hasil prediksi per isi gambar (key memuat versi model, dikosongkan saat model diganti)
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 256)),
+    max_bytes=int(os.environ.get('PREDICTION_CACHE_BYTES', 64 * 1024 * 1024)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+    model_path=MODEL_PATH
+)
 
 # ====================================
 # 3. FUNGSI EKSTRAKSI GLCM
 # ====================================
-def extract_glcm_features(image_array):
+# Fast ingest: decode JPEG langsung ke resolusi kecil (PIL draft). 0 = nonaktif.
+# Pilih batas yang aman dengan: python ingest_drift.py <folder_sampel>
+FAST_INGEST_MAX_DIM = int(os.environ.get('FAST_INGEST_MAX_DIM', 0))
+FAST_INGEST_MODE = os.environ.get('FAST_INGEST_MODE', 'L')
+# Batas piksel per gambar (dicek dari header sebelum decode). 0 = tanpa batas.
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))
+# Thread per gambar untuk GLCM gambar besar (mode tile). 1 = satu lintasan.
+# Bandingkan dengan: python glcm.py --bench
+GLCM_WORKERS = int(os.environ.get('GLCM_WORKERS', 1))
+
+def feature_options():
+    """Argumen ingest.image_features sesuai konfigurasi (fast ingest, batas piksel, GLCM)"""
+    return FAST_INGEST_MAX_DIM, FAST_INGEST_MODE, MAX_IMAGE_PIXELS, GLCM_WORKERS
+
+def extract_features_from_bytes(image_bytes):
     """
-    Ekstrak fitur GLCM dari array gambar (sama seperti di Colab)
+    Decode gambar dari bytes lalu ekstrak fitur GLCM.
+    Memakai jalur fast ingest kalau FAST_INGEST_MAX_DIM > 0.
     """
-    # Konversi ke grayscale
-    if len(image_array.shape) == 3:
-        img_gray = rgb2gray(image_array)
-    else:
-        img_gray = image_array
-    
-    # Konversi ke uint8 (0-255)
-    img_gray = (img_gray * 255).astype('uint8')
-    
-    # Hitung GLCM (sama seperti di Colab Anda)
-    glcm = graycomatrix(img_gray, 
-                        distances=[1],
-                        angles=[0, np.pi/4, np.pi/2, 3*np.pi/4],
-                        symmetric=True, 
-                        normed=True)
-    
-    # Ekstrak properti GLCM
-    contrast = graycoprops(glcm, 'contrast').mean()
-    correlation = graycoprops(glcm, 'correlation').mean()
-    energy = graycoprops(glcm, 'energy').mean()
-    homogeneity = graycoprops(glcm, 'homogeneity').mean()
-    
-    return [contrast, correlation, energy, homogeneity], img_gray
+    return image_features(image_bytes, *feature_options())
+
+# Cache grafik (key: format + probabilitas yang dibulatkan). Satu PNG base64 bisa >100 KB,
+# jadi selain jumlah entri, cache juga dibatasi total ukuran (byte).
+CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 128))
+CHART_CACHE_BYTES = int(os.environ.get('CHART_CACHE_BYTES', 16 * 1024 * 1024))
+CHART_FORMATS = ('png', 'svg')
 
-def create_probability_chart(probabilities, class_labels):
+# Grafik hanya bergantung pada probabilitas, jadi tidak perlu TTL / invalidasi model
+chart_cache = PredictionCache(
+    max_entries=CHART_CACHE_SIZE,
+    max_bytes=CHART_CACHE_BYTES,
+    ttl=float('inf')
+)
+
+def create_probability_chart(probabilities, class_labels, chart_format='png'):
     """
-    Buat grafik probabilitas seperti di gambar yang Anda tunjukkan
+    Buat grafik probabilitas seperti di gambar yang Anda tunjukkan.
+    Hasil di-memoize per vektor probabilitas (dibulatkan 3 desimal, sama seperti label).
     """
-    plt.figure(figsize=(10, 6))
+    probs = tuple(round(p['probability'], 3) for p in probabilities)
+    classes = tuple(str(p['class']) for p in probabilities)
     
-    # Extract probabilities
-    probs = [p['probability'] for p in probabilities]
-    classes = [p['class'] for p in probabilities]
+    key = (chart_format, classes, probs)
+    chart = chart_cache.get(key)
+    if chart is None:
+        render = _render_chart_svg if chart_format == 'svg' else _render_chart_png
+        chart = render(classes, probs)
+        chart_cache.put(key, chart, size=len(chart))
+    return chart
+
+def _render_chart_png(classes, probs):
+    """Render PNG dengan Figure API (tanpa state global pyplot, aman untuk multi-thread)"""
+    # Import matplotlib baru saat grafik pertama diminta (mempercepat cold start)
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
     
     # Create the plot
-    plt.plot(classes, probs, 'b-', linewidth=3, marker='o', markersize=10, 
-             markerfacecolor='red', markeredgecolor='red', markeredgewidth=2)
+    ax.plot(classes, probs, 'b-', linewidth=3, marker='o', markersize=10, 
+            markerfacecolor='red', markeredgecolor='red', markeredgewidth=2)
     
     # Styling
-    plt.title('Probabilitas Klasifikasi (GaussianNB + GLCM)', fontsize=16, fontweight='bold')
-    plt.xlabel('Kelas', fontsize=12)
-    plt.ylabel('Probabilitas', fontsize=12)
-    plt.grid(True, alpha=0.3)
-    plt.ylim(-0.2, 1.0)
+    ax.set_title('Probabilitas Klasifikasi (GaussianNB + GLCM)', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Kelas', fontsize=12)
+    ax.set_ylabel('Probabilitas', fontsize=12)
+    ax.grid(True, alpha=0.3)
+    ax.set_ylim(-0.2, 1.0)
     
     # Rotate x-axis labels if needed
-    plt.xticks(rotation=45, ha='right')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
     
     # Add value labels on points
-    for i, (cls, prob) in enumerate(zip(classes, probs)):
-        plt.annotate(f'{prob:.3f}', (i, prob), textcoords="offset points", 
+    for i, prob in enumerate(probs):
+        ax.annotate(f'{prob:.3f}', (i, prob), textcoords="offset points", 
                     xytext=(0,10), ha='center', fontsize=10, fontweight='bold')
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Save to base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    buffer.seek(0)
-    chart_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close()
+    fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+def _render_chart_svg(classes, probs):
+    """Versi ringan: SVG garis sederhana yang dibangun langsung sebagai teks"""
+    width, height = 600, 360
+    left, right, top, bottom = 60, 20, 40, 90
+    plot_w = width - left - right
+    plot_h = height - top - bottom
+    y_min, y_max = -0.2, 1.0
+    
+    def x_pos(i):
+        return left + (plot_w * (i + 0.5) / len(classes) if classes else 0)
+    
+    def y_pos(p):
+        return top + plot_h * (y_max - p) / (y_max - y_min)
+    
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="sans-serif">',
+        f'<text x="{width / 2}" y="24" text-anchor="middle" font-size="16" font-weight="bold">'
+        'Probabilitas Klasifikasi (GaussianNB + GLCM)</text>',
+    ]
+    
+    # Grid horizontal + label sumbu y
+    for tick in (0.0, 0.2, 0.4, 0.6, 0.8, 1.0):
+        y = y_pos(tick)
+        parts.append(f'<line x1="{left}" y1="{y:.1f}" x2="{width - right}" y2="{y:.1f}" '
+                     'stroke="#ccc" stroke-width="1"/>')
+        parts.append(f'<text x="{left - 8}" y="{y + 4:.1f}" text-anchor="end" font-size="11">'
+                     f'{tick:.1f}</text>')
+    
+    points = ' '.join(f'{x_pos(i):.1f},{y_pos(p):.1f}' for i, p in enumerate(probs))
+    parts.append(f'<polyline points="{points}" fill="none" stroke="blue" stroke-width="3"/>')
+    
+    for i, (cls, prob) in enumerate(zip(classes, probs)):
+        x, y = x_pos(i), y_pos(prob)
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="5" fill="red"/>')
+        parts.append(f'<text x="{x:.1f}" y="{y - 10:.1f}" text-anchor="middle" font-size="11" '
+                     f'font-weight="bold">{prob:.3f}</text>')
+        parts.append(f'<text x="{x:.1f}" y="{top + plot_h + 20}" text-anchor="end" font-size="12" '
+                     f'transform="rotate(-45 {x:.1f} {top + plot_h + 20})">{html.escape(cls)}</text>')
+    
+    parts.append('</svg>')
+    svg = ''.join(parts)
+    return base64.b64encode(svg.encode('utf-8')).decode('utf-8')
+
+def classify_image(image_bytes, loaded=None):
+    """
+    Jalankan pipeline untuk satu gambar: decode, GLCM dan prediksi.
+    Hasilnya di-cache oleh /predict. Grafik probabilitas dan gambar
+    grayscale dibuat terpisah (memoized / lazy lewat URL).
+    loaded: LoadedModel yang dipakai (default: model aktif).
+    """
+    # Decode + ekstrak fitur GLCM dari gambar
+    return classify_features(extract_features_from_bytes(image_bytes), loaded)
+
+def classify_features(glcm_features, loaded=None):
+    """
+    Prediksi dari fitur GLCM yang sudah diekstrak.
+    /predict memanggil ini di thread request, di luar admission control: hanya
+    ekstraksi fitur yang dibatasi PREDICT_WORKERS, sehingga semua request yang
+    sedang menunggu inferensi bisa bergabung dalam satu micro-batch.
+    """
+    loaded = loaded or current_model()
+    
+    # Prediksi (satu kali predict_proba; kelas = probabilitas tertinggi, sama dengan predict).
+    # Dengan micro-batching, baris ini digabung dengan request lain yang datang bersamaan.
+    with stage('inference'):
+        probabilities = micro_batcher.predict_proba(loaded, glcm_features)
+    
+    # Bentuk hasil sama dengan item /predict/batch
+    prediction_data = build_prediction_data(glcm_features, probabilities, loaded)
+    prediction_data["status"] = "success"
+    prediction_data["message"] = "Klasifikasi berhasil!"
+    return prediction_data
+
+def cached_size(prediction_data):
+    """Perkiraan ukuran entri cache dalam bytes"""
+    return sum(len(value) for value in prediction_data.values() if isinstance(value, str)) + 1024
+
+# Field opsional yang bisa dipilih lewat ?include=chart,processed_image
+OPTIONAL_FIELDS = ('chart', 'processed_image')
+
+def parse_include(include_arg):
+    """Parse parameter include; tanpa parameter -> semua field opsional (perilaku lama)"""
+    if include_arg is None:
+        return set(OPTIONAL_FIELDS)
+    include = {name.strip() for name in include_arg.split(',') if name.strip()}
+    unknown = include - set(OPTIONAL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown include field(s): {', '.join(sorted(unknown))}")
+    return include
+
+# Pekerjaan CPU (decode + GLCM + model) jalan di pool berukuran tetap.
+# Kalau PREDICT_MAX_QUEUE pekerjaan sudah menunggu, request ditolak 429 + Retry-After;
+# pekerjaan yang belum mulai sebelum deadline dibatalkan (504).
+admission = AdmissionController(
+    max_workers=int(os.environ.get('PREDICT_WORKERS', os.cpu_count() or 1)),
+    max_queue=int(os.environ.get('PREDICT_MAX_QUEUE', 16)),
+    deadline=float(os.environ.get('PREDICT_DEADLINE', 30))
+)
+
+# Micro-batching inferensi (opt-in): MICRO_BATCH_MAX_SIZE > 1 untuk mengaktifkan
+micro_batcher = MicroBatcher(
+    max_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 0)),
+    max_wait=float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2)) / 1000
+)
+
+def request_timeout():
+    """Timeout dari client (header X-Request-Timeout, detik); None kalau tidak ada"""
+    value = request.headers.get('X-Request-Timeout')
+    if not value:
+        return None
+    timeout = float(value)
+    if timeout <= 0:
+        raise ValueError("X-Request-Timeout must be positive")
+    return timeout
+
+def overload_response(e):
+    """Response untuk Overloaded (429) / DeadlineExceeded (504)"""
+    metrics.record_error(e)
+    if isinstance(e, Overloaded):
+        response = jsonify({"error": str(e), "retry_after": e.retry_after, "status": "error"})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return jsonify({"error": str(e), "status": "error"}), 504
+
+# ====================================
+# 4. BATCH PREDICTION
+# ====================================
+# Batas jumlah gambar per request dan jumlah worker process untuk GLCM
+# (gunicorn.conf.py membagi core antar worker gunicorn)
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 64))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+
+def batch_mp_context():
+    """
+    Worker process dibuat lewat forkserver (spawn kalau tidak tersedia), bukan
+    fork dari proses gunicorn yang multithread (lock yang sedang dipegang thread
+    lain ikut ter-copy dan bisa deadlock). Server hanya me-preload ingest, jadi
+    di bawah gunicorn worker tidak menjalankan app.py. Catatan: dengan
+    `python app.py` (dev), setiap worker menjalankan ulang top-level app.py
+    sekali sebagai __mp_main__ (perilaku standar spawn).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['ingest'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    """Process pool untuk ekstraksi fitur, dibuat saat pertama dipakai"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS,
+                                              mp_context=batch_mp_context())
+        return _batch_pool
+
+def reset_batch_pool(pool):
+    """Buang pool yang rusak (worker mati); request berikutnya membuat pool baru"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _batch_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_features_batch(images):
+    """
+    Ekstrak fitur GLCM untuk banyak gambar (list of bytes) secara paralel.
+    Return list berisi fitur atau Exception per gambar, urutan sama dengan input.
+    """
+    if BATCH_WORKERS <= 1 or len(images) <= 1:
+        results = []
+        for image_bytes in images:
+            try:
+                results.append(extract_features_from_bytes(image_bytes))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    pool = get_batch_pool()
+    try:
+        options = feature_options()
+        futures = [pool.submit(image_features, image_bytes, *options)
+                   for image_bytes in images]
+    except BrokenProcessPool:
+        reset_batch_pool(pool)
+        raise
+    
+    results = []
+    broken = False
+    for future in futures:
+        try:
+            results.append(future.result())
+        except BrokenProcessPool as e:
+            broken = True
+            results.append(e)
+        except Exception as e:
+            results.append(e)
+    if broken:
+        app.logger.warning("Process pool /predict/batch rusak, dibuat ulang")
+        reset_batch_pool(pool)
+    return results
+
+def build_prediction_data(glcm_features, probabilities, loaded):
+    """Susun hasil klasifikasi satu gambar dari fitur GLCM dan probabilitas model"""
+    class_labels = loaded.model.classes_
+    max_class_idx = int(np.argmax(probabilities))
+    
+    return {
+        "prediction": class_labels[max_class_idx],
+        "prediction_label": class_labels[max_class_idx],
+        "confidence": float(probabilities[max_class_idx]),
+        "probabilities": [
+            {"class": class_name, "probability": float(probabilities[i])}
+            for i, class_name in enumerate(class_labels)
+        ],
+        "glcm_features": {
+            "contrast": float(glcm_features[0]),
+            "correlation": float(glcm_features[1]),
+            "energy": float(glcm_features[2]),
+            "homogeneity": float(glcm_features[3])
+        },
+        "model_version": loaded.version
+    }
+
+def warmup():
+    """
+    Jalankan satu prediksi sintetis (decode, GLCM, model, grafik) tanpa log
+    dan tanpa cache, supaya request pertama tidak menanggung lazy import.
+    """
+    start = time.perf_counter()
+    
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    
+    result = classify_image(buffer.getvalue())
+    create_probability_chart(result["probabilities"], current_model().model.classes_)
     
-    return chart_base64
+    startup_timings['warmup'] = time.perf_counter() - start
+    return result
 
 # ====================================
-# 4. ROUTES/ENDPOINTS
+# 5. ROUTES/ENDPOINTS
 # ====================================
+# Instrumentasi: Server-Timing per request + metrik Prometheus di /metrics
+@app.before_request
+def start_request_metrics():
+    g.request_metrics = metrics.begin_request(request.endpoint)
+    # Watcher model dijalankan per proses (setelah fork worker gunicorn)
+    model_reloader.ensure_watching()
+
+@app.after_request
+def add_server_timing(response):
+    state = g.get('request_metrics')
+    if state is not None:
+        response.headers['Server-Timing'] = metrics.observe_response(
+            state, request.method, response.status_code)
+        if state.get("memory_estimate"):
+            # Perkiraan puncak buffer gambar (decode + grayscale) dalam byte, dihitung
+            # dari ukuran array, bukan diukur
+            response.headers['X-Peak-Memory-Estimate'] = str(state["memory_estimate"])
+    return response
+
+@app.teardown_request
+def end_request_metrics(exc):
+    state = g.get('request_metrics')
+    if state is not None:
+        metrics.end_request(state, exc)
+
+def _component_metrics():
+    """Cache, writer log, dan penyimpanan gambar dalam format metrik"""
+    cache = prediction_cache.stats()
+    charts = chart_cache.stats()
+    writer = log_writer.stats()
+    store = processed_store.stats()
+    queue = admission.stats()
+    return [
+        ("prediction_cache_hits_total", "counter", "Cache hit prediksi", cache["hits"]),
+        ("prediction_cache_misses_total", "counter", "Cache miss prediksi", cache["misses"]),
+        ("prediction_cache_hit_ratio", "gauge", "Rasio cache hit prediksi", cache["hit_rate"]),
+        ("prediction_cache_entries", "gauge", "Jumlah entri cache prediksi", cache["entries"]),
+        ("prediction_cache_evictions_total", "counter", "Entri cache yang dibuang", cache["evictions"]),
+        ("chart_cache_hits_total", "counter", "Cache hit grafik", charts["hits"]),
+        ("chart_cache_misses_total", "counter", "Cache miss grafik", charts["misses"]),
+        ("chart_cache_bytes", "gauge", "Ukuran grafik di cache (byte)", charts["bytes"]),
+        ("log_writer_backlog", "gauge", "Baris log yang belum ditulis", writer["backlog"]),
+        ("log_writer_written_total", "counter", "Baris log yang sudah ditulis", writer["written"]),
+        ("log_writer_dropped_total", "counter", "Baris log yang dibuang (antrian penuh)", writer["dropped"]),
+        ("log_writer_failed_total", "counter", "Baris log yang gagal ditulis", writer["failed"]),
+        ("processed_store_bytes", "gauge", "Ukuran folder gambar grayscale", store["bytes"]),
+        ("predict_queue_in_flight", "gauge", "Pekerjaan prediksi yang menunggu / berjalan", queue["in_flight"]),
+        ("predict_rejected_total", "counter", "Request ditolak 429 (antrian penuh)", queue["rejected"]),
+        ("predict_deadline_exceeded_total", "counter", "Request melewati deadline", queue["expired"]),
+        ("model_reloads_total", "counter", "Model yang berhasil diganti", model_reloader.reloads),
+        ("model_reload_rejected_total", "counter", "Model baru yang gagal validasi", model_reloader.rejected),
+    ]
+
+metrics.register_collector(_component_metrics)
+
 
 @app.route("/")
 def home():
@@ -172,34 +582,51 @@ def admin():
     <h2>🔧 Admin Panel - Klasifikasi Hama Sawi</h2>
     <p><a href="/logs" target="_blank">📊 View Logs</a></p>
     <p><a href="/stats" target="_blank">📈 View Stats</a></p>
+    <p><a href="/logs/export?format=csv">💾 Export Logs (CSV)</a></p>
     <p><a href="/test" target="_blank">🧪 Test Model</a></p>
+    <form method="post" action="/admin/reload-model"><button>🔄 Reload Model</button></form>
     '''
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    # Satu model untuk seluruh request, meskipun model diganti di tengah jalan
+    loaded = current_model()
     try:
         # Cek apakah ada file gambar yang diupload
         if 'image' in request.files:
             # Cara 1: Upload file langsung
             file = request.files['image']
-            image = Image.open(file.stream)
-            image_array = np.array(image)
+            image_bytes = file.read()
+            
+        elif request.mimetype == 'application/octet-stream' or request.mimetype.startswith('image/'):
+            # Cara 2: Body mentah berisi bytes gambar (tanpa multipart / base64).
+            # cache=False: bytes dibaca langsung dari stream tanpa disimpan lagi di request
+            image_bytes = request.get_data(cache=False)
+            if not image_bytes:
+                return jsonify({
+                    "error": "Empty request body",
+                    "status": "error"
+                }), 400
             
         elif request.content_type == 'application/json':
             data = request.get_json(force=True)
+            if not isinstance(data, dict):
+                return jsonify({
+                    "error": "JSON body must be an object",
+                    "status": "error"
+                }), 400
             
             if 'image_base64' in data:
-                # Cara 2: Gambar dalam format base64
-                image_data = base64.b64decode(data['image_base64'])
-                image = Image.open(io.BytesIO(image_data))
-                image_array = np.array(image)
+                # Cara 3: Gambar dalam format base64
+                image_bytes = base64.b64decode(data['image_base64'])
                 
             elif 'features' in data:
-                # Cara 3: Fitur manual (backward compatibility)
+                # Cara 4: Fitur manual (backward compatibility)
                 features = np.array(data["features"]).reshape(1, -1)
-                prediction = model.predict(features)
+                prediction = loaded.model.predict(features)
                 return jsonify({
                     "prediction": prediction.tolist(),
+                    "model_version": loaded.version,
                     "status": "success"
                 })
             else:
@@ -213,112 +640,275 @@ def predict():
                 "status": "error"
             }), 400
         
-        # Ekstrak fitur GLCM dari gambar DAN dapatkan gambar grayscale
-        glcm_features, img_gray = extract_glcm_features(image_array)
-        features = np.array(glcm_features).reshape(1, -1)
-        
-        # Konversi gambar grayscale ke base64
-        gray_pil = Image.fromarray(img_gray)
-        gray_buffer = io.BytesIO()
-        gray_pil.save(gray_buffer, format='JPEG')
-        gray_base64 = base64.b64encode(gray_buffer.getvalue()).decode('utf-8')
-        
-        # Prediksi
-        prediction = model.predict(features)[0]
-        probabilities = model.predict_proba(features)[0]
-        
-        # Mapping label (sesuaikan dengan dataset Anda)
-        class_labels = model.classes_  # ["sehat", "hama_keong", "hama_kutu", "hama_ulat"]
-        
-        # Cari kelas dengan probabilitas tertinggi
-        max_class_idx = np.argmax(probabilities)
-        max_class = class_labels[max_class_idx]
-        max_proba = np.max(probabilities)
-        
-        # Buat data untuk grafik probabilitas
-        probability_data = []
-        for i, class_name in enumerate(class_labels):
-            probability_data.append({
-                "class": class_name,
-                "probability": float(probabilities[i])
-            })
-        
-        # Buat grafik probabilitas
-        chart_base64 = create_probability_chart(probability_data, class_labels)
-        
-        # Siapkan data response
-        response_data = {
-            "prediction": prediction,
-            "prediction_label": max_class,
-            "confidence": float(max_proba),
-            "probabilities": probability_data,
-            "glcm_features": {
-                "contrast": float(glcm_features[0]),
-                "correlation": float(glcm_features[1]), 
-                "energy": float(glcm_features[2]),
-                "homogeneity": float(glcm_features[3])
-            },
-            "processed_image": gray_base64,  # TAMBAHAN: Gambar grayscale
-            "probability_chart": chart_base64,  # TAMBAHAN: Grafik probabilitas
-            "status": "success",
-            "message": "Klasifikasi berhasil!"
-        }
+        # Field opsional yang diminta client (?include=chart,processed_image)
+        try:
+            include = parse_include(request.args.get('include'))
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": "error"}), 400
+        
+        chart_format = request.args.get('chart_format', 'png')
+        if chart_format not in CHART_FORMATS:
+            return jsonify({
+                "error": f"chart_format must be one of {', '.join(CHART_FORMATS)}",
+                "status": "error"
+            }), 400
+        
+        try:
+            timeout = request_timeout()
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": "error"}), 400
+        
+        # Cek cache berdasarkan hash bytes gambar (sebelum decode)
+        digest = content_key(image_bytes)
+        cache_key = f"{loaded.version}:{digest}"
+        cached = prediction_cache.get(cache_key)
+        cache_hit = cached is not None
+        
+        if not cache_hit:
+            # Decode + GLCM lewat admission control: 429 kalau antrian penuh, 504 kalau
+            # lewat deadline. Inferensi (murah) di thread request supaya bisa di-micro-batch.
+            features = admission.run(extract_features_from_bytes, image_bytes, timeout=timeout)
+            cached = classify_features(features, loaded)
+            prediction_cache.put(cache_key, cached, size=cached_size(cached))
+        
+        # Copy supaya log_id/timestamp tidak ikut tersimpan di cache
+        response_data = dict(cached)
+        response_data["cache_hit"] = cache_hit
+        
+        if 'chart' in include:
+            # Grafik probabilitas (memoized, tidak lewat pyplot)
+            with stage('chart'):
+                response_data["probability_chart"] = create_probability_chart(
+                    response_data["probabilities"], loaded.model.classes_, chart_format)
+            response_data["probability_chart_format"] = chart_format
         
         # Save log ke database
         image_name = f"prediction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        log_id = save_prediction_log(response_data, image_name)
+        with stage('db_write'):
+            log_id = save_prediction_log(response_data, image_name)
         
         # Tambahkan log_id ke response
         response_data["log_id"] = log_id
+        
+        if 'processed_image' in include:
+            # Gambar grayscale dibuat lazy saat URL ini dibuka. Sumber disimpan per
+            # hash isi: upload identik (termasuk cache hit) tidak ditulis ulang ke disk,
+            # log_id hanya mendapat alias kecil ke hash itu.
+            with stage('store_source'):
+                processed_store.put_source(digest, image_bytes)
+                processed_store.put_alias(log_id, digest)
+            response_data["processed_image_url"] = url_for('get_processed_image', log_id=log_id)
         response_data["timestamp"] = datetime.now().isoformat()
         
-        return jsonify(response_data)
+        with stage('encode'):
+            return jsonify(response_data)
         
+    except (Overloaded, DeadlineExceeded) as e:
+        return overload_response(e)
+    except ImageTooLarge as e:
+        metrics.record_error(e)
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 413
     except Exception as e:
+        metrics.record_error(e)
         return jsonify({
             "error": str(e),
             "status": "error"
         }), 500
 
-@app.route("/logs", methods=["GET"])
-def get_logs():
-    """Endpoint untuk melihat semua log prediksi"""
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Prediksi banyak gambar sekaligus.
+    Input: multipart dengan field 'images' (boleh berulang) atau
+    JSON {"images_base64": [...]}. Error per gambar tidak menggagalkan batch.
+    """
     try:
-        conn = sqlite3.connect('prediction_logs.db')
-        cursor = conn.cursor()
+        images = []
+        names = []
         
-        cursor.execute('''
-            SELECT id, timestamp, prediction_class, prediction_label, 
-                   confidence, contrast, correlation, energy, homogeneity, image_name
-            FROM predictions 
-            ORDER BY timestamp DESC 
-            LIMIT 50
-        ''')
+        if request.files:
+            # Cara 1: Upload banyak file
+            for file in request.files.getlist('images') + request.files.getlist('image'):
+                images.append(file.read())
+                names.append(file.filename)
+                
+        elif request.content_type == 'application/json':
+            # Cara 2: List gambar base64
+            data = request.get_json(force=True)
+            if not isinstance(data, dict):
+                return jsonify({
+                    "error": "JSON body must be an object",
+                    "status": "error"
+                }), 400
+            encoded_images = data.get('images_base64')
+            if not isinstance(encoded_images, list):
+                return jsonify({
+                    "error": "images_base64 must be a list",
+                    "status": "error"
+                }), 400
+            
+            for encoded in encoded_images:
+                try:
+                    images.append(base64.b64decode(encoded))
+                except Exception:
+                    # Biarkan gagal di tahap decode gambar supaya error per item
+                    images.append(b'')
+                names.append(None)
+        else:
+            return jsonify({
+                "error": "Unsupported content type",
+                "status": "error"
+            }), 400
         
-        logs = cursor.fetchall()
-        conn.close()
+        if not images:
+            return jsonify({
+                "error": "No images found",
+                "status": "error"
+            }), 400
         
-        # Format hasil
-        formatted_logs = []
-        for log in logs:
-            formatted_logs.append({
-                "id": log[0],
-                "timestamp": log[1],
-                "prediction_class": log[2],
-                "prediction_label": log[3],
-                "confidence": log[4],
-                "glcm_features": {
-                    "contrast": log[5],
-                    "correlation": log[6],
-                    "energy": log[7],
-                    "homogeneity": log[8]
-                },
-                "image_name": log[9]
-            })
+        if len(images) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Too many images (max {MAX_BATCH_SIZE})",
+                "status": "error"
+            }), 400
+        
+        try:
+            timeout = request_timeout()
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": "error"}), 400
+        
+        # Ekstrak fitur GLCM secara paralel (satu slot admission untuk seluruh batch)
+        loaded = current_model()
+        extracted = admission.run(extract_features_batch, images, timeout=timeout)
+        ok_indices = [i for i, result in enumerate(extracted)
+                      if not isinstance(result, Exception)]
+        
+        # Satu kali predict_proba untuk semua gambar yang berhasil
+        results = [None] * len(images)
+        if ok_indices:
+            features = np.array([extracted[i] for i in ok_indices])
+            probabilities = loaded.model.predict_proba(features)
+            
+            prediction_batch = []
+            for row, i in enumerate(ok_indices):
+                prediction_data = build_prediction_data(extracted[i], probabilities[row], loaded)
+                image_name = names[i] or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}.jpg"
+                prediction_batch.append((prediction_data, image_name))
+                results[i] = prediction_data
+            
+            # Semua log dalam satu transaksi
+            with stage('db_write'):
+                log_ids = save_prediction_logs(prediction_batch)
+            for i, log_id in zip(ok_indices, log_ids):
+                results[i]["log_id"] = log_id
+                results[i]["status"] = "success"
+        
+        for i, result in enumerate(extracted):
+            if isinstance(result, Exception):
+                results[i] = {"error": str(result), "status": "error"}
+        
+        for i, result in enumerate(results):
+            result["index"] = i
+        
+        return jsonify({
+            "results": results,
+            "total_images": len(images),
+            "total_success": len(ok_indices),
+            "timestamp": datetime.now().isoformat(),
+            "status": "success"
+        })
+        
+    except (Overloaded, DeadlineExceeded) as e:
+        return overload_response(e)
+    except Exception as e:
+        metrics.record_error(e)
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 500
+
+@app.route("/processed/<digest>", methods=["GET"])
+def get_processed_content(digest):
+    """
+    Gambar grayscale hasil preprocessing untuk satu upload (JPEG), key = hash isi.
+    Dibuat saat pertama diminta, ukuran sisi terpanjang dibatasi ?max_dim=.
+    """
+    if not processed_store.valid_digest(digest):
+        return jsonify({"error": "Invalid digest", "status": "error"}), 400
+    return processed_image_response(digest)
+
+@app.route("/predictions/<log_id>/processed", methods=["GET"])
+def get_processed_image(log_id):
+    """
+    Gambar grayscale untuk satu prediksi. log_id di-resolve ke hash isi
+    sumbernya; sumber lama yang disimpan per log_id tetap dilayani.
+    """
+    if not processed_store.valid_log_id(log_id):
+        return jsonify({"error": "Invalid log_id", "status": "error"}), 400
+    return processed_image_response(processed_store.resolve(log_id))
+
+def processed_image_response(key):
+    """Render (atau ambil dari disk) JPEG grayscale untuk sumber dengan key ini"""
+    try:
+        max_dim = int(request.args.get('max_dim', PROCESSED_MAX_DIM))
+    except ValueError:
+        return jsonify({"error": "max_dim must be an integer", "status": "error"}), 400
+    max_dim = max(1, min(max_dim, PROCESSED_MAX_DIM))
+    
+    # Isi gambar untuk key + ukuran tertentu tidak pernah berubah
+    etag = f'"{key}-{max_dim}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        jpeg_bytes = processed_store.read_rendered(key, max_dim)
+        
+        if jpeg_bytes is None:
+            image_bytes = processed_store.read_source(key)
+            if image_bytes is None:
+                return jsonify({"error": "Processed image not found", "status": "error"}), 404
+            
+            # Preview cukup di-decode kecil (draft JPEG), hasil grayscale tetap rgb2gray
+            img_gray = decode_grayscale(image_bytes, max_dim, 'RGB', MAX_IMAGE_PIXELS)
+            with stage('encode'):
+                gray_pil = Image.fromarray(img_gray)
+                gray_pil.thumbnail((max_dim, max_dim))
+                
+                gray_buffer = io.BytesIO()
+                gray_pil.save(gray_buffer, format='JPEG')
+                jpeg_bytes = gray_buffer.getvalue()
+            processed_store.put_rendered(key, max_dim, jpeg_bytes)
+        
+        response = Response(jpeg_bytes, mimetype='image/jpeg')
+    
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response
+
+@app.route("/logs", methods=["GET"])
+def get_logs():
+    """
+    Endpoint untuk melihat log prediksi (terbaru dulu).
+    Query: limit, cursor (dari next_cursor), label, min_confidence, max_confidence,
+    since, until (ISO 8601), min_probability (mis. min_probability=hama_kutu:0.4),
+    fields (mis. fields=timestamp,prediction_label)
+    """
+    try:
+        query = parse_log_query(request.args)
+    except QueryError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        formatted_logs, next_cursor = fetch_logs(conn, query)
+        conn.close()
         
         return jsonify({
             "logs": formatted_logs,
             "total_predictions": len(formatted_logs),
+            "next_cursor": next_cursor,
             "status": "success"
         })
         
@@ -328,42 +918,84 @@ def get_logs():
             "status": "error"
         }), 500
 
+@app.route("/logs/export", methods=["GET"])
+def export_logs():
+    """
+    Export log prediksi secara streaming (memori konstan).
+    Query: format=ndjson|csv, filter sama seperti /logs, fields (boleh all_probabilities),
+    cursor untuk melanjutkan export, limit opsional (default semua baris).
+    """
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise QueryError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        query = parse_log_query(request.args, default_limit=None, max_limit=None,
+                                allowed_fields=EXPORT_FIELDS)
+    except QueryError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    
+    def generate():
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            yield from iter_export(conn, query, fmt)
+        finally:
+            conn.close()
+    
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=prediction_logs.{fmt}'
+    })
+
 @app.route("/stats", methods=["GET"])
 def get_stats():
-    """Endpoint untuk statistik prediksi"""
+    """
+    Endpoint untuk statistik prediksi (dibaca dari tabel rollup).
+    Tambahkan ?bucket=hour|day dan/atau ?since=/&until= untuk time series per kelas.
+    """
     try:
-        conn = sqlite3.connect('prediction_logs.db')
+        since = request.args.get('since')
+        until = request.args.get('until')
+        bucket = request.args.get('bucket')
+        # Normalisasi ke format ISO yang sama dengan kolom timestamp
+        since = datetime.fromisoformat(since).isoformat() if since else None
+        until = datetime.fromisoformat(until).isoformat() if until else None
+        if bucket and bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(ROLLUP_BUCKETS)}")
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    
+    try:
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        # Hitung jumlah per kelas
-        cursor.execute('''
-            SELECT prediction_label, COUNT(*) as count
-            FROM predictions 
-            GROUP BY prediction_label
-            ORDER BY count DESC
-        ''')
-        
-        class_counts = cursor.fetchall()
-        
-        # Hitung total
-        cursor.execute('SELECT COUNT(*) FROM predictions')
-        total = cursor.fetchone()[0]
+        # Total, rata-rata confidence, dan jumlah per kelas
+        total, avg_confidence, class_counts = read_totals(cursor)
         
-        # Rata-rata confidence
-        cursor.execute('SELECT AVG(confidence) FROM predictions')
-        avg_confidence = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return jsonify({
+        stats = {
             "total_predictions": total,
             "average_confidence": float(avg_confidence) if avg_confidence else 0,
             "class_distribution": [
                 {"class": row[0], "count": row[1], "percentage": (row[1]/total)*100 if total > 0 else 0}
                 for row in class_counts
             ],
+            "log_writer": log_writer.stats(),
+            "prediction_cache": prediction_cache.stats(),
+            "processed_store": processed_store.stats(),
+            "model": model_reloader.stats(),
+            "admission": admission.stats(),
+            "micro_batch": micro_batcher.stats(),
+            "log_storage": partition_stats(conn, LOG_ARCHIVE_DIR),
             "status": "success"
-        })
+        }
+        
+        if bucket or since or until:
+            # Time series per jam / per hari
+            stats["bucket"] = bucket or 'day'
+            stats["time_series"] = read_time_series(cursor, stats["bucket"], since, until)
+        
+        conn.close()
+        
+        return jsonify(stats)
         
     except Exception as e:
         return jsonify({
@@ -371,14 +1003,44 @@ def get_stats():
             "status": "error"
         }), 500
 
+@app.route("/admin/reload-model", methods=["POST"])
+def reload_model():
+    """
+    Load + validasi file model terbaru lalu ganti model aktif tanpa restart.
+    ?force=1 untuk reload meskipun file tidak berubah. Kalau MODEL_RELOAD_TOKEN
+    di-set, request harus membawa header X-Admin-Token yang sama.
+    """
+    if MODEL_RELOAD_TOKEN and request.headers.get('X-Admin-Token') != MODEL_RELOAD_TOKEN:
+        return jsonify({"error": "Invalid admin token", "status": "error"}), 403
+    
+    try:
+        result = model_reloader.reload(force=request.args.get('force') == '1')
+    except Exception as e:
+        metrics.record_error(e)
+        return jsonify({"error": str(e), "status": "error"}), 500
+    
+    if result["status"] == "rejected":
+        return jsonify(dict(result, model_status=result["status"],
+                            error="Model validation failed", status="error")), 422
+    return jsonify(dict(result, model_status=result["status"], status="success"))
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Metrik kumulatif (histogram latency, in-flight, cache, error) format Prometheus"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route("/test", methods=["GET"])
 def test():
     """Endpoint untuk test apakah model loaded dengan benar"""
     try:
         # Info tentang model
+        loaded = current_model()
         return jsonify({
-            "model_classes": model.classes_.tolist(),
-            "model_type": str(type(model)),
+            "model_classes": loaded.model.classes_.tolist(),
+            "model_type": str(type(loaded.model)),
+            "model_version": loaded.version,
+            "model_sha256": loaded.sha256,
+            "model_loaded_at": loaded.loaded_at,
             "status": "Model loaded successfully"
         })
     except Exception as e:
@@ -388,4 +1050,5 @@ def test():
         }), 500
 
 if __name__ == "__main__":
+    warmup()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
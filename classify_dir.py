@@ -0,0 +1,332 @@
+"""
+Klasifikasi offline satu folder gambar (beserta subfolder) memakai semua core.
+
+Fitur GLCM dihitung paralel di process pool dengan jalur yang sama seperti
+/predict (decode_grayscale + glcm.glcm_features); model dijalankan di proses
+utama sekali per chunk. Hasil ditulis bertahap ke CSV atau Parquet, dan
+progress disimpan di file checkpoint, sehingga run yang terputus (Ctrl+C,
+crash) bisa dilanjutkan dari chunk terakhir yang sudah tertulis.
+
+Contoh:
+    python classify_dir.py foto_lapangan/ -o hasil.csv
+    python classify_dir.py foto_lapangan/ -o hasil.csv          # lanjutkan run yang terputus
+    python classify_dir.py foto_lapangan/ -o hasil_parquet --format parquet --workers 8
+    python classify_dir.py foto_lapangan/ -o hasil.csv --restart  # mulai dari awal
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import glcm
+from ingest import FAST_INGEST_MODES, decode_grayscale
+from nb_scorer import load_model
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+OUTPUT_FORMATS = ('csv', 'parquet')
+FEATURE_NAMES = ('contrast', 'correlation', 'energy', 'homogeneity')
+
+PROGRESS_INTERVAL = 5.0
+
+
+def find_images(root):
+    """Semua file gambar di bawah root (path relatif, urut supaya deterministik)"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    return paths
+
+
+def extract_features_from_path(path, max_dim=0, mode='L'):
+    """Dijalankan di worker: baca file, decode, lalu fitur GLCM"""
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+    img_gray = decode_grayscale(image_bytes, max_dim, mode)
+    return glcm.glcm_features(img_gray)
+
+
+def output_columns(classes):
+    return (['path', 'prediction_label', 'confidence']
+            + [f'prob_{c}' for c in classes]
+            + list(FEATURE_NAMES) + ['error'])
+
+
+def build_rows(model, results):
+    """results: list (path, fitur atau pesan error) -> list dict baris output"""
+    ok = [(path, features) for path, features in results if not isinstance(features, str)]
+    rows = []
+    if ok:
+        probabilities = model.predict_proba(np.array([features for _, features in ok]))
+        for (path, features), proba in zip(ok, probabilities):
+            best = int(np.argmax(proba))
+            row = {"path": path, "prediction_label": str(model.classes_[best]),
+                   "confidence": float(proba[best]), "error": None}
+            row.update({f'prob_{c}': float(p) for c, p in zip(model.classes_, proba)})
+            row.update(zip(FEATURE_NAMES, (float(v) for v in features)))
+            rows.append(row)
+
+    for path, error in results:
+        if isinstance(error, str):
+            rows.append({"path": path, "error": error})
+    return rows
+
+
+# ====================================
+# Output + checkpoint
+# ====================================
+class CsvOutput:
+    """
+    Append ke satu file CSV. Checkpoint menyimpan offset byte yang sudah
+    lengkap; saat resume file dipotong ke offset itu (baris setengah jadi dibuang).
+    """
+
+    def __init__(self, path, columns, checkpoint):
+        self.path = path
+        self.columns = columns
+        offset = checkpoint.get("offset", 0)
+
+        if offset and os.path.exists(path):
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        self._file = open(path, 'a' if offset else 'w', newline='')
+        self._writer = csv.DictWriter(self._file, columns)
+        if not offset:
+            self._writer.writeheader()
+
+    def done_paths(self):
+        with open(self.path, newline='') as f:
+            return {row["path"] for row in csv.DictReader(f)}
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"offset": self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """
+    Satu file part-NNNNN.parquet per chunk di dalam folder output.
+    Checkpoint menyimpan jumlah part yang lengkap; part sisanya dihapus saat resume.
+    """
+
+    def __init__(self, path, columns, checkpoint):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ Format parquet butuh pyarrow: pip install pyarrow")
+
+        self.path = path
+        self.columns = columns
+        self.parts = checkpoint.get("parts", 0)
+        os.makedirs(path, exist_ok=True)
+
+        for part in glob.glob(os.path.join(path, 'part-*.parquet')):
+            if int(os.path.basename(part)[5:10]) >= self.parts:
+                os.remove(part)
+
+    def _part_path(self, index):
+        return os.path.join(self.path, f'part-{index:05d}.parquet')
+
+    def done_paths(self):
+        import pyarrow.parquet as pq
+        paths = set()
+        for index in range(self.parts):
+            paths.update(pq.read_table(self._part_path(index), columns=['path'])
+                         .column('path').to_pylist())
+        return paths
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Skema tetap supaya semua part bisa dibaca sebagai satu dataset
+        schema = pa.schema([(c, pa.string() if c in ('path', 'prediction_label', 'error')
+                             else pa.float64()) for c in self.columns])
+        table = pa.Table.from_pylist([{c: row.get(c) for c in self.columns} for row in rows],
+                                     schema=schema)
+        tmp_path = self._part_path(self.parts) + '.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self._part_path(self.parts))
+        self.parts += 1
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def checkpoint_path(output):
+    return output.rstrip(os.sep) + '.checkpoint.json'
+
+
+def read_checkpoint(output, root, fmt):
+    path = checkpoint_path(output)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("root") != os.path.abspath(root) or checkpoint.get("format") != fmt:
+        raise SystemExit(f"❌ {path} berasal dari run lain; pakai --restart untuk mulai ulang")
+    return checkpoint
+
+
+def write_checkpoint(output, checkpoint):
+    path = checkpoint_path(output)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# ====================================
+# Run
+# ====================================
+def classify_directory(root, output, fmt='csv', workers=None, chunk_size=256,
+                       max_dim=0, mode='L', model_path='models/naive_bayes_glcm.pkl',
+                       restart=False):
+    model, warning = load_model(model_path)
+    if warning:
+        print(f"⚠️  {warning}", file=sys.stderr)
+    columns = output_columns([str(c) for c in model.classes_])
+
+    if restart and os.path.exists(checkpoint_path(output)):
+        os.remove(checkpoint_path(output))
+    checkpoint = read_checkpoint(output, root, fmt)
+    checkpoint.update(root=os.path.abspath(root), format=fmt)
+
+    out = (CsvOutput if fmt == 'csv' else ParquetOutput)(output, columns, checkpoint)
+    done = out.done_paths() if checkpoint.get("rows") else set()
+
+    all_paths = find_images(root)
+    pending = [path for path in all_paths if path not in done]
+    print(f"📂 {len(all_paths)} gambar, {len(done)} sudah selesai, {len(pending)} diproses "
+          f"dengan {workers or os.cpu_count()} worker", file=sys.stderr)
+
+    start = time.perf_counter()
+    processed = 0
+    errors = 0
+    last_report = start
+    buffer = []
+
+    def flush_buffer():
+        nonlocal processed, errors
+        if not buffer:
+            return
+        rows = build_rows(model, buffer)
+        checkpoint.update(out.write(rows))
+        checkpoint["rows"] = checkpoint.get("rows", 0) + len(rows)
+        write_checkpoint(output, checkpoint)
+        processed += len(buffer)
+        errors += sum(1 for _, result in buffer if isinstance(result, str))
+        buffer.clear()
+
+    interrupted = False
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Jumlah task yang menunggu dibatasi supaya memori tetap kecil
+        max_in_flight = (workers or os.cpu_count()) * 4
+        queue = iter(pending)
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < max_in_flight:
+                    path = next(queue, None)
+                    if path is None:
+                        break
+                    future = pool.submit(extract_features_from_path,
+                                         os.path.join(root, path), max_dim, mode)
+                    in_flight[future] = path
+                if not in_flight:
+                    break
+
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    path = in_flight.pop(future)
+                    try:
+                        buffer.append((path, future.result()))
+                    except Exception as e:
+                        buffer.append((path, f"{type(e).__name__}: {e}"))
+
+                if len(buffer) >= chunk_size:
+                    flush_buffer()
+
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    rate = (processed + len(buffer)) / (now - start)
+                    print(f"  {processed + len(buffer)}/{len(pending)} gambar, "
+                          f"{rate:.1f} gambar/detik", file=sys.stderr)
+        except KeyboardInterrupt:
+            interrupted = True
+            for future in in_flight:
+                future.cancel()
+        finally:
+            flush_buffer()
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "total_images": len(all_paths),
+        "processed": processed,
+        "errors": errors,
+        "skipped_done": len(done),
+        "seconds": elapsed,
+        "images_per_second": processed / elapsed if elapsed else 0.0,
+        "interrupted": interrupted,
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Klasifikasi offline folder gambar")
+    parser.add_argument('root', help='Folder gambar (subfolder ikut diproses)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='File CSV, atau folder untuk --format parquet')
+    parser.add_argument('--format', default='csv', choices=OUTPUT_FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help='Default: jumlah core')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='Jumlah gambar per tulis + checkpoint')
+    parser.add_argument('--max-dim', type=int,
+                        default=int(os.environ.get('FAST_INGEST_MAX_DIM', 0)),
+                        help='Fast ingest seperti FAST_INGEST_MAX_DIM di app.py (0 = nonaktif)')
+    parser.add_argument('--mode', default=os.environ.get('FAST_INGEST_MODE', 'L'),
+                        choices=FAST_INGEST_MODES)
+    parser.add_argument('--model', default='models/naive_bayes_glcm.pkl')
+    parser.add_argument('--restart', action='store_true', help='Abaikan checkpoint lama')
+    parser.add_argument('--json', help='Simpan ringkasan ke file JSON')
+    args = parser.parse_args()
+
+    summary = classify_directory(args.root, args.output, args.format, args.workers,
+                                 args.chunk_size, args.max_dim, args.mode, args.model,
+                                 args.restart)
+
+    status = "⚠️  Dihentikan" if summary["interrupted"] else "✅ Selesai"
+    print(f"{status}: {summary['processed']} gambar ({summary['errors']} error) dalam "
+          f"{summary['seconds']:.1f} s, {summary['images_per_second']:.1f} gambar/detik",
+          file=sys.stderr)
+    if summary["interrupted"]:
+        print("   Jalankan perintah yang sama untuk melanjutkan.", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if summary["interrupted"]:
+        raise SystemExit(130)
+
+
+if __name__ == "__main__":
+    main()
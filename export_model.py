@@ -0,0 +1,81 @@
+"""
+Ekspor models/naive_bayes_glcm.pkl ke file parameter .npz untuk scorer
+tanpa sklearn (nb_scorer.py), lalu cek kesamaan hasilnya dengan sklearn.
+File hanya ditulis kalau cek kesamaan lolos.
+
+Contoh:
+    python export_model.py
+    python export_model.py --model models/naive_bayes_glcm.pkl --output models/naive_bayes_glcm.npz
+"""
+import argparse
+import os
+
+import joblib
+import numpy as np
+
+from nb_scorer import GaussianNBScorer, file_sha256
+
+PROBA_ATOL = 1e-12
+
+
+def parity_inputs(estimator, n_per_class=500, seed=0):
+    """Data uji: sampel di sekitar tiap kelas, titik jauh, dan satu baris"""
+    rng = np.random.default_rng(seed)
+    samples = [rng.normal(theta, np.sqrt(var) * 3, size=(n_per_class, len(theta)))
+               for theta, var in zip(estimator.theta_, estimator.var_)]
+    samples.append(estimator.theta_ * 10)
+    samples.append(-estimator.theta_)
+    samples.append(np.zeros((1, estimator.theta_.shape[1])))
+    return np.vstack(samples)
+
+
+def check_parity(estimator, scorer, X):
+    """Return list pesan error (kosong kalau sama)"""
+    errors = []
+
+    if not np.array_equal(scorer.classes_, estimator.classes_):
+        errors.append("classes_ berbeda")
+
+    expected = estimator.predict(X)
+    actual = scorer.predict(X)
+    mismatches = int(np.sum(expected != actual))
+    if mismatches:
+        errors.append(f"predict berbeda di {mismatches} dari {len(X)} baris")
+
+    proba_diff = np.max(np.abs(estimator.predict_proba(X) - scorer.predict_proba(X)))
+    if proba_diff > PROBA_ATOL:
+        errors.append(f"predict_proba selisih maksimum {proba_diff:.3e}")
+
+    # Satu baris (jalur /predict) harus sama dengan hasil batch
+    single = scorer.predict_proba(X[:1])
+    if not np.array_equal(single[0], scorer.predict_proba(X)[0]):
+        errors.append("hasil satu baris berbeda dengan batch")
+
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor GaussianNB ke scorer NumPy")
+    parser.add_argument('--model', default='models/naive_bayes_glcm.pkl')
+    parser.add_argument('--output', default=None,
+                        help='Default: nama model dengan ekstensi .npz')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + '.npz'
+
+    estimator = joblib.load(args.model)
+    scorer = GaussianNBScorer.from_estimator(estimator, file_sha256(args.model))
+
+    X = parity_inputs(estimator)
+    errors = check_parity(estimator, scorer, X)
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        raise SystemExit("Ekspor dibatalkan: hasil scorer tidak sama dengan sklearn")
+
+    scorer.save(output)
+    print(f"✅ Parity OK pada {len(X)} baris, disimpan ke {output}")
+
+
+if __name__ == "__main__":
+    main()
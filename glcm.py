@@ -0,0 +1,268 @@
+"""
+Engine GLCM bawaan untuk ekstraksi fitur tekstur.
+
+Menghasilkan fitur yang sama dengan graycomatrix + graycoprops dari skimage
+(distance 1, sudut 0/45/90/135 derajat, symmetric, normed), tetapi keempat
+histogram co-occurrence dibangun dalam satu lintasan atas gambar uint8 dan
+semua properti dihitung dari bobot indeks yang sudah disiapkan sekali.
+
+Untuk gambar besar, co-occurrence bisa dihitung paralel (workers > 1):
+gambar dipecah menjadi tile baris, setiap tile membaca satu baris ekstra di
+bawahnya sebagai tetangga sehingga setiap pasangan piksel di batas tile
+dihitung tepat sekali. Hitungan parsial (integer) dijumlahkan lalu
+dinormalisasi sekali, jadi hasilnya identik bit-per-bit dengan satu lintasan.
+np.bincount dan operasi bit NumPy melepas GIL, jadi cukup memakai thread.
+
+Cek kesamaan dengan skimage:  python glcm.py
+Benchmark mode tile:          python glcm.py --bench
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+LEVELS = 256
+
+# Sudut sama seperti di Colab
+ANGLES = [0, np.pi/4, np.pi/2, 3*np.pi/4]
+
+# Offset (baris, kolom) tetangga untuk tiap sudut dengan distance=1,
+# mengikuti konvensi skimage: (round(sin(a)), round(cos(a)))
+OFFSETS = ((0, 1), (1, 1), (1, 0), (1, -1))
+
+# Jumlah piksel per pita baris saat menghitung co-occurrence,
+# supaya memori sementara tetap kecil untuk gambar besar
+BAND_PIXELS = 1 << 18
+
+# Gambar lebih kecil dari ini tetap dihitung satu thread (overhead pool > hemat)
+PARALLEL_MIN_PIXELS = 1 << 20
+
+# Toleransi relatif terhadap skimage (beda urutan penjumlahan float64 saja)
+PARITY_RTOL = 1e-10
+
+# Bobot indeks yang dipakai bersama oleh semua properti
+_LEVEL_INDEX = np.arange(LEVELS, dtype=np.float64)
+_DIFF = np.subtract.outer(_LEVEL_INDEX, _LEVEL_INDEX)
+_PAIR_WEIGHTS = np.stack([
+    _DIFF ** 2,                 # contrast
+    1.0 / (1.0 + _DIFF ** 2),   # homogeneity
+]).reshape(2, -1)
+
+
+def _count_band(img_gray, start, stop, counts):
+    """
+    Tambahkan co-occurrence untuk piksel sumber di baris [start, stop) ke counts.
+    Pita membaca satu baris ekstra di bawahnya sebagai tetangga.
+    """
+    rows, cols = img_gray.shape
+    band = img_gray[start:min(stop + 1, rows)]
+    high = band[:stop - start].astype(np.uint16) << 8
+
+    for a, (dr, dc) in enumerate(OFFSETS):
+        n_rows = min(stop, rows - dr) - start
+        c0, c1 = max(0, -dc), cols - max(0, dc)
+        if n_rows <= 0 or c1 <= c0:
+            continue
+
+        # Kode pasangan (i, j) -> i * 256 + j, muat dalam uint16
+        codes = high[:n_rows, c0:c1] | band[dr:dr + n_rows, c0 + dc:c1 + dc]
+        counts[a] += np.bincount(codes.ravel(), minlength=LEVELS * LEVELS)
+
+
+def _count_tile(img_gray, start, stop):
+    """Co-occurrence untuk piksel sumber di baris [start, stop), per pita kecil"""
+    cols = img_gray.shape[1]
+    counts = np.zeros((len(OFFSETS), LEVELS * LEVELS), dtype=np.int64)
+    band_rows = max(1, BAND_PIXELS // max(1, cols))
+    for band_start in range(start, stop, band_rows):
+        _count_band(img_gray, band_start, min(stop, band_start + band_rows), counts)
+    return counts
+
+
+_pool = None
+_pool_workers = 0
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _submit_tiles(workers, img_gray, bounds):
+    """
+    Submit satu tugas per tile ke thread pool bersama. Pool dibuat ulang kalau
+    butuh lebih banyak thread (pool lama di-shutdown setelah pekerjaannya habis)
+    atau setelah fork. Submit dilakukan di bawah lock supaya pool tidak diganti
+    thread lain di tengah jalan.
+    """
+    global _pool, _pool_workers, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_workers < workers:
+            # Thread pool milik proses induk tidak ikut ter-fork, tidak perlu ditutup
+            old_pool = _pool if _pool_pid == os.getpid() else None
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='glcm')
+            _pool_workers = workers
+            _pool_pid = os.getpid()
+            if old_pool is not None:
+                old_pool.shutdown(wait=False)
+        return [_pool.submit(_count_tile, img_gray, start, stop)
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def glcm_counts(img_gray, workers=1):
+    """
+    Hitung co-occurrence mentah (belum simetris) untuk keempat sudut.
+    workers > 1: gambar besar dipecah menjadi tile baris yang dihitung paralel.
+    Return array int64 berbentuk (4, 256, 256).
+    """
+    img_gray = np.ascontiguousarray(img_gray)
+    if img_gray.dtype != np.uint8 or img_gray.ndim != 2:
+        raise ValueError("GLCM butuh gambar grayscale 2D bertipe uint8")
+
+    rows, cols = img_gray.shape
+    tiles = min(workers, rows)
+    if tiles <= 1 or rows * cols < PARALLEL_MIN_PIXELS:
+        counts = _count_tile(img_gray, 0, rows)
+    else:
+        bounds = np.linspace(0, rows, tiles + 1).astype(int)
+        futures = _submit_tiles(tiles, img_gray, bounds)
+        # Penjumlahan integer: urutan tidak mempengaruhi hasil
+        counts = sum(future.result() for future in futures)
+
+    return counts.reshape(len(OFFSETS), LEVELS, LEVELS)
+
+
+def normalize_glcm(counts):
+    """Buat GLCM simetris lalu normalisasi tiap sudut (symmetric=True, normed=True)"""
+    P = (counts + counts.transpose(0, 2, 1)).astype(np.float64)
+    sums = P.sum(axis=(1, 2))
+    sums[sums == 0] = 1
+    P /= sums[:, None, None]
+    return P
+
+
+def glcm_props(P):
+    """
+    Hitung contrast, correlation, energy, homogeneity per sudut dari GLCM ternormalisasi.
+    Return array (4 properti, jumlah sudut).
+    """
+    flat = P.reshape(P.shape[0], -1)
+
+    # Contrast & homogeneity: satu perkalian matriks dengan bobot bersama
+    contrast, homogeneity = _PAIR_WEIGHTS @ flat.T
+
+    energy = np.sqrt(np.einsum('ak,ak->a', flat, flat))
+
+    # Correlation dari distribusi marginal baris/kolom
+    p_i = P.sum(axis=2)
+    p_j = P.sum(axis=1)
+    diff_i = _LEVEL_INDEX - (p_i @ _LEVEL_INDEX)[:, None]
+    diff_j = _LEVEL_INDEX - (p_j @ _LEVEL_INDEX)[:, None]
+    std_i = np.sqrt(np.einsum('ai,ai->a', p_i, diff_i ** 2))
+    std_j = np.sqrt(np.einsum('aj,aj->a', p_j, diff_j ** 2))
+    cov = np.einsum('ai,aij,aj->a', diff_i, P, diff_j)
+
+    # Sama seperti skimage: std mendekati nol -> correlation = 1
+    correlation = np.ones_like(cov)
+    valid = (std_i >= 1e-15) & (std_j >= 1e-15)
+    correlation[valid] = cov[valid] / (std_i[valid] * std_j[valid])
+
+    return np.stack([contrast, correlation, energy, homogeneity])
+
+
+def glcm_features(img_gray, workers=1):
+    """
+    Fitur GLCM [contrast, correlation, energy, homogeneity] dirata-rata
+    atas keempat sudut, urutan sama seperti input model.
+    """
+    P = normalize_glcm(glcm_counts(img_gray, workers))
+    return [float(v) for v in glcm_props(P).mean(axis=1)]
+
+
+def skimage_glcm_features(img_gray):
+    """Implementasi referensi lama (graycomatrix + graycoprops) untuk cek kesamaan"""
+    from skimage.feature import graycomatrix, graycoprops
+
+    glcm = graycomatrix(img_gray,
+                        distances=[1],
+                        angles=ANGLES,
+                        symmetric=True,
+                        normed=True)
+    return [float(graycoprops(glcm, prop).mean())
+            for prop in ('contrast', 'correlation', 'energy', 'homogeneity')]
+
+
+def check_parity(images):
+    """Bandingkan glcm_features dengan skimage. Return selisih relatif terbesar."""
+    worst = 0.0
+    for img in images:
+        ours = np.array(glcm_features(img))
+        ref = np.array(skimage_glcm_features(img))
+        scale = np.maximum(np.abs(ref), np.finfo(np.float64).tiny)
+        worst = max(worst, float(np.max(np.abs(ours - ref) / scale)))
+    return worst
+
+
+def _median_seconds(img, workers, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        glcm_features(img, workers)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def benchmark(megapixels=12.0, workers_list=None, repeat=5):
+    """
+    Waktu glcm_features satu lintasan vs mode tile untuk beberapa jumlah worker.
+    Speedup selalu relatif terhadap workers=1 (diukur terpisah).
+    Return list dict per jumlah worker; raise kalau hasil tidak identik.
+    """
+    cpus = os.cpu_count() or 1
+    if workers_list is None:
+        workers_list = sorted({1, cpus} | {w for w in (2, 4, 8, 16) if w < cpus})
+
+    rows = int(np.sqrt(megapixels * 1e6 * 3 / 4))
+    cols = int(rows * 4 / 3)
+    rng = np.random.default_rng(0)
+    img = (np.cumsum(rng.integers(-3, 4, (rows, cols)), axis=1) % LEVELS).astype(np.uint8)
+
+    reference = glcm_features(img, workers=1)
+    base = _median_seconds(img, 1, repeat)
+    results = []
+    for workers in workers_list:
+        if glcm_features(img, workers) != reference:
+            raise AssertionError(f"workers={workers}: fitur berbeda dari satu lintasan")
+        seconds = base if workers == 1 else _median_seconds(img, workers, repeat)
+        results.append({"workers": workers, "seconds": seconds, "speedup": base / seconds})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cek kesamaan GLCM dengan skimage / benchmark mode tile")
+    parser.add_argument('--bench', action='store_true', help='benchmark mode tile paralel')
+    parser.add_argument('--megapixels', type=float, default=12.0)
+    parser.add_argument('--workers', type=int, nargs='+', help='jumlah worker (default: 1 s.d. jumlah core)')
+    args = parser.parse_args()
+
+    if args.bench:
+        print(f"GLCM {args.megapixels:g} MP, {os.cpu_count()} core")
+        for result in benchmark(args.megapixels, args.workers):
+            print(f"  workers={result['workers']:>2}  {result['seconds'] * 1000:8.1f} ms  "
+                  f"speedup {result['speedup']:.2f}x")
+        print("✅ Fitur mode tile identik dengan satu lintasan")
+        raise SystemExit(0)
+
+    rng = np.random.default_rng(0)
+    samples = [np.full((10, 10), 128, np.uint8)]
+    for shape in [(1, 1), (1, 9), (9, 1), (5, 7), (480, 640), (1200, 1600)]:
+        # Gambar acak dengan tekstur halus seperti daun, bukan noise murni
+        walk = np.cumsum(rng.integers(-3, 4, shape), axis=1)
+        samples.append((walk % LEVELS).astype(np.uint8))
+        samples.append(rng.integers(0, LEVELS, shape, dtype=np.uint8))
+
+    worst = check_parity(samples)
+    print(f"Selisih relatif maksimum vs skimage: {worst:.3e}")
+    if worst > PARITY_RTOL:
+        raise SystemExit(f"❌ Melebihi toleransi {PARITY_RTOL:g}")
+    print("✅ Fitur GLCM sama dengan skimage")
@@ -0,0 +1,27 @@
+# Konfigurasi gunicorn untuk production:
+#   gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+# Thread per worker hanya menerima upload & menunggu; pekerjaan CPU dibatasi
+# oleh admission control di app.py (PREDICT_WORKERS, PREDICT_MAX_QUEUE).
+# Inferensi micro-batch (MICRO_BATCH_MAX_SIZE) berjalan di thread ini, di luar batas itu.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+# Bagi core antar worker supaya total thread CPU tidak melebihi jumlah core
+os.environ.setdefault('PREDICT_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+# Sama untuk process pool /predict/batch (default app.py: semua core per worker)
+os.environ.setdefault('BATCH_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+# Import app.py (termasuk load model) sekali di proses master sebelum fork,
+# jadi semua worker berbagi memori model secara copy-on-write
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Satu prediksi sintetis sebelum worker menerima request
+    from app import warmup
+    warmup()
+    worker.log.info("Worker %s warm", worker.pid)
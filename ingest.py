@@ -0,0 +1,259 @@
+"""
+Decode gambar upload menjadi array grayscale uint8 untuk GLCM.
+
+Jalur normal setara dengan di Colab (rgb2gray, dikali 255, cast ke uint8),
+tetapi dihitung dengan integer fixed-point per pita baris langsung ke buffer
+uint8, tanpa array float64 seukuran gambar. Selisih dengan rgb2gray paling
+banyak 1 level per piksel (pembulatan float), fitur GLCM gambar berwarna
+bergeser tidak lebih dari FEATURE_RTOL (cek: python ingest.py). Untuk piksel
+abu-abu netral (R=G=B) rgb2gray kadang menghasilkan v-1 karena error float
+(31 dari 256 level); fixed-point menghasilkan v tepat.
+
+Mode gambar dinormalisasi secara eksplisit (IMAGE_MODES):
+    L               dipakai langsung
+    RGB/RGBA/RGBX   bobot luminance rgb2gray pada 3 kanal pertama (alpha diabaikan)
+    P/PA            palette -> RGB per pita
+    LA              kanal L (alpha diabaikan)
+    I;16*/I         16 bit -> 8 bit teratas (juga di jalur fast ingest)
+    1               0/255
+    lainnya         convert('RGB') per pita (CMYK, YCbCr, F, ...)
+
+Jalur fast ingest (max_dim > 0) memakai PIL draft untuk JPEG (skala DCT
+1/2, 1/4, 1/8 langsung saat decode) dan reduce untuk format lain, sehingga
+sisi terpanjang tidak lebih dari max_dim. Karena fitur GLCM bergantung pada
+resolusi, cek dulu pergeserannya dengan ingest_drift.py sebelum memilih batas
+untuk production. Mode yang tidak didukung Image.reduce (16 bit, P, 1)
+dinormalisasi dulu dengan cara yang sama seperti jalur normal.
+
+Jumlah piksel dicek dari header sebelum decode (max_pixels), sehingga
+decompression bomb ditolak sebelum memori dialokasikan.
+"""
+import io
+import math
+
+import numpy as np
+from PIL import Image
+
+import glcm
+from metrics import record_memory_estimate, stage
+
+# Mode decode untuk fast ingest:
+#   'L'   -> langsung ke grayscale (luma JPEG, bobot ITU-R 601), paling cepat
+#   'RGB' -> decode RGB kecil lalu rgb2gray seperti jalur normal
+FAST_INGEST_MODES = ('L', 'RGB')
+
+# Mode PIL yang dinormalisasi tanpa convert('RGB') (lihat docstring modul)
+IMAGE_MODES = ('L', 'RGB', 'RGBA', 'RGBX', 'P', 'PA', 'LA', '1',
+               'I;16', 'I;16L', 'I;16B', 'I;16N', 'I')
+
+# Bobot luminance rgb2gray (0.2125, 0.7154, 0.0721) dalam fixed-point 16 bit.
+# Jumlahnya tepat 1 << 16 supaya putih tetap 255.
+GRAY_SHIFT = 16
+GRAY_WEIGHTS = (13926, 46885, 4725)
+
+# Selisih relatif fitur GLCM maksimum terhadap rgb2gray float64 (gambar berwarna)
+FEATURE_RTOL = 1e-3
+
+# Jumlah piksel per pita baris saat konversi (buffer sementara tetap kecil)
+BAND_PIXELS = 1 << 18
+
+# Mode lebih dari 8 bit: diambil 8 bit teratas, bukan di-clip seperti convert('L')
+WIDE_MODES = ('I;16', 'I;16L', 'I;16B', 'I;16N', 'I')
+
+# Byte per piksel gambar yang sudah di-decode di memori PIL
+_PIL_PIXEL_BYTES = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2, 'I;16L': 2, 'I;16B': 2, 'I;16N': 2}
+
+
+class ImageTooLarge(ValueError):
+    """Jumlah piksel melebihi batas (kemungkinan decompression bomb)"""
+
+    def __init__(self, pixels, max_pixels):
+        super().__init__(f"Image has {pixels} pixels, maximum is {max_pixels}")
+        self.pixels = pixels
+        self.max_pixels = max_pixels
+
+    def __reduce__(self):
+        # Harus bisa di-pickle: dikirim balik dari worker process /predict/batch
+        return type(self), (self.pixels, self.max_pixels)
+
+
+def check_pixel_budget(image, max_pixels):
+    """Tolak gambar dengan piksel > max_pixels (0 = tanpa batas); hanya membaca header"""
+    pixels = image.size[0] * image.size[1]
+    if max_pixels and pixels > max_pixels:
+        raise ImageTooLarge(pixels, max_pixels)
+
+
+def _pil_bytes(image):
+    return image.size[0] * image.size[1] * _PIL_PIXEL_BYTES.get(image.mode, 4)
+
+
+def _weighted_gray(rgb, out):
+    """Luminance fixed-point dari array (h, w, >=3) uint8 langsung ke out (h, w) uint8"""
+    acc = np.multiply(rgb[..., 0], GRAY_WEIGHTS[0], dtype=np.uint32)
+    tmp = np.multiply(rgb[..., 1], GRAY_WEIGHTS[1], dtype=np.uint32)
+    acc += tmp
+    np.multiply(rgb[..., 2], GRAY_WEIGHTS[2], out=tmp, dtype=np.uint32)
+    acc += tmp
+    acc >>= GRAY_SHIFT
+    out[...] = acc
+    return acc.nbytes + tmp.nbytes
+
+
+def _array_to_gray(array, out):
+    """Satu pita array hasil np.asarray(image) -> out uint8; return byte buffer sementara"""
+    if array.ndim == 3 and array.shape[2] >= 3:
+        return _weighted_gray(array, out)
+    if array.ndim == 3:
+        # LA: kanal pertama adalah luminance
+        out[...] = array[..., 0]
+    elif array.dtype == np.bool_:
+        np.multiply(array, 255, out=out, dtype=np.uint8)
+    elif array.dtype == np.uint8:
+        out[...] = array
+    elif array.dtype.kind in 'ui':
+        # 16 bit (I;16 atau I dari PNG 16 bit): ambil 8 bit teratas
+        out[...] = np.clip(array, 0, 0xFFFF).astype(np.uint16) >> 8
+    else:
+        raise ValueError(f"Unsupported image array dtype {array.dtype}")
+    return 0
+
+
+def to_grayscale_uint8(image_array):
+    """
+    Preprocessing array gambar jadi grayscale uint8 (0-255), setara rgb2gray di Colab.
+    RGB(A) pakai bobot rgb2gray, 2D uint8 dipakai apa adanya, 16 bit -> 8 bit teratas.
+    """
+    image_array = np.asarray(image_array)
+    out = np.empty(image_array.shape[:2], dtype=np.uint8)
+    band_rows = max(1, BAND_PIXELS // max(1, out.shape[1]))
+    for start in range(0, out.shape[0], band_rows):
+        stop = start + band_rows
+        _array_to_gray(image_array[start:stop], out[start:stop])
+    return out
+
+
+def image_to_grayscale(image):
+    """
+    Image PIL (mode apa pun) -> grayscale uint8, per pita baris.
+    Return (array, perkiraan puncak byte buffer: gambar PIL + output + pita sementara).
+    """
+    width, height = image.size
+    out = np.empty((height, width), dtype=np.uint8)
+    if image.mode == 'L':
+        out[...] = np.asarray(image)
+        return out, _pil_bytes(image) + 2 * out.nbytes
+
+    band_rows = max(1, BAND_PIXELS // max(1, width))
+    band_peak = 0
+    for start in range(0, height, band_rows):
+        stop = min(height, start + band_rows)
+        band = image.crop((0, start, width, stop))
+        if image.mode in ('P', 'PA'):
+            band = band.convert('RGBA' if 'transparency' in band.info or image.mode == 'PA' else 'RGB')
+        elif image.mode not in IMAGE_MODES:
+            band = band.convert('RGB')
+        array = np.asarray(band)
+        temporary = _array_to_gray(array, out[start:stop])
+        band_peak = max(band_peak, _pil_bytes(band) + array.nbytes + temporary)
+    return out, _pil_bytes(image) + out.nbytes + band_peak
+
+
+def _reducible(image):
+    """
+    Image.reduce tidak mendukung mode 16 bit, P dan 1. Normalisasi dulu tanpa
+    mengubah hasil grayscale: 16 bit -> I (8 bit teratas tetap diambil nanti),
+    P -> RGB, 1 -> L (0/255).
+    """
+    if image.mode in WIDE_MODES:
+        return image.convert('I')
+    if image.mode in ('P', 'PA'):
+        return image.convert('RGB')
+    if image.mode == '1':
+        return image.convert('L')
+    return image
+
+
+def decode_grayscale(image_bytes, max_dim=0, mode='L', max_pixels=0):
+    """
+    Decode bytes gambar ke grayscale uint8.
+    max_dim=0 -> jalur normal resolusi penuh; max_dim>0 -> fast ingest.
+    max_pixels > 0 -> raise ImageTooLarge sebelum decode kalau gambar lebih besar.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    check_pixel_budget(image, max_pixels)
+    if not max_dim:
+        with stage('decode'):
+            image.load()
+        with stage('grayscale'):
+            img_gray, peak = image_to_grayscale(image)
+        record_memory_estimate(peak)
+        return img_gray
+
+    if mode not in FAST_INGEST_MODES:
+        raise ValueError(f"Fast ingest mode must be one of {', '.join(FAST_INGEST_MODES)}")
+
+    with stage('decode'):
+        if image.format == 'JPEG':
+            # Decoder JPEG langsung menghasilkan ukuran >= max_dim (skala pangkat 2)
+            image.draft(mode, (max_dim, max_dim))
+
+        # Sisa pengecilan dengan faktor bulat supaya sisi terpanjang <= max_dim
+        factor = math.ceil(max(image.size) / max_dim)
+        if factor > 1:
+            image = _reducible(image).reduce(factor)
+        image.load()
+
+    with stage('grayscale'):
+        if mode == 'L' and image.mode not in WIDE_MODES:
+            img_gray = np.array(image.convert('L'))
+            peak = _pil_bytes(image) + 2 * img_gray.nbytes
+        else:
+            img_gray, peak = image_to_grayscale(image)
+    record_memory_estimate(peak)
+    return img_gray
+
+
+def image_features(image_bytes, max_dim=0, mode='L', max_pixels=0, glcm_workers=1):
+    """
+    Decode + fitur GLCM untuk satu gambar. Semua konfigurasi lewat argumen,
+    karena worker process /predict/batch (forkserver) tidak meng-import app.py.
+    """
+    img_gray = decode_grayscale(image_bytes, max_dim, mode, max_pixels)
+    with stage('glcm'):
+        return glcm.glcm_features(img_gray, glcm_workers)
+
+
+def check_feature_tolerance(images):
+    """
+    Bandingkan fitur GLCM fixed-point dengan rgb2gray float64 (implementasi lama).
+    Return (selisih piksel maksimum, selisih relatif fitur maksimum).
+    """
+    from skimage.color import rgb2gray
+
+    worst_pixel, worst_feature = 0, 0.0
+    for rgb in images:
+        reference = (rgb2gray(rgb) * 255).astype('uint8')
+        ours = to_grayscale_uint8(rgb)
+        worst_pixel = max(worst_pixel, int(np.max(np.abs(ours.astype(int) - reference))))
+        ref_features = np.array(glcm.glcm_features(reference))
+        features = np.array(glcm.glcm_features(ours))
+        scale = np.maximum(np.abs(ref_features), 1e-12)
+        worst_feature = max(worst_feature, float(np.max(np.abs(features - ref_features) / scale)))
+    return worst_pixel, worst_feature
+
+
+if __name__ == "__main__":
+    from stage_bench import synthetic_leaf
+
+    rng = np.random.default_rng(0)
+    samples = [np.asarray(Image.open(io.BytesIO(synthetic_leaf(mp, 'RGB', seed))))
+               for mp, seed in ((0.3, 0), (0.3, 1), (2, 2))]
+    samples.append(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8))
+
+    worst_pixel, worst_feature = check_feature_tolerance(samples)
+    print(f"Selisih piksel maksimum vs rgb2gray: {worst_pixel}")
+    print(f"Selisih relatif fitur maksimum: {worst_feature:.3e}")
+    if worst_pixel > 1 or worst_feature > FEATURE_RTOL:
+        raise SystemExit(f"❌ Melebihi toleransi (1 level, {FEATURE_RTOL:g})")
+    print("✅ Grayscale fixed-point dalam toleransi")
@@ -0,0 +1,120 @@
+"""
+Laporan pergeseran fitur GLCM antara decode penuh dan fast ingest.
+
+Untuk tiap gambar sampel, fitur & kelas prediksi dari decode resolusi penuh
+dibandingkan dengan decode kecil (PIL draft/reduce) di beberapa batas ukuran
+dan mode. Dipakai untuk memilih FAST_INGEST_MAX_DIM yang aman.
+
+Contoh:
+    python ingest_drift.py dataset/ --max-dims 512 1024 2048 --json drift.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+import glcm
+from ingest import FAST_INGEST_MODES, decode_grayscale
+
+FEATURE_NAMES = ['contrast', 'correlation', 'energy', 'homogeneity']
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def find_images(folder):
+    return sorted(p for p in Path(folder).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def measure(image_bytes, max_dim, mode):
+    """Return (fitur, detik decode+grayscale)"""
+    start = time.perf_counter()
+    img_gray = decode_grayscale(image_bytes, max_dim, mode)
+    elapsed = time.perf_counter() - start
+    return np.array(glcm.glcm_features(img_gray)), elapsed
+
+
+def drift_report(paths, model, max_dims, modes):
+    baseline = []
+    for path in paths:
+        image_bytes = path.read_bytes()
+        features, elapsed = measure(image_bytes, 0, None)
+        baseline.append((image_bytes, features, elapsed))
+
+    base_features = np.array([b[1] for b in baseline])
+    base_classes = model.predict(base_features)
+    base_time = sum(b[2] for b in baseline)
+
+    report = {
+        "images": len(paths),
+        "baseline_decode_seconds": base_time,
+        "configs": []
+    }
+
+    for max_dim in max_dims:
+        for mode in modes:
+            features, total_time = [], 0.0
+            for image_bytes, _, _ in baseline:
+                f, elapsed = measure(image_bytes, max_dim, mode)
+                features.append(f)
+                total_time += elapsed
+
+            features = np.array(features)
+            classes = model.predict(features)
+            rel_diff = np.abs(features - base_features) / np.maximum(np.abs(base_features), 1e-12)
+
+            report["configs"].append({
+                "max_dim": max_dim,
+                "mode": mode,
+                "class_agreement": float(np.mean(classes == base_classes)),
+                "decode_speedup": base_time / total_time if total_time else None,
+                "mean_rel_diff": dict(zip(FEATURE_NAMES, rel_diff.mean(axis=0).tolist())),
+                "max_rel_diff": dict(zip(FEATURE_NAMES, rel_diff.max(axis=0).tolist())),
+                "changed_images": [str(p) for p, same in zip(paths, classes == base_classes)
+                                   if not same],
+            })
+
+    return report
+
+
+def print_report(report):
+    print(f"📷 {report['images']} gambar, decode penuh {report['baseline_decode_seconds']:.2f} s")
+    header = f"{'max_dim':>8} {'mode':>4} {'kelas sama':>10} {'speedup':>8} " + \
+        ' '.join(f"{name[:11]:>11}" for name in FEATURE_NAMES)
+    print(header)
+    print('-' * len(header))
+    for config in report["configs"]:
+        speedup = f"{config['decode_speedup']:.1f}x" if config['decode_speedup'] else '-'
+        diffs = ' '.join(f"{config['mean_rel_diff'][name] * 100:>10.2f}%" for name in FEATURE_NAMES)
+        print(f"{config['max_dim']:>8} {config['mode']:>4} "
+              f"{config['class_agreement'] * 100:>9.1f}% {speedup:>8} {diffs}")
+    print("(kolom fitur = rata-rata selisih relatif terhadap decode penuh)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder', help='Folder berisi gambar sampel')
+    parser.add_argument('--model', default='models/naive_bayes_glcm.pkl')
+    parser.add_argument('--max-dims', type=int, nargs='+', default=[512, 1024, 1536, 2048])
+    parser.add_argument('--modes', nargs='+', default=list(FAST_INGEST_MODES),
+                        choices=FAST_INGEST_MODES)
+    parser.add_argument('--json', help='Simpan laporan lengkap ke file JSON')
+    args = parser.parse_args()
+
+    paths = find_images(args.folder)
+    if not paths:
+        raise SystemExit(f"❌ Tidak ada gambar di {args.folder}")
+
+    model = joblib.load(args.model)
+    report = drift_report(paths, model, args.max_dims, args.modes)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Laporan disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Load generator untuk API prediksi (/predict, /logs, /stats).
+
+Dua mode:
+    closed  N user bersamaan; setiap user langsung mengirim request berikutnya
+            setelah response diterima (mengukur kapasitas maksimum).
+    open    Request datang dengan laju tetap (--rate per detik) tanpa menunggu
+            response sebelumnya. Latency dihitung dari jadwal kedatangan, jadi
+            waktu antri di sisi client ikut terhitung (tidak ada coordinated
+            omission) dan server yang melambat langsung terlihat di p99.
+
+Gambar diambil dari folder (--corpus) atau dibuat sintetis dengan campuran
+ukuran (--sizes 0.3:8,2:2 = 80% 0.3 MP, 20% 2 MP). Setiap ukuran punya
+beberapa varian (--variants) supaya tidak semua request kena cache prediksi.
+
+Hasil: throughput, p50/p95/p99/max latency dan error rate per endpoint,
+plus ringkasan JSON (--json) yang bisa di-diff antar run.
+
+Contoh:
+    python load_test.py --start-server --mode closed --users 8 --duration 30
+    python load_test.py --url http://10.0.0.5:8000 --mode open --rate 20 --duration 60 \\
+        --mix predict=8,logs=1,stats=1 --json run_a.json
+    python load_test.py --corpus dataset/test --upload multipart
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stage_bench import synthetic_leaf
+
+ENDPOINTS = ('predict', 'logs', 'stats')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+CONTENT_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+                 '.bmp': 'image/bmp', '.webp': 'image/webp'}
+
+# Urutan tetap di ringkasan JSON supaya mudah di-diff
+PERCENTILES = (50, 95, 99)
+
+
+def parse_weights(text, allowed=None, cast=str):
+    """'predict=8,logs=1' atau '0.3:8,2:2' -> [(key, weight), ...]"""
+    weights = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        sep = '=' if '=' in part else ':'
+        key, _, weight = part.partition(sep)
+        key = key.strip()
+        if allowed is not None and key not in allowed:
+            raise ValueError(f"'{key}' harus salah satu dari {', '.join(allowed)}")
+        weights.append((cast(key), float(weight) if weight else 1.0))
+    if not weights or any(w < 0 for _, w in weights) or sum(w for _, w in weights) <= 0:
+        raise ValueError(f"bobot tidak valid: {text!r}")
+    return weights
+
+
+def percentile(sorted_values, p):
+    """Percentile nearest-rank dari list yang sudah diurutkan"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-p * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# ====================================
+# Corpus gambar
+# ====================================
+def load_corpus(folder, limit=0):
+    """[(nama, bytes, content_type), ...] dari semua gambar di folder (rekursif)"""
+    images = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in IMAGE_EXTENSIONS:
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                images.append((name, f.read(), CONTENT_TYPES[ext]))
+            if limit and len(images) >= limit:
+                return images
+    return images
+
+
+def synthetic_corpus(size_weights, variants):
+    """Gambar daun sintetis per ukuran; return (images, weights) untuk random.choices"""
+    images, weights = [], []
+    for megapixels, weight in size_weights:
+        for seed in range(variants):
+            data = synthetic_leaf(megapixels, 'RGB', seed=seed)
+            images.append((f'synthetic_{megapixels:g}mp_{seed}.jpg', data, 'image/jpeg'))
+            weights.append(weight / variants)
+    return images, weights
+
+
+# ====================================
+# Request
+# ====================================
+class Recorder:
+    """Kumpulan hasil request (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {endpoint: [] for endpoint in ENDPOINTS}
+        self.statuses = {endpoint: {} for endpoint in ENDPOINTS}
+        self.cache_hits = 0
+
+    def record(self, endpoint, latency, status, cache_hit=False):
+        with self._lock:
+            self.samples[endpoint].append((latency, status))
+            key = str(status)
+            self.statuses[endpoint][key] = self.statuses[endpoint].get(key, 0) + 1
+            self.cache_hits += bool(cache_hit)
+
+
+class Client:
+    """Satu session (keep-alive) per thread"""
+
+    def __init__(self, base_url, images, image_weights, upload, timeout, seed):
+        self.base_url = base_url.rstrip('/')
+        self.images = images
+        self.image_weights = image_weights
+        self.upload = upload
+        self.timeout = timeout
+        self._local = threading.local()
+        self._seed = itertools.count(seed)
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, 'session'):
+            state.session = requests.Session()
+            state.rng = random.Random(next(self._seed))
+        return state
+
+    def send(self, endpoint):
+        """Kirim satu request; return (status, cache_hit). status 'error:<Tipe>' kalau gagal koneksi."""
+        state = self._state()
+        try:
+            if endpoint == 'predict':
+                name, data, content_type = state.rng.choices(self.images, self.image_weights)[0]
+                if self.upload == 'multipart':
+                    response = state.session.post(f'{self.base_url}/predict',
+                                                  files={'image': (name, data, content_type)},
+                                                  timeout=self.timeout)
+                else:
+                    response = state.session.post(f'{self.base_url}/predict', data=data,
+                                                  headers={'Content-Type': content_type},
+                                                  timeout=self.timeout)
+                cache_hit = response.ok and response.json().get('cache_hit', False)
+                return response.status_code, cache_hit
+            response = state.session.get(f'{self.base_url}/{endpoint}', timeout=self.timeout)
+            return response.status_code, False
+        except requests.RequestException as e:
+            return f'error:{type(e).__name__}', False
+
+
+def run_closed(client, recorder, endpoint_weights, users, duration):
+    """N user, masing-masing request berurutan sampai durasi habis"""
+    endpoints, weights = zip(*endpoint_weights)
+    stop_at = time.perf_counter() + duration
+
+    def user(index):
+        rng = random.Random(index)
+        while time.perf_counter() < stop_at:
+            endpoint = rng.choices(endpoints, weights)[0]
+            start = time.perf_counter()
+            status, cache_hit = client.send(endpoint)
+            recorder.record(endpoint, time.perf_counter() - start, status, cache_hit)
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open(client, recorder, endpoint_weights, rate, duration, max_in_flight):
+    """Kedatangan dengan laju tetap; latency dihitung dari waktu jadwal kedatangan"""
+    endpoints, weights = zip(*endpoint_weights)
+    rng = random.Random(0)
+    interval = 1.0 / rate
+    total = int(rate * duration)
+
+    def fire(endpoint, scheduled):
+        status, cache_hit = client.send(endpoint)
+        recorder.record(endpoint, time.perf_counter() - scheduled, status, cache_hit)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='load') as executor:
+        in_flight = threading.BoundedSemaphore(max_in_flight * 4)
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = rng.choices(endpoints, weights)[0]
+            # Client kewalahan: catat sebagai error daripada diam-diam memperlambat laju
+            if not in_flight.acquire(blocking=False):
+                recorder.record(endpoint, time.perf_counter() - scheduled, 'error:ClientSaturated')
+                continue
+            future = executor.submit(fire, endpoint, scheduled)
+            future.add_done_callback(lambda _: in_flight.release())
+
+
+# ====================================
+# Server lokal
+# ====================================
+def start_server(port, server, env_overrides):
+    """Jalankan app.py di subprocess dengan database sementara; return Popen"""
+    tmp = tempfile.mkdtemp(prefix='load_test_')
+    env = dict(os.environ,
+               PREDICTION_DB=os.path.join(tmp, 'load.db'),
+               PROCESSED_DIR=os.path.join(tmp, 'processed'),
+               **env_overrides)
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '-b', f'127.0.0.1:{port}', 'app:app']
+    else:
+        command = [sys.executable, '-c',
+                   'import app; app.warmup(); '
+                   f'app.app.run(host="127.0.0.1", port={port}, threaded=True)']
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server berhenti dengan kode {process.returncode}")
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server tidak merespons dalam 60 detik")
+
+
+# ====================================
+# Laporan
+# ====================================
+def summarize(recorder, elapsed, config):
+    endpoints = {}
+    all_latencies = []
+    total_requests = total_errors = 0
+    for endpoint in ENDPOINTS:
+        samples = recorder.samples[endpoint]
+        if not samples:
+            continue
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, status in samples
+                     if not (isinstance(status, int) and 200 <= status < 400))
+        all_latencies.extend(latencies)
+        total_requests += len(samples)
+        total_errors += errors
+        endpoints[endpoint] = _latency_summary(latencies, elapsed, errors)
+        endpoints[endpoint]["status_counts"] = dict(sorted(recorder.statuses[endpoint].items()))
+
+    predict_count = len(recorder.samples['predict'])
+    return {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": _latency_summary(sorted(all_latencies), elapsed, total_errors),
+        "endpoints": endpoints,
+        "predict_cache_hit_rate": round(recorder.cache_hits / predict_count, 4) if predict_count else None,
+    }
+
+
+def _latency_summary(sorted_latencies, elapsed, errors):
+    count = len(sorted_latencies)
+    summary = {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    for p in PERCENTILES:
+        value = percentile(sorted_latencies, p)
+        summary[f"p{p}_ms"] = round(value * 1000, 2) if value is not None else None
+    summary["max_ms"] = round(sorted_latencies[-1] * 1000, 2) if count else None
+    return summary
+
+
+def print_report(summary):
+    config = summary["config"]
+    mode = (f"closed, {config['users']} user" if config["mode"] == 'closed'
+            else f"open, {config['rate']:g} req/s")
+    print(f"\nLoad test {config['url']} ({mode}, {summary['elapsed_seconds']:.1f} s)")
+    header = f"{'endpoint':<10}{'req':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'error':>9}"
+    print(header)
+    print('-' * len(header))
+    rows = list(summary["endpoints"].items()) + [("total", summary["overall"])]
+    for name, stats in rows:
+        cells = [f"{stats[key]:>10.1f}" if stats[key] is not None else f"{'-':>10}"
+                 for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:<10}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{''.join(cells)}{stats['error_rate'] * 100:>8.1f}%")
+    for name, stats in summary["endpoints"].items():
+        unusual = {k: v for k, v in stats["status_counts"].items() if k != '200'}
+        if unusual:
+            print(f"  ⚠️  {name}: {unusual}")
+    if summary["predict_cache_hit_rate"] is not None:
+        print(f"Cache hit /predict: {summary['predict_cache_hit_rate'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test API prediksi hama sawi")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--start-server', action='store_true',
+                        help='Jalankan app.py lokal (database sementara) dan uji server itu')
+    parser.add_argument('--server', choices=('flask', 'gunicorn'), default='flask')
+    parser.add_argument('--port', type=int, default=5055, help='Port untuk --start-server')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Environment tambahan untuk server lokal (boleh berulang)')
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed')
+    parser.add_argument('--users', type=int, default=4, help='Jumlah user (mode closed)')
+    parser.add_argument('--rate', type=float, default=10.0, help='Request per detik (mode open)')
+    parser.add_argument('--max-in-flight', type=int, default=64,
+                        help='Batas thread pengirim (mode open)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Durasi dalam detik')
+    parser.add_argument('--mix', default='predict=8,logs=1,stats=1',
+                        help='Bobot endpoint, mis. predict=8,logs=1,stats=1')
+    parser.add_argument('--corpus', help='Folder gambar (default: gambar sintetis)')
+    parser.add_argument('--corpus-limit', type=int, default=200)
+    parser.add_argument('--sizes', default='0.3:8,2:2',
+                        help='Campuran ukuran gambar sintetis MP:bobot')
+    parser.add_argument('--variants', type=int, default=8, help='Varian per ukuran sintetis')
+    parser.add_argument('--upload', choices=('raw', 'multipart'), default='raw')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', help='Simpan ringkasan JSON ke file ini')
+    args = parser.parse_args()
+
+    try:
+        endpoint_weights = parse_weights(args.mix, allowed=ENDPOINTS)
+        size_weights = parse_weights(args.sizes, cast=float)
+        server_env = dict(item.split('=', 1) for item in args.server_env)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.corpus:
+        images = load_corpus(args.corpus, args.corpus_limit)
+        if not images:
+            parser.error(f"tidak ada gambar di {args.corpus}")
+        image_weights = [1.0] * len(images)
+        image_source = {"corpus": args.corpus, "images": len(images)}
+    else:
+        images, image_weights = synthetic_corpus(size_weights, args.variants)
+        image_source = {"synthetic_sizes": args.sizes, "variants": args.variants}
+    print(f"📷 {len(images)} gambar siap ({sum(len(d) for _, d, _ in images) / 1e6:.1f} MB)")
+
+    process = None
+    url = args.url
+    if args.start_server:
+        process, url = start_server(args.port, args.server, server_env)
+        print(f"🚀 Server lokal ({args.server}) di {url}")
+
+    config = {
+        "url": url,
+        "mode": args.mode,
+        "users": args.users if args.mode == 'closed' else None,
+        "rate": args.rate if args.mode == 'open' else None,
+        "duration": args.duration,
+        "mix": dict(endpoint_weights),
+        "upload": args.upload,
+        "images": image_source,
+        "server": args.server if args.start_server else None,
+        "server_env": server_env or None,
+    }
+
+    client = Client(url, images, image_weights, args.upload, args.timeout, seed=0)
+    recorder = Recorder()
+    try:
+        start = time.perf_counter()
+        if args.mode == 'closed':
+            run_closed(client, recorder, endpoint_weights, args.users, args.duration)
+        else:
+            run_open(client, recorder, endpoint_weights, args.rate, args.duration,
+                     args.max_in_flight)
+        elapsed = time.perf_counter() - start
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    summary = summarize(recorder, elapsed, config)
+    print_report(summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+        print(f"\n✅ Ringkasan disimpan ke {args.json}")
+
+    if summary["overall"]["requests"] == 0:
+        print("❌ Tidak ada request yang selesai")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
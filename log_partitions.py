@@ -0,0 +1,449 @@
+"""
+Log prediksi dipartisi per bulan di dalam satu file SQLite.
+
+Setiap bulan punya tabel sendiri (predictions_2026_10, ...) dengan index
+dan trigger rollup sendiri. View predictions menggabungkan semua partisi
+(UNION ALL) untuk query ad-hoc dan tool lama. /logs dan export tidak lewat
+view: partisi dibaca dari yang terbaru sesuai since/until/cursor, jadi
+setiap query hanya menyentuh index partisi yang relevan.
+
+Perawatan (maintain):
+  - retention: partisi yang lebih tua dari retention_months di-DROP utuh
+    (bukan DELETE per baris), file arsip yang kedaluwarsa ikut dihapus
+  - arsip: partisi yang lebih tua dari archive_after_months dipindah ke
+    file SQLite tersendiri lalu di-gzip (<archive_dir>/predictions_2026_01.db.gz),
+    kemudian di-DROP dari database utama
+  - halaman kosong dikembalikan ke OS dengan PRAGMA incremental_vacuum
+Rollup /stats (stats_rollup.py) tidak dikurangi saat partisi dihapus atau
+diarsip, jadi statistik tetap mencakup seluruh riwayat.
+
+Database lama (satu tabel predictions) dimigrasi sekali oleh init_partitions.
+
+Contoh:
+    python log_partitions.py --list
+    python log_partitions.py --maintain --retention 12 --archive-after 3
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from stats_rollup import rollup_trigger
+
+VIEW_NAME = 'predictions'
+TABLE_PREFIX = 'predictions_'
+
+PREDICTION_COLUMNS = [
+    ("id", "TEXT PRIMARY KEY"),
+    ("timestamp", "TEXT"),
+    ("prediction_class", "TEXT"),
+    ("prediction_label", "TEXT"),
+    ("confidence", "REAL"),
+    ("contrast", "REAL"),
+    ("correlation", "REAL"),
+    ("energy", "REAL"),
+    ("homogeneity", "REAL"),
+    ("image_name", "TEXT"),
+    ("all_probabilities", "TEXT"),
+    ("model_version", "TEXT"),
+]
+COLUMN_NAMES = ', '.join(name for name, _ in PREDICTION_COLUMNS)
+
+# Index per partisi untuk /logs (urut waktu + filter label, pagination keyset)
+PARTITION_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp_id ON {table} (timestamp, id)',
+    'CREATE INDEX IF NOT EXISTS idx_{table}_label_timestamp_id '
+    'ON {table} (prediction_label, timestamp, id)',
+]
+
+_MONTH = re.compile(r'^\d{4}-\d{2}$')
+_TABLE = re.compile(r'^predictions_(\d{4})_(\d{2})$')
+_ARCHIVE = re.compile(r'^predictions_(\d{4})_(\d{2})\.db\.gz$')
+_ARCHIVE_TMP = re.compile(r'^predictions_(\d{4})_(\d{2})\.(\d+)\.db$')
+
+# Bulan dari timestamp di SQL; timestamp kosong / tidak valid -> parameter (bulan sekarang)
+_MONTH_SQL = ("CASE WHEN substr(timestamp, 1, 7) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]' "
+              "THEN substr(timestamp, 1, 7) ELSE ? END")
+
+
+def month_of(timestamp):
+    """'2026-10-18T11:00:00' -> '2026-10'; bulan sekarang kalau timestamp tidak valid"""
+    month = (timestamp or '')[:7]
+    return month if _MONTH.match(month) else datetime.now().strftime('%Y-%m')
+
+
+def add_months(month, delta):
+    year, number = map(int, month.split('-'))
+    index = year * 12 + number - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def partition_table(month):
+    return TABLE_PREFIX + month.replace('-', '_')
+
+
+@contextmanager
+def _immediate(conn):
+    """BEGIN IMMEDIATE kalau belum di dalam transaksi, supaya DDL + view berganti atomik"""
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (name,)).fetchone() is not None
+
+
+def is_legacy(conn):
+    """True kalau predictions masih tabel tunggal (belum dipartisi)"""
+    return _table_exists(conn, VIEW_NAME)
+
+
+def list_partitions(conn):
+    """Bulan yang punya partisi, terbaru dulu"""
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                        (TABLE_PREFIX + '%',)).fetchall()
+    months = []
+    for (name,) in rows:
+        match = _TABLE.match(name)
+        if match:
+            months.append(f"{match.group(1)}-{match.group(2)}")
+    return sorted(months, reverse=True)
+
+
+def storage_tables(conn):
+    """Tabel fisik berisi log (terbaru dulu); tabel lama kalau belum dipartisi"""
+    if is_legacy(conn):
+        return [VIEW_NAME]
+    return [partition_table(month) for month in list_partitions(conn)]
+
+
+def tables_for_range(conn, since=None, until=None):
+    """
+    Partisi (terbaru dulu) yang mungkin berisi timestamp di [since, until].
+    Bulan di-bandingkan dari prefix timestamp ISO.
+    """
+    if is_legacy(conn):
+        return [VIEW_NAME]
+    tables = []
+    for month in list_partitions(conn):
+        if until is not None and month > until[:7]:
+            continue
+        if since is not None and month < since[:7]:
+            break
+        tables.append(partition_table(month))
+    return tables
+
+
+def _rebuild_view(conn):
+    months = list_partitions(conn)
+    conn.execute(f'DROP VIEW IF EXISTS {VIEW_NAME}')
+    if months:
+        selects = ' UNION ALL '.join(f'SELECT {COLUMN_NAMES} FROM {partition_table(month)}'
+                                     for month in months)
+    else:
+        # Tanpa partisi: view kosong dengan kolom yang sama (query lama tetap jalan)
+        selects = 'SELECT ' + ', '.join(f'NULL AS {name}' for name, _ in PREDICTION_COLUMNS) + ' WHERE 0'
+    conn.execute(f'CREATE VIEW {VIEW_NAME} AS {selects}')
+
+
+def _create_partition(conn, month, trigger=True):
+    table = partition_table(month)
+    columns = ', '.join(f'{name} {kind}' for name, kind in PREDICTION_COLUMNS)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+    for index_sql in PARTITION_INDEXES:
+        conn.execute(index_sql.format(table=table))
+    if trigger:
+        conn.execute(rollup_trigger(table))
+    return table
+
+
+def ensure_partition(conn, month):
+    """Buat partisi bulan ini kalau belum ada (tabel, index, trigger rollup, view)"""
+    table = partition_table(month)
+    if not _table_exists(conn, table):
+        with _immediate(conn):
+            # Dicek ulang di dalam lock: worker lain mungkin baru saja membuatnya
+            if not _table_exists(conn, table):
+                _create_partition(conn, month)
+                _rebuild_view(conn)
+    return table
+
+
+def insert_rows(conn, rows):
+    """
+    Simpan baris log (urutan kolom PREDICTION_COLUMNS) ke partisi bulannya.
+    Dipanggil di dalam transaksi writer; partisi baru dibuat saat pergantian bulan.
+    """
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(month_of(row[1]), []).append(row)
+    placeholders = ', '.join('?' * len(PREDICTION_COLUMNS))
+    with _immediate(conn):
+        for month, month_rows in by_month.items():
+            table = ensure_partition(conn, month)
+            conn.executemany(f'INSERT INTO {table} ({COLUMN_NAMES}) VALUES ({placeholders})',
+                             month_rows)
+
+
+def _migrate_legacy(conn):
+    """Pindahkan isi tabel predictions lama ke partisi bulanan (sekali)"""
+    current = datetime.now().strftime('%Y-%m')
+    conn.execute(f'ALTER TABLE {VIEW_NAME} RENAME TO predictions_legacy')
+    months = [row[0] for row in conn.execute(
+        f'SELECT DISTINCT {_MONTH_SQL} FROM predictions_legacy', (current,))]
+
+    for month in months:
+        table = _create_partition(conn, month, trigger=False)
+        conn.execute(f'''
+            INSERT INTO {table} ({COLUMN_NAMES})
+            SELECT {COLUMN_NAMES} FROM predictions_legacy WHERE {_MONTH_SQL} = ?
+        ''', (current, month))
+    # Trigger rollup dipasang setelah copy supaya baris lama tidak terhitung dua kali
+    for month in months:
+        conn.execute(rollup_trigger(partition_table(month)))
+    conn.execute('DROP TABLE predictions_legacy')
+    return len(months)
+
+
+def init_partitions(conn):
+    """
+    Siapkan penyimpanan berpartisi: migrasi tabel lama, partisi bulan ini,
+    view predictions, dan auto_vacuum=INCREMENTAL. Return jumlah partisi hasil migrasi.
+    """
+    migrated = 0
+    conn.commit()
+    with _immediate(conn):
+        if is_legacy(conn):
+            migrated = _migrate_legacy(conn)
+        ensure_partition(conn, datetime.now().strftime('%Y-%m'))
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?",
+                            (VIEW_NAME,)).fetchone():
+            _rebuild_view(conn)
+
+    # auto_vacuum hanya berlaku setelah VACUUM penuh (sekali, database lama)
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    return migrated
+
+
+# ====================================
+# Retention & arsip
+# ====================================
+def archive_path(archive_dir, month):
+    return os.path.join(archive_dir, partition_table(month) + '.db.gz')
+
+
+def list_archives(archive_dir):
+    """Bulan yang sudah diarsip, terbaru dulu"""
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return []
+    months = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE.match(name)
+        if match:
+            months.append(f"{match.group(1)}-{match.group(2)}")
+    return sorted(months, reverse=True)
+
+
+def _compress(source, target):
+    tmp = target + '.tmp'
+    with open(source, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp, target)
+    os.remove(source)
+
+
+def _move_to_archive(conn, table):
+    """Copy partisi ke database archive yang di-attach lalu DROP; None kalau partisi sudah hilang"""
+    with _immediate(conn):
+        # Proses lain (worker gunicorn) mungkin sudah mengarsip partisi ini
+        if not _table_exists(conn, table):
+            return None
+        columns = ', '.join(f'{name} {kind}' for name, kind in PREDICTION_COLUMNS)
+        conn.execute(f'CREATE TABLE archive.{VIEW_NAME} ({columns})')
+        rows = conn.execute(f'''
+            INSERT INTO archive.{VIEW_NAME} ({COLUMN_NAMES})
+            SELECT {COLUMN_NAMES} FROM main.{table}
+        ''').rowcount
+        conn.execute(f'DROP TABLE main.{table}')
+        _rebuild_view(conn)
+    return rows
+
+
+def archive_partition(conn, month, archive_dir):
+    """
+    Pindahkan satu partisi ke <archive_dir>/predictions_YYYY_MM.db.gz (tabel predictions
+    di dalamnya), lalu DROP dari database utama. Return jumlah baris yang diarsip.
+    """
+    table = partition_table(month)
+    os.makedirs(archive_dir, exist_ok=True)
+    tmp_db = os.path.join(archive_dir, f'{table}.{os.getpid()}.db')
+    if os.path.exists(tmp_db):
+        os.remove(tmp_db)
+
+    conn.commit()
+    # ATTACH tidak boleh di dalam transaksi
+    conn.execute('ATTACH DATABASE ? AS archive', (tmp_db,))
+    try:
+        rows = _move_to_archive(conn, table)
+    except BaseException:
+        conn.execute('DETACH DATABASE archive')
+        os.remove(tmp_db)
+        raise
+    conn.execute('DETACH DATABASE archive')
+
+    if rows is None:
+        os.remove(tmp_db)
+        return 0
+    _compress(tmp_db, archive_path(archive_dir, month))
+    return rows
+
+
+def _recover_archives(conn, archive_dir):
+    """Selesaikan kompresi arsip yang terputus (mis. proses mati setelah commit)"""
+    if not os.path.isdir(archive_dir):
+        return
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_TMP.match(name)
+        if not match:
+            continue
+        month = f"{match.group(1)}-{match.group(2)}"
+        path = os.path.join(archive_dir, name)
+        pid = int(match.group(3))
+        if pid != os.getpid() and _pid_alive(pid):
+            continue
+        if _table_exists(conn, partition_table(month)) or os.path.exists(archive_path(archive_dir, month)):
+            # Transaksi arsip tidak sempat commit / sudah selesai: data masih di tempat lain
+            os.remove(path)
+        else:
+            _compress(path, archive_path(archive_dir, month))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def drop_partition(conn, month):
+    """DROP satu partisi (seluruh bulan) dan perbarui view"""
+    conn.commit()
+    with _immediate(conn):
+        conn.execute(f'DROP TABLE IF EXISTS {partition_table(month)}')
+        _rebuild_view(conn)
+
+
+def maintain(conn, retention_months=0, archive_after_months=0, archive_dir='log_archive',
+             now=None):
+    """
+    Jalankan retention + arsip + incremental vacuum. 0 = fitur nonaktif.
+    Partisi bulan berjalan tidak pernah dihapus atau diarsip.
+    Return ringkasan {"dropped": [...], "archived": {...}, "deleted_archives": [...], "freed_pages": n}.
+    """
+    current = (now or datetime.now()).strftime('%Y-%m')
+    result = {"dropped": [], "archived": {}, "deleted_archives": [], "freed_pages": 0}
+    if is_legacy(conn):
+        return result
+
+    # Partisi bulan berjalan dibuat dulu, supaya view tidak pernah tanpa partisi
+    # (mis. server mati lebih dari retention_months lalu semua partisi kedaluwarsa)
+    conn.commit()
+    ensure_partition(conn, current)
+
+    if archive_dir:
+        _recover_archives(conn, archive_dir)
+
+    if retention_months > 0:
+        cutoff = add_months(current, -retention_months)
+        for month in list_partitions(conn):
+            if month < cutoff:
+                drop_partition(conn, month)
+                result["dropped"].append(month)
+        for month in list_archives(archive_dir):
+            if month < cutoff:
+                os.remove(archive_path(archive_dir, month))
+                result["deleted_archives"].append(month)
+
+    if archive_after_months > 0 and archive_dir:
+        cutoff = add_months(current, -archive_after_months)
+        for month in list_partitions(conn):
+            if month < cutoff:
+                result["archived"][month] = archive_partition(conn, month, archive_dir)
+
+    if result["dropped"] or result["archived"]:
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        # execute() hanya menjalankan satu step (= satu halaman); executescript sampai habis
+        conn.executescript('PRAGMA incremental_vacuum;')
+        result["freed_pages"] = before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return result
+
+
+def partition_stats(conn, archive_dir=None):
+    """Ringkasan penyimpanan untuk /stats"""
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    return {
+        "partitions": list_partitions(conn),
+        "archived": list_archives(archive_dir),
+        "database_bytes": page_size * conn.execute('PRAGMA page_count').fetchone()[0],
+        "free_bytes": page_size * conn.execute('PRAGMA freelist_count').fetchone()[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola partisi bulanan log prediksi")
+    parser.add_argument('--db', default=os.environ.get('PREDICTION_DB', 'prediction_logs.db'))
+    parser.add_argument('--archive-dir', default=os.environ.get('LOG_ARCHIVE_DIR', 'log_archive'))
+    parser.add_argument('--list', action='store_true', help='Tampilkan partisi dan arsip')
+    parser.add_argument('--maintain', action='store_true', help='Jalankan retention + arsip')
+    parser.add_argument('--retention', type=int,
+                        default=int(os.environ.get('LOG_RETENTION_MONTHS', 0)),
+                        help='Simpan N bulan terakhir (0 = selamanya)')
+    parser.add_argument('--archive-after', type=int,
+                        default=int(os.environ.get('LOG_ARCHIVE_AFTER_MONTHS', 0)),
+                        help='Arsipkan partisi lebih tua dari N bulan (0 = tidak)')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrated = init_partitions(conn)
+    if migrated:
+        print(f"✅ Tabel lama dipindah ke {migrated} partisi bulanan")
+
+    if args.maintain:
+        result = maintain(conn, args.retention, args.archive_after, args.archive_dir)
+        for month in result["dropped"]:
+            print(f"🗑️  Partisi {month} dihapus (retention {args.retention} bulan)")
+        for month in result["deleted_archives"]:
+            print(f"🗑️  Arsip {month} dihapus (retention {args.retention} bulan)")
+        for month, rows in result["archived"].items():
+            print(f"📦 Partisi {month} diarsip ({rows} baris) ke {archive_path(args.archive_dir, month)}")
+        print(f"✅ Perawatan selesai, {result['freed_pages']} halaman dikembalikan")
+
+    if args.list or not args.maintain:
+        for month in list_partitions(conn):
+            count = conn.execute(f'SELECT COUNT(*) FROM {partition_table(month)}').fetchone()[0]
+            print(f"  {month}: {count} baris")
+        for month in list_archives(args.archive_dir):
+            print(f"  {month}: arsip {archive_path(args.archive_dir, month)}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
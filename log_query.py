@@ -0,0 +1,284 @@
+"""
+Query log prediksi dengan filter, proyeksi kolom, dan pagination keyset,
+plus export streaming NDJSON/CSV dengan memori konstan.
+
+Urutan selalu (timestamp DESC, id DESC) sehingga cursor cukup berisi
+(timestamp, id) baris terakhir; halaman berikutnya memakai
+WHERE (timestamp, id) < (?, ?) yang dilayani langsung oleh index,
+bukan OFFSET / sort seluruh tabel.
+
+Log dipartisi per bulan (log_partitions.py). Query dijalankan per partisi
+dari bulan terbaru dan berhenti begitu limit terpenuhi; karena rentang
+waktu partisi tidak tumpang tindih, hasil gabungannya tetap terurut.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from log_partitions import tables_for_range
+from probability_store import probability_path
+
+# Nama field di response -> kolom database
+LOG_FIELDS = {
+    "id": ("id",),
+    "timestamp": ("timestamp",),
+    "prediction_class": ("prediction_class",),
+    "prediction_label": ("prediction_label",),
+    "confidence": ("confidence",),
+    "glcm_features": ("contrast", "correlation", "energy", "homogeneity"),
+    "image_name": ("image_name",),
+    "model_version": ("model_version",),
+}
+
+# Export boleh menyertakan probabilitas semua kelas
+EXPORT_FIELDS = dict(LOG_FIELDS, all_probabilities=("all_probabilities",))
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class QueryError(ValueError):
+    """Parameter query tidak valid (dikembalikan sebagai HTTP 400)"""
+
+
+def encode_cursor(timestamp, log_id):
+    raw = json.dumps([timestamp, log_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise QueryError("Invalid cursor")
+    return timestamp, log_id
+
+
+def _parse_float(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+
+
+def _parse_time(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise QueryError(f"{name} must be an ISO 8601 timestamp")
+
+
+def _parse_list(value):
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_min_probability(args):
+    """'hama_kutu:0.4,sehat:0.1' -> [('hama_kutu', 0.4), ('sehat', 0.1)]"""
+    thresholds = []
+    for item in _parse_list(args.get('min_probability')):
+        class_name, sep, value = item.rpartition(':')
+        if not sep or not class_name:
+            raise QueryError("min_probability must be class:value")
+        try:
+            thresholds.append((class_name, float(value)))
+        except ValueError:
+            raise QueryError("min_probability must be class:value")
+    return thresholds
+
+
+def parse_log_query(args, default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT,
+                    allowed_fields=LOG_FIELDS):
+    """
+    Parse parameter query (dict-like, mis. request.args):
+    label, min_confidence, max_confidence, min_probability, since, until,
+    cursor, limit, fields.
+    default_limit=None berarti tanpa batas (untuk export).
+    """
+    fields = _parse_list(args.get('fields')) or list(allowed_fields)
+    unknown = [field for field in fields if field not in allowed_fields]
+    if unknown:
+        raise QueryError(f"Unknown field(s): {', '.join(unknown)}")
+
+    limit = args.get('limit')
+    if limit in (None, ''):
+        limit = default_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise QueryError("limit must be an integer")
+        if limit < 1:
+            raise QueryError("limit must be positive")
+        if max_limit:
+            limit = min(limit, max_limit)
+
+    cursor = args.get('cursor')
+
+    return {
+        "labels": _parse_list(args.get('label')),
+        "min_confidence": _parse_float(args, 'min_confidence'),
+        "max_confidence": _parse_float(args, 'max_confidence'),
+        "min_probability": _parse_min_probability(args),
+        "since": _parse_time(args, 'since'),
+        "until": _parse_time(args, 'until'),
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "limit": limit,
+        "fields": fields,
+    }
+
+
+def build_where(query):
+    """Susun klausa WHERE + parameter dari hasil parse_log_query"""
+    clauses = []
+    params = []
+
+    if query["labels"]:
+        clauses.append(f"prediction_label IN ({', '.join('?' * len(query['labels']))})")
+        params.extend(query["labels"])
+    if query["min_confidence"] is not None:
+        clauses.append("confidence >= ?")
+        params.append(query["min_confidence"])
+    if query["max_confidence"] is not None:
+        clauses.append("confidence <= ?")
+        params.append(query["max_confidence"])
+    for class_name, value in query["min_probability"]:
+        # Baris lama yang belum bisa dikonversi ke JSON dilewati
+        clauses.append("CASE WHEN json_valid(all_probabilities) THEN json_extract(all_probabilities, ?) END >= ?")
+        params.extend([probability_path(class_name), value])
+    if query["since"] is not None:
+        clauses.append("timestamp >= ?")
+        params.append(query["since"])
+    if query["until"] is not None:
+        clauses.append("timestamp < ?")
+        params.append(query["until"])
+    if query["cursor"] is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(query["cursor"])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def selected_columns(fields):
+    """Kolom yang perlu di-SELECT; timestamp & id selalu ikut untuk cursor"""
+    columns = ["timestamp", "id"]
+    for field in fields:
+        for column in EXPORT_FIELDS[field]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def build_select(query, table="predictions"):
+    """Return (sql, params, columns) untuk query log terurut terbaru dulu"""
+    where, params = build_where(query)
+    columns = selected_columns(query["fields"])
+    sql = (f"SELECT {', '.join(columns)} FROM {table} {where} "
+           f"ORDER BY timestamp DESC, id DESC")
+    return sql, params, columns
+
+
+def format_log(row, columns, fields):
+    """Ubah satu baris database menjadi dict response sesuai field yang diminta"""
+    values = dict(zip(columns, row))
+    log = {}
+    for field in fields:
+        if field == "glcm_features":
+            log[field] = {column: values[column] for column in EXPORT_FIELDS[field]}
+        else:
+            log[field] = values[field]
+    return log
+
+
+def query_tables(conn, query):
+    """Partisi (terbaru dulu) yang perlu dibaca untuk since/until/cursor query ini"""
+    upper = query["until"]
+    if query["cursor"] is not None and (upper is None or query["cursor"][0] < upper):
+        upper = query["cursor"][0]
+    return tables_for_range(conn, query["since"], upper)
+
+
+def fetch_logs(conn, query):
+    """
+    Ambil satu halaman log. Return (list log, next_cursor);
+    next_cursor None kalau sudah halaman terakhir.
+    """
+    columns = selected_columns(query["fields"])
+    rows = []
+    for table in query_tables(conn, query):
+        sql, params, columns = build_select(query, table)
+        # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+        needed = query["limit"] + 1 - len(rows)
+        rows.extend(conn.execute(f"{sql} LIMIT ?", params + [needed]).fetchall())
+        if len(rows) > query["limit"]:
+            break
+
+    has_more = len(rows) > query["limit"]
+    rows = rows[:query["limit"]]
+
+    logs = [format_log(row, columns, query["fields"]) for row in rows]
+    next_cursor = encode_cursor(rows[-1][0], rows[-1][1]) if has_more and rows else None
+    return logs, next_cursor
+
+
+def iter_log_rows(conn, query, chunk_size=1000):
+    """
+    Generator (columns, rows) per chunk memakai fetchmany, jadi memori tetap
+    konstan berapa pun jumlah baris. Urutan sama seperti fetch_logs.
+    """
+    remaining = query["limit"]
+    for table in query_tables(conn, query):
+        sql, params, columns = build_select(query, table)
+        if remaining:
+            sql += " LIMIT ?"
+            params = params + [remaining]
+
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield columns, rows
+            if remaining:
+                remaining -= len(rows)
+        if query["limit"] and remaining <= 0:
+            break
+
+
+def iter_export(conn, query, fmt='ndjson', chunk_size=1000, chunks=None):
+    """
+    Generator teks NDJSON/CSV per chunk. Kolom timestamp & id selalu ada,
+    sehingga export yang terputus bisa dilanjutkan dengan
+    cursor=encode_cursor(timestamp, id) dari baris terakhir yang diterima.
+    chunks: sumber (columns, rows) lain; default iter_log_rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise QueryError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    if chunks is None:
+        chunks = iter_log_rows(conn, query, chunk_size)
+
+    header_written = False
+    for columns, rows in chunks:
+        if fmt == 'ndjson':
+            yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+            continue
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue()
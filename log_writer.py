@@ -0,0 +1,221 @@
+"""
+Writer log prediksi di background.
+
+Request /predict cukup memasukkan baris ke antrian (bounded) di memori,
+lalu satu thread writer menulisnya ke SQLite dalam transaksi multi-baris
+memakai satu koneksi WAL yang hidup lama. Latency request tidak lagi
+termasuk waktu fsync database.
+
+Thread yang sama menjalankan perawatan database (retention / arsip
+partisi) setiap maintenance_interval detik, jadi tidak pernah bersaing
+dengan tulisan log dari proses yang sama.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PredictionLogWriter:
+    def __init__(self, db_path, insert_rows, max_queue=10000,
+                 flush_interval=0.5, flush_size=200, enqueue_timeout=0.0,
+                 maintenance=None, maintenance_interval=3600.0):
+        """
+        insert_rows(conn, rows): tulis satu batch (dijalankan di dalam transaksi).
+        maintenance(conn): dipanggil berkala di thread writer (opsional).
+        """
+        self.db_path = db_path
+        self.insert_rows = insert_rows
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.enqueue_timeout = enqueue_timeout
+
+        self.max_queue = max_queue
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Condition()
+
+        # Counter untuk monitoring
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    # ------------------------------------
+    # Sisi request
+    # ------------------------------------
+    def start(self):
+        if self._pid is not None and self._pid != os.getpid():
+            # Thread tidak ikut ter-fork (mis. gunicorn preload_app): mulai ulang di proses ini
+            self._thread = None
+            self._reset()
+
+        if self._thread is None:
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="prediction-log-writer",
+                                            daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+        return self
+
+    def submit(self, rows):
+        """
+        Masukkan baris log ke antrian. Return jumlah baris yang diterima;
+        baris yang tidak muat (antrian penuh) dihitung sebagai dropped.
+        """
+        if self._pid != os.getpid():
+            self.start()
+
+        accepted = 0
+        for row in rows:
+            try:
+                if self.enqueue_timeout > 0:
+                    self._queue.put(row, timeout=self.enqueue_timeout)
+                else:
+                    self._queue.put_nowait(row)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+                continue
+            accepted += 1
+
+        with self._lock:
+            self.enqueued += accepted
+        return accepted
+
+    def flush(self, timeout=None):
+        """Tunggu sampai semua baris yang sudah diterima selesai diproses"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self.written + self.failed < self.enqueued:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Flush sisa antrian lalu hentikan thread writer (dipanggil saat shutdown)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        # Antrian bisa penuh: jangan blok selamanya kalau thread writer sudah mati
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    break
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive() or self._queue.qsize():
+            logger.warning("Writer log ditutup dengan %d baris belum tertulis",
+                           self._queue.qsize())
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "backlog": self._queue.qsize(),
+            }
+
+    # ------------------------------------
+    # Thread writer
+    # ------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _maybe_maintain(self, conn):
+        if self.maintenance is None or time.monotonic() < self._next_maintenance:
+            return
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+        try:
+            self.maintenance(conn)
+        except Exception:
+            logger.exception("Perawatan database log gagal")
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+
+        while not stopping:
+            self._maybe_maintain(conn)
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Kumpulkan sampai flush_size atau flush_interval habis
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.flush_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = (self._queue.get(timeout=remaining) if remaining > 0
+                            else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Saat berhenti, ambil semua sisa antrian sekaligus
+            if stopping:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                self._write(conn, batch)
+
+        conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                self.insert_rows(conn, batch)
+            written, failed = len(batch), 0
+        except Exception:
+            # Baris rusak (TypeError, JSON, ...) atau error SQLite: batch dibuang,
+            # thread writer tetap hidup untuk batch berikutnya
+            logger.exception("Gagal menulis %d log prediksi", len(batch))
+            written, failed = 0, len(batch)
+
+        with self._lock:
+            self.written += written
+            self.failed += failed
+            self.batches += 1
+            self._lock.notify_all()
@@ -0,0 +1,254 @@
+"""
+Instrumentasi ringan untuk hot path: durasi per tahap (Server-Timing) dan
+metrik kumulatif dalam format teks Prometheus untuk endpoint /metrics.
+
+Tanpa dependency tambahan. Setiap observasi hanya bisect + increment di
+bawah lock, jadi aman dibiarkan aktif terus di production.
+
+Pemakaian di kode pipeline:
+    with stage('decode'):
+        ...
+Durasi masuk histogram predict_stage_seconds dan, kalau sedang di dalam
+request (begin_request), ikut dikirim di header Server-Timing.
+
+Catatan: metrik disimpan per proses. Dengan beberapa worker gunicorn,
+setiap scrape /metrics hanya melihat worker yang melayani request itu.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# State request yang sedang berjalan (per thread / per context)
+_current_request = contextvars.ContextVar('metrics_request', default=None)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [jumlah per bucket (non-kumulatif) + +Inf, sum]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _render_sample(self, labels, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            label_text = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+        lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            items = sorted((key, ([*counts], total)) for key, (counts, total) in self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+
+# ====================================
+# Metrik aplikasi
+# ====================================
+STAGE_SECONDS = Histogram('predict_stage_seconds',
+                          'Durasi tiap tahap pipeline prediksi', ('stage',))
+REQUEST_SECONDS = Histogram('http_request_duration_seconds',
+                            'Durasi request HTTP', ('endpoint', 'method', 'status'))
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Request yang sedang diproses', ('endpoint',))
+ERRORS = Counter('app_errors_total', 'Error per tipe exception', ('endpoint', 'exception'))
+
+# Perkiraan dari ukuran buffer (gambar PIL, array, pita sementara), bukan hasil ukur:
+# tracemalloc terlalu mahal untuk hot path dan ru_maxrss hanya puncak seumur proses
+DECODE_MEMORY = Histogram('predict_decode_memory_estimate_bytes',
+                          'Perkiraan puncak memori buffer gambar saat decode + grayscale',
+                          buckets=(1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20, 1 << 30))
+
+_metrics = [STAGE_SECONDS, REQUEST_SECONDS, IN_FLIGHT, ERRORS, DECODE_MEMORY]
+_collectors = []
+
+
+def register_metric(metric):
+    """Tambahkan metrik dari modul lain ke output /metrics"""
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector):
+    """
+    collector() dipanggil saat /metrics di-scrape dan mengembalikan list
+    (name, type, help, value) untuk metrik yang nilainya dibaca dari objek lain.
+    """
+    _collectors.append(collector)
+
+
+@contextmanager
+def stage(name):
+    """Ukur satu tahap; masuk histogram dan Server-Timing request aktif"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, name)
+        state = _current_request.get()
+        if state is not None:
+            state["timings"].append((name, duration))
+
+
+def record_memory_estimate(nbytes):
+    """Catat perkiraan puncak buffer gambar; masuk header X-Peak-Memory-Estimate request aktif"""
+    DECODE_MEMORY.observe(nbytes)
+    state = _current_request.get()
+    if state is not None:
+        state["memory_estimate"] = max(state.get("memory_estimate", 0), nbytes)
+
+
+def begin_request(endpoint):
+    """Mulai pencatatan request; return state untuk end_request"""
+    endpoint = endpoint or 'unknown'
+    IN_FLIGHT.inc(endpoint)
+    state = {"endpoint": endpoint, "start": time.perf_counter(), "timings": [],
+             "finished": False}
+    state["token"] = _current_request.set(state)
+    return state
+
+
+def observe_response(state, method, status):
+    """Catat durasi total; return nilai header Server-Timing"""
+    total = time.perf_counter() - state["start"]
+    REQUEST_SECONDS.observe(total, state["endpoint"], method, status)
+    return server_timing(state["timings"] + [("total", total)])
+
+
+def end_request(state, exc=None):
+    """Tutup request (dipanggil sekali, juga kalau ada exception yang lolos)"""
+    if state["finished"]:
+        return
+    state["finished"] = True
+    if exc is not None:
+        ERRORS.inc(state["endpoint"], type(exc).__name__)
+    IN_FLIGHT.dec(state["endpoint"])
+    try:
+        _current_request.reset(state["token"])
+    except ValueError:
+        # Context berbeda (mis. teardown di thread lain); cukup kosongkan
+        _current_request.set(None)
+
+
+def record_error(exc):
+    """Hitung exception yang ditangani route (response 4xx/5xx tetap dikirim)"""
+    state = _current_request.get()
+    ERRORS.inc(state["endpoint"] if state else 'unknown', type(exc).__name__)
+
+
+def server_timing(timings):
+    """[(nama, detik), ...] -> 'decode;dur=1.23, glcm;dur=4.56'"""
+    totals = {}
+    for name, duration in timings:
+        totals[name] = totals.get(name, 0.0) + duration
+    return ', '.join(f'{name};dur={duration * 1000:.2f}' for name, duration in totals.items())
+
+
+def render():
+    """Semua metrik dalam format teks Prometheus"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, metric_type, documentation, value in collector():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,127 @@
+"""
+Micro-batching inferensi untuk /predict (opt-in).
+
+Request yang datang hampir bersamaan masing-masing sudah punya fitur GLCM;
+daripada memanggil predict_proba satu per satu, fitur dikumpulkan oleh satu
+thread batcher selama paling lama max_wait detik (atau sampai max_size
+baris), di-stack menjadi satu matriks, lalu diprediksi dengan satu panggilan
+vektor. Hasil tiap baris dikembalikan ke request yang menunggu.
+
+Batcher dipanggil dari thread request (gunicorn threads), bukan dari pool
+admission control: PREDICT_WORKERS hanya membatasi decode + GLCM, jadi
+ukuran batch bisa melebihi jumlah worker CPU.
+
+Baris dari model yang berbeda (saat hot reload) tidak pernah dicampur dalam
+satu panggilan predict_proba.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import Histogram, register_metric
+
+BATCH_SIZE = register_metric(Histogram(
+    'predict_batch_size', 'Jumlah baris per panggilan predict_proba',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)))
+QUEUE_WAIT = register_metric(Histogram(
+    'predict_batch_queue_wait_seconds', 'Waktu tunggu request di antrian micro-batch',
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)))
+
+
+class MicroBatcher:
+    def __init__(self, max_size=32, max_wait=0.002):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+        self.batches = 0
+        self.rows = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 1
+
+    def _ensure_started(self):
+        # Thread dibuat ulang di proses hasil fork (gunicorn worker)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+            self._pid = os.getpid()
+
+    def predict_proba(self, loaded, features):
+        """
+        Probabilitas untuk satu baris fitur (array 1D) dengan model loaded.
+        Memblok sampai batch tempat baris ini ikut selesai diproses.
+        """
+        if not self.enabled:
+            return loaded.model.predict_proba(np.asarray(features).reshape(1, -1))[0]
+
+        self._ensure_started()
+        future = Future()
+        self._queue.put((loaded, np.asarray(features, dtype=np.float64),
+                         time.perf_counter(), future))
+        return future.result()
+
+    def _collect(self):
+        """Ambil item pertama (blok), lalu tambah item lain sampai max_wait / max_size"""
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+
+            # Kelompokkan per model (hot reload bisa terjadi di tengah batch)
+            groups = {}
+            for item in items:
+                groups.setdefault(id(item[0]), []).append(item)
+
+            for group in groups.values():
+                loaded = group[0][0]
+                for _, _, enqueued, _ in group:
+                    QUEUE_WAIT.observe(started - enqueued)
+                BATCH_SIZE.observe(len(group))
+                try:
+                    probabilities = loaded.model.predict_proba(
+                        np.vstack([features for _, features, _, _ in group]))
+                except Exception as e:
+                    for _, _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                for row, (_, _, _, future) in zip(probabilities, group):
+                    future.set_result(row)
+
+            with self._lock:
+                self.batches += len(groups)
+                self.rows += len(items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_size": self.max_size,
+                "max_wait": self.max_wait,
+                "batches": self.batches,
+                "rows": self.rows,
+                "average_batch_size": self.rows / self.batches if self.batches else 0.0,
+            }
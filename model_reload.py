@@ -0,0 +1,189 @@
+"""
+Hot reload model tanpa restart server.
+
+Model aktif disimpan sebagai satu objek LoadedModel (model + versi) yang
+diganti dengan satu assignment, jadi setiap request yang mengambil
+reloader.current memakai model & versi yang konsisten sampai selesai,
+sementara request berikutnya langsung memakai model baru.
+
+Model baru dideteksi oleh thread watcher (cek mtime/ukuran .pkl dan .npz
+setiap watch_interval detik) atau dipicu manual (POST /admin/reload-model),
+lalu di-load dan divalidasi di luar jalur request:
+  - jumlah fitur sesuai, predict_proba menghasilkan probabilitas valid
+  - kalau ada smoke set (<model>.smoke.npz berisi X dan y, ditulis oleh
+    train_model.py), akurasi model baru tidak boleh turun lebih dari
+    max_accuracy_drop dibanding model aktif.
+Model yang gagal validasi tidak dipakai; model lama tetap melayani request.
+
+Dengan gunicorn setiap worker punya watcher sendiri; endpoint admin hanya
+me-reload worker yang kebetulan melayani request tersebut.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from nb_scorer import file_sha256, load_model
+from prediction_cache import file_signature
+
+N_FEATURES = 4
+
+LoadedModel = namedtuple('LoadedModel', 'model version sha256 path kind loaded_at')
+
+
+def smoke_set_path(model_path):
+    return os.path.splitext(model_path)[0] + '.smoke.npz'
+
+
+def _synthetic_features(n=64, seed=0):
+    """Fitur GLCM sintetis dalam rentang wajar (contrast, correlation, energy, homogeneity)"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform([0.0, -1.0, 0.0, 0.0], [5000.0, 1.0, 1.0, 1.0], size=(n, N_FEATURES))
+
+
+def _accuracy(model, X, y):
+    return float(np.mean(model.classes_[np.argmax(model.predict_proba(X), axis=1)] == y))
+
+
+class ModelReloader:
+    def __init__(self, model_path, use_fast=True, watch_interval=0.0,
+                 max_accuracy_drop=0.05, on_swap=None, logger=None):
+        self.model_path = model_path
+        self.use_fast = use_fast
+        self.watch_interval = watch_interval
+        self.max_accuracy_drop = max_accuracy_drop
+        self.on_swap = on_swap
+        self.logger = logger
+
+        self.current = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watch_pid = None
+
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _log(self, level, message, *args):
+        if self.logger is not None:
+            getattr(self.logger, level)(message, *args)
+
+    def _files_signature(self):
+        npz_path = os.path.splitext(self.model_path)[0] + '.npz'
+        return file_signature(self.model_path), file_signature(npz_path)
+
+    def _load(self):
+        model, warning = load_model(self.model_path, self.use_fast)
+        if warning:
+            self._log('warning', warning)
+        sha256 = file_sha256(self.model_path)
+        return LoadedModel(model=model, version=sha256[:12], sha256=sha256,
+                           path=self.model_path, kind=type(model).__name__,
+                           loaded_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    def load_initial(self):
+        """Load model pertama kali (saat startup, tanpa validasi pembanding)"""
+        with self._reload_lock:
+            self._signature = self._files_signature()
+            self.current = self._load()
+        return self.current
+
+    def validate(self, candidate):
+        """Return list error (kosong kalau model boleh dipakai)"""
+        errors = []
+        model = candidate.model
+        if getattr(model, 'n_features_in_', N_FEATURES) != N_FEATURES:
+            return [f"model expects {model.n_features_in_} features, not {N_FEATURES}"]
+
+        try:
+            X = _synthetic_features()
+            proba = model.predict_proba(X)
+            if proba.shape != (len(X), len(model.classes_)):
+                errors.append(f"predict_proba shape {proba.shape}")
+            elif not np.all(np.isfinite(proba)) or not np.allclose(proba.sum(axis=1), 1.0):
+                errors.append("predict_proba returns invalid probabilities")
+
+            smoke_path = smoke_set_path(self.model_path)
+            if not errors and os.path.exists(smoke_path):
+                with np.load(smoke_path, allow_pickle=False) as smoke:
+                    X_smoke, y_smoke = smoke['X'], smoke['y']
+                if len(X_smoke):
+                    new_accuracy = _accuracy(model, X_smoke, y_smoke)
+                    old_accuracy = (_accuracy(self.current.model, X_smoke, y_smoke)
+                                    if self.current is not None else 0.0)
+                    if new_accuracy < old_accuracy - self.max_accuracy_drop:
+                        errors.append(f"smoke set accuracy {new_accuracy:.3f} < "
+                                      f"active model {old_accuracy:.3f}")
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        return errors
+
+    def reload(self, force=False):
+        """
+        Load + validasi + swap kalau file model berubah (atau force=True).
+        Return dict status: unchanged / reloaded / rejected.
+        """
+        with self._reload_lock:
+            signature = self._files_signature()
+            if not force and signature == self._signature:
+                return {"status": "unchanged", "model_version": self.current.version}
+
+            try:
+                candidate = self._load()
+                errors = self.validate(candidate)
+            except Exception as e:
+                errors = [f"{type(e).__name__}: {e}"]
+
+            # Jangan dicoba ulang terus untuk file yang sama
+            self._signature = signature
+            if errors:
+                self.rejected += 1
+                self.last_error = '; '.join(errors)
+                self._log('error', "Model baru ditolak: %s", self.last_error)
+                return {"status": "rejected", "errors": errors,
+                        "model_version": self.current.version}
+
+            previous = self.current
+            self.current = candidate
+            self.reloads += 1
+            self.last_error = None
+            self._log('info', "Model diganti %s -> %s (%s)",
+                      previous.version if previous else None, candidate.version, candidate.kind)
+
+        if self.on_swap is not None:
+            self.on_swap(candidate)
+        return {"status": "reloaded", "model_version": candidate.version,
+                "previous_version": previous.version if previous else None}
+
+    # ------------------------------------
+    # Watcher
+    # ------------------------------------
+    def ensure_watching(self):
+        """Start thread watcher sekali per proses (aman setelah fork gunicorn)"""
+        if self.watch_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        self._watch_pid = os.getpid()
+        thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                self.reload()
+            except Exception:
+                self._log('exception', "Watcher model gagal")
+
+    def stats(self):
+        current = self.current
+        return {
+            "model_version": current.version if current else None,
+            "model_sha256": current.sha256 if current else None,
+            "model_kind": current.kind if current else None,
+            "loaded_at": current.loaded_at if current else None,
+            "reloads": self.reloads,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
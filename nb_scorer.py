@@ -0,0 +1,95 @@
+"""
+Scorer GaussianNB tanpa scikit-learn.
+
+Parameter model (theta_, var_, class_prior_, classes_) diekspor dari
+models/naive_bayes_glcm.pkl ke file .npz kecil oleh export_model.py.
+Scorer ini menghitung log-likelihood semua kelas untuk 1 atau N baris dalam
+satu ekspresi NumPy, dengan atribut/metode yang sama seperti GaussianNB
+(classes_, predict, predict_proba, predict_log_proba) sehingga app.py bisa
+memakainya langsung tanpa import sklearn dan tanpa overhead validasi.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+PARAM_KEYS = ('theta_', 'var_', 'class_prior_', 'classes_')
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class GaussianNBScorer:
+    def __init__(self, theta, var, class_prior, classes, source_sha256=None):
+        self.theta_ = np.asarray(theta, dtype=np.float64)
+        self.var_ = np.asarray(var, dtype=np.float64)
+        self.class_prior_ = np.asarray(class_prior, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.source_sha256 = source_sha256
+        self.n_features_in_ = self.theta_.shape[1]
+
+        # Bagian log-likelihood yang tidak bergantung pada X, dihitung sekali
+        self._log_norm = (np.log(self.class_prior_)
+                          - 0.5 * np.sum(np.log(2.0 * np.pi * self.var_), axis=1))
+        self._half_inv_var = 0.5 / self.var_
+
+    @classmethod
+    def from_estimator(cls, estimator, source_sha256=None):
+        return cls(estimator.theta_, estimator.var_, estimator.class_prior_,
+                   estimator.classes_, source_sha256)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as params:
+            source_sha256 = str(params['source_sha256']) if 'source_sha256' in params else None
+            return cls(*(params[key] for key in PARAM_KEYS), source_sha256=source_sha256)
+
+    def save(self, path):
+        np.savez(path, theta_=self.theta_, var_=self.var_,
+                 class_prior_=self.class_prior_, classes_=self.classes_,
+                 source_sha256=np.array(self.source_sha256 or ''))
+
+    def _check_input(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects "
+                             f"{self.n_features_in_} features")
+        return X
+
+    def joint_log_likelihood(self, X):
+        """Log-likelihood gabungan (N, kelas) dalam satu ekspresi vektor"""
+        X = self._check_input(X)
+        return self._log_norm - np.einsum(
+            'ncf,cf->nc', (X[:, None, :] - self.theta_) ** 2, self._half_inv_var)
+
+    def predict_log_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        # logsumexp yang stabil
+        top = jll.max(axis=1, keepdims=True)
+        return jll - (top + np.log(np.exp(jll - top).sum(axis=1, keepdims=True)))
+
+    def predict_proba(self, X):
+        return np.exp(self.predict_log_proba(X))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.joint_log_likelihood(X), axis=1)]
+
+
+def load_model(model_path, use_fast=True):
+    """
+    Load model untuk prediksi: scorer NumPy kalau file .npz di sebelah .pkl ada
+    dan masih berasal dari .pkl yang sama, kalau tidak GaussianNB sklearn (joblib).
+    Return (model, pesan peringatan atau None).
+    """
+    fast_path = os.path.splitext(model_path)[0] + '.npz'
+    warning = None
+    if use_fast and os.path.exists(fast_path):
+        scorer = GaussianNBScorer.load(fast_path)
+        if scorer.source_sha256 == file_sha256(model_path):
+            return scorer, None
+        warning = f"{fast_path} sudah tidak cocok dengan {model_path}, jalankan ulang export_model.py"
+
+    import joblib
+    return joblib.load(model_path), warning
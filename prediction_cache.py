@@ -0,0 +1,118 @@
+"""
+Cache hasil prediksi berdasarkan isi gambar (content-addressed).
+
+Key adalah hash blake2b dari bytes upload mentah, jadi gambar yang dikirim
+ulang (retry dari koneksi mobile, demo test_upload.py) langsung dapat fitur,
+probabilitas, dan gambar/grafik yang sudah dirender tanpa decode ulang.
+Eviction LRU dibatasi jumlah entri dan total ukuran, plus TTL per entri.
+Cache dikosongkan otomatis kalau file model berubah.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(image_bytes):
+    """Hash cepat dari bytes gambar mentah"""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+def file_signature(path):
+    """Tanda versi file (mtime + ukuran); None kalau file tidak ada"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class PredictionCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=3600.0,
+                 model_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.model_path = model_path
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._model_signature = file_signature(model_path) if model_path else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _check_model(self):
+        """Kosongkan cache kalau file model berganti sejak entri disimpan"""
+        if not self.model_path:
+            return
+        signature = file_signature(self.model_path)
+        if signature != self._model_signature:
+            self._clear_locked()
+            self._model_signature = signature
+            self.invalidations += 1
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_model()
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, size=0):
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_model()
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._total_bytes += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._total_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,203 @@
+"""
+Penyimpanan probabilitas per kelas dalam format yang bisa di-query SQLite.
+
+Kolom all_probabilities dulu berisi str(list of dict) (repr Python) yang
+harus di-parse di Python. Sekarang isinya objek JSON ringkas
+{"hama_keong": 0.01, "hama_kutu": 0.97, ...}, sehingga analisis bisa
+langsung di SQLite dengan JSON1, mis.:
+
+    SELECT COUNT(*) FROM predictions
+    WHERE json_extract(all_probabilities, '$.hama_kutu') > 0.4
+
+Repr lama bisa berisi scalar numpy (np.str_('sehat'), np.float64(0.5));
+pembungkus itu dibuka sebelum literal_eval. Baris yang tetap tidak bisa
+dibaca dibiarkan apa adanya (tidak pernah ditimpa NULL) dan dilewati oleh
+query JSON lewat json_valid.
+
+Migrasi baris lama dijalankan oleh init_database sampai semua baris berhasil
+dikonversi (lalu ditandai dengan PRAGMA user_version), atau manual:
+
+    python probability_store.py --migrate
+    python probability_store.py --mean
+    python probability_store.py --min hama_kutu 0.4
+"""
+import argparse
+import ast
+import json
+import os
+import sqlite3
+
+from log_partitions import storage_tables
+
+# Versi skema setelah all_probabilities dimigrasi ke JSON
+SCHEMA_VERSION_JSON_PROBABILITIES = 1
+
+MIGRATE_CHUNK = 5000
+
+# Pembungkus scalar numpy yang muncul di repr lama, mis. np.str_('sehat')
+_NUMPY_SCALARS = {'str_', 'bytes_', 'bool_', 'float16', 'float32', 'float64',
+                  'int8', 'int16', 'int32', 'int64', 'uint8', 'uint16', 'uint32', 'uint64'}
+
+
+def encode_probabilities(probability_data):
+    """[{"class": c, "probability": p}, ...] -> '{"c":p,...}'"""
+    return json.dumps({str(p["class"]): float(p["probability"]) for p in probability_data},
+                      separators=(',', ':'))
+
+
+def probability_path(class_name):
+    """Path JSON untuk satu kelas (di-bind sebagai parameter, aman untuk nama apa pun)"""
+    return '$."' + class_name.replace('"', '\\"') + '"'
+
+
+class _UnwrapNumpyScalars(ast.NodeTransformer):
+    """np.str_(x) / numpy.float64(x) -> x; panggilan lain ditolak oleh literal_eval"""
+
+    def visit_Call(self, node):
+        func = node.func
+        if (isinstance(func, ast.Attribute) and func.attr in _NUMPY_SCALARS
+                and isinstance(func.value, ast.Name) and func.value.id in ('np', 'numpy')
+                and len(node.args) == 1 and not node.keywords):
+            return self.visit(node.args[0])
+        return node
+
+
+def _legacy_to_json(text):
+    """Ubah repr list of dict lama menjadi JSON; None kalau tidak bisa dibaca"""
+    try:
+        tree = _UnwrapNumpyScalars().visit(ast.parse(text, mode='eval'))
+        return encode_probabilities(ast.literal_eval(tree))
+    except (ValueError, SyntaxError, TypeError, KeyError, RecursionError):
+        return None
+
+
+def migrate_probabilities(conn, table='predictions'):
+    """
+    Konversi all_probabilities format lama (repr Python) ke JSON, per chunk.
+    table: tabel fisik (bukan view predictions kalau log sudah dipartisi).
+    Baris yang tidak bisa dibaca tidak diubah.
+    Return (jumlah baris dikonversi, jumlah baris dilewati).
+    """
+    converted = skipped = 0
+    last_rowid = 0
+    while True:
+        rows = conn.execute(f'''
+            SELECT rowid, all_probabilities FROM {table}
+            WHERE rowid > ? AND all_probabilities IS NOT NULL
+              AND NOT json_valid(all_probabilities)
+            ORDER BY rowid
+            LIMIT ?
+        ''', (last_rowid, MIGRATE_CHUNK)).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for rowid, text in rows:
+            encoded = _legacy_to_json(text)
+            if encoded is None:
+                skipped += 1
+            else:
+                updates.append((encoded, rowid))
+        with conn:
+            conn.executemany(f'UPDATE {table} SET all_probabilities = ? WHERE rowid = ?',
+                             updates)
+        converted += len(updates)
+        last_rowid = rows[-1][0]
+
+    return converted, skipped
+
+
+def migrate_all(conn):
+    """Migrasi semua tabel fisik log. Return (dikonversi, dilewati)."""
+    converted = skipped = 0
+    for table in storage_tables(conn):
+        table_converted, table_skipped = migrate_probabilities(conn, table)
+        converted += table_converted
+        skipped += table_skipped
+    return converted, skipped
+
+
+def ensure_json_probabilities(conn):
+    """
+    Jalankan migrasi sampai tuntas (dicek lewat PRAGMA user_version). Versi
+    hanya dinaikkan kalau tidak ada baris yang dilewati, supaya baris itu
+    dicoba lagi di startup berikutnya. Return (dikonversi, dilewati).
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION_JSON_PROBABILITIES:
+        return 0, 0
+
+    converted, skipped = migrate_all(conn)
+    if not skipped:
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION_JSON_PROBABILITIES}')
+        conn.commit()
+    return converted, skipped
+
+
+def class_probability_means(conn, classes):
+    """Rata-rata probabilitas tiap kelas, dihitung di SQLite"""
+    columns = ', '.join('AVG(json_extract(all_probabilities, ?))' for _ in classes)
+    row = conn.execute(f'''
+        SELECT {columns} FROM (
+            SELECT CASE WHEN json_valid(all_probabilities) THEN all_probabilities END
+                AS all_probabilities
+            FROM predictions
+        )
+    ''',
+                       [probability_path(c) for c in classes]).fetchone()
+    return dict(zip(classes, row))
+
+
+def count_min_probability(conn, class_name, min_probability):
+    """Jumlah baris dengan probabilitas kelas >= min_probability"""
+    return conn.execute('''
+        SELECT COUNT(*) FROM predictions
+        WHERE CASE WHEN json_valid(all_probabilities) THEN json_extract(all_probabilities, ?) END >= ?
+    ''', (probability_path(class_name), min_probability)).fetchone()[0]
+
+
+def stored_classes(conn):
+    """Daftar kelas yang muncul di all_probabilities"""
+    rows = conn.execute('''
+        SELECT DISTINCT key FROM predictions, json_each(predictions.all_probabilities)
+        WHERE json_valid(predictions.all_probabilities)
+        ORDER BY key
+    ''').fetchall()
+    return [row[0] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probabilitas per kelas di database log")
+    parser.add_argument('--db', default=os.environ.get('PREDICTION_DB', 'prediction_logs.db'))
+    parser.add_argument('--migrate', action='store_true',
+                        help='Konversi baris format lama ke JSON')
+    parser.add_argument('--mean', action='store_true', help='Rata-rata probabilitas per kelas')
+    parser.add_argument('--min', nargs=2, metavar=('KELAS', 'PROBABILITAS'),
+                        help='Hitung baris dengan probabilitas kelas >= nilai')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+
+    if args.migrate:
+        converted, skipped = migrate_all(conn)
+        print(f"✅ {converted} baris dikonversi ke JSON")
+        if skipped:
+            print(f"⚠️  {skipped} baris tidak bisa dibaca, dibiarkan apa adanya")
+        else:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION_JSON_PROBABILITIES}')
+            conn.commit()
+
+    if args.mean:
+        for class_name, mean in class_probability_means(conn, stored_classes(conn)).items():
+            print(f"  {class_name}: {mean:.4f}")
+
+    if args.min:
+        class_name, min_probability = args.min[0], float(args.min[1])
+        count = count_min_probability(conn, class_name, min_probability)
+        print(f"  {class_name} >= {min_probability}: {count} baris")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
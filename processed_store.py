@@ -0,0 +1,139 @@
+"""
+Penyimpanan gambar grayscale hasil preprocessing secara lazy.
+
+/predict tidak lagi meng-encode gambar grayscale ke JPEG + base64. Bytes
+upload asli disimpan sementara di disk per hash isi (upload identik berbagi
+satu file dan tidak ditulis ulang); per log_id hanya ditulis alias kecil
+<log_id>.ref berisi hash itu. JPEG grayscale baru dibuat saat client memanggil
+GET /predictions/<log_id>/processed atau GET /processed/<digest> (lalu disimpan
+juga per hash + ukuran maksimum). File lama <log_id>.src tetap bisa dibaca.
+Total ukuran folder dibatasi; file paling lama dibuang lebih dulu.
+"""
+import os
+import re
+import threading
+import uuid
+
+# Hash isi dari prediction_cache.content_key (blake2b 16 byte, hex)
+_DIGEST_RE = re.compile(r'[0-9a-f]{32}')
+
+
+class ProcessedImageStore:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+        self.evictions = 0
+
+    @staticmethod
+    def valid_log_id(log_id):
+        """log_id harus UUID supaya tidak bisa dipakai untuk path traversal"""
+        try:
+            return str(uuid.UUID(log_id)) == log_id
+        except (ValueError, TypeError):
+            return False
+
+    @staticmethod
+    def valid_digest(digest):
+        return isinstance(digest, str) and _DIGEST_RE.fullmatch(digest) is not None
+
+    def source_path(self, key):
+        return os.path.join(self.directory, f"{key}.src")
+
+    def alias_path(self, log_id):
+        return os.path.join(self.directory, f"{log_id}.ref")
+
+    def rendered_path(self, key, max_dim):
+        return os.path.join(self.directory, f"{key}.{max_dim}.jpg")
+
+    def put_source(self, digest, image_bytes):
+        """
+        Simpan bytes upload asli (key = hash isi) untuk dirender nanti.
+        File yang sudah ada pasti isinya sama, jadi tidak ditulis ulang.
+        Return True kalau file baru ditulis.
+        """
+        path = self.source_path(digest)
+        if os.path.exists(path):
+            return False
+        self._write(path, image_bytes)
+        return True
+
+    def put_alias(self, log_id, digest):
+        """Catat hash isi sumber untuk log_id (beberapa byte, bukan salinan gambar)"""
+        self._write(self.alias_path(log_id), digest.encode('ascii'))
+
+    def resolve(self, log_id):
+        """Key sumber untuk log_id: hash isi lewat alias, atau log_id sendiri (file lama)"""
+        data = self._read(self.alias_path(log_id))
+        if data is not None:
+            digest = data.decode('ascii', 'replace')
+            if self.valid_digest(digest):
+                return digest
+        return log_id
+
+    def read_source(self, key):
+        return self._read(self.source_path(key))
+
+    def put_rendered(self, key, max_dim, jpeg_bytes):
+        self._write(self.rendered_path(key, max_dim), jpeg_bytes)
+
+    def read_rendered(self, key, max_dim):
+        return self._read(self.rendered_path(key, max_dim))
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path, data):
+        # Tulis ke file sementara lalu rename supaya pembaca tidak lihat file setengah jadi
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        """List (mtime, path, size) semua file di folder"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.path, st.st_size))
+        return entries
+
+    def _evict(self):
+        """Buang file paling lama sampai total di bawah 90% batas"""
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+        self._total_bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,278 @@
+"""
+Benchmark per tahap pipeline /predict dengan gambar sintetis yang deterministik.
+
+Tahap yang diukur (sama dengan jalur di app.py):
+    decode            Image.open + np.array (resolusi penuh)
+    rgb2gray          to_grayscale_uint8 (fixed-point)
+    graycomatrix      glcm.glcm_counts
+    graycoprops       glcm.normalize_glcm + glcm.glcm_props
+    predict_proba     model.predict_proba (satu baris)
+    chart             render grafik probabilitas PNG (tanpa cache)
+    jpeg_encode       gambar grayscale -> JPEG (seperti /processed/<digest>)
+    save_log          save_prediction_log (masuk antrian writer)
+    json              serialisasi response JSON
+
+Gambar: daun sintetis (elips hijau dengan tulang daun + noise) ukuran
+0.3, 2 dan 12 MP dalam mode RGB, RGBA dan L. Kalau satu tahap gagal untuk
+suatu kombinasi, error dicatat dan tahap berikutnya dilewati.
+
+Contoh:
+    python stage_bench.py --save stage_baseline.json
+    python stage_bench.py --compare stage_baseline.json --max-slowdown 0.25
+    python stage_bench.py --sizes 0.3 --modes RGB --repeat 10
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+SIZES_MP = (0.3, 2, 12)
+MODES = ('RGB', 'RGBA', 'L')
+STAGES = ('decode', 'rgb2gray', 'graycomatrix', 'graycoprops', 'predict_proba',
+          'chart', 'jpeg_encode', 'save_log', 'json')
+
+# Selisih absolut minimum (ms) sebelum dianggap regresi, supaya tahap
+# yang sangat cepat tidak gagal karena noise timer
+MIN_DELTA_MS = 1.0
+
+
+def synthetic_leaf(megapixels, mode, seed=0):
+    """Gambar daun sintetis 4:3 sebagai bytes (PNG untuk RGBA, JPEG untuk lainnya)"""
+    height = int(round((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = int(round(height * 4 / 3))
+    rng = np.random.default_rng(seed)
+
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    cy, cx = height / 2, width / 2
+    leaf = ((x - cx) / (width * 0.45)) ** 2 + ((y - cy) / (height * 0.35)) ** 2 <= 1
+
+    # Tulang daun: garis tengah + cabang diagonal
+    veins = np.abs(y - cy) < height * 0.004
+    veins |= (np.abs((x - cx) % (width / 8) - np.abs(y - cy) * 0.6) < width * 0.003)
+
+    shade = 0.75 + 0.25 * np.sin(x / width * 6.0) * np.cos(y / height * 4.0)
+    noise = rng.normal(0, 12, (height, width)).astype(np.float32)
+
+    rgb = np.empty((height, width, 3), dtype=np.float32)
+    rgb[..., 0] = 60 * shade + noise
+    rgb[..., 1] = 150 * shade + noise
+    rgb[..., 2] = 50 * shade + noise
+    rgb[veins & leaf] = (170, 200, 120)
+    rgb[~leaf] = (235, 230, 220) + noise[~leaf, None] * 0.3
+    image = Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), 'RGB')
+
+    buffer = io.BytesIO()
+    if mode == 'RGBA':
+        alpha = Image.fromarray(np.where(leaf, 255, 0).astype(np.uint8), 'L')
+        image.putalpha(alpha)
+        image.save(buffer, format='PNG')
+    else:
+        image.convert(mode).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def _load_app():
+    """Import app dengan database & folder processed sementara"""
+    tmp = tempfile.mkdtemp(prefix='stage_bench_')
+    os.environ['PREDICTION_DB'] = os.path.join(tmp, 'bench.db')
+    os.environ['PROCESSED_DIR'] = os.path.join(tmp, 'processed')
+    # Path model di app.py relatif terhadap folder project
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import app
+    return app
+
+
+def run_stages(app, image_bytes):
+    """Jalankan semua tahap sekali. Return (dict detik per tahap, error atau None)"""
+    import glcm
+    from ingest import to_grayscale_uint8
+
+    timings = {}
+    state = {}
+
+    def decode():
+        state['array'] = np.array(Image.open(io.BytesIO(image_bytes)))
+
+    def rgb2gray():
+        state['gray'] = to_grayscale_uint8(state['array'])
+
+    def graycomatrix():
+        state['counts'] = glcm.glcm_counts(state['gray'])
+
+    def graycoprops():
+        props = glcm.glcm_props(glcm.normalize_glcm(state['counts']))
+        state['features'] = [float(v) for v in props.mean(axis=1)]
+
+    def predict_proba():
+        state['loaded'] = app.current_model()
+        state['probabilities'] = state['loaded'].model.predict_proba(
+            np.array(state['features']).reshape(1, -1))[0]
+
+    def chart():
+        data = app.build_prediction_data(state['features'], state['probabilities'],
+                                         state['loaded'])
+        probs = tuple(round(p['probability'], 3) for p in data['probabilities'])
+        classes = tuple(str(p['class']) for p in data['probabilities'])
+        # Lewati chart_cache supaya yang diukur adalah render sebenarnya
+        data['chart'] = app._render_chart_png(classes, probs)
+        state['data'] = data
+
+    def jpeg_encode():
+        gray_pil = Image.fromarray(state['gray'])
+        gray_pil.thumbnail((app.PROCESSED_MAX_DIM, app.PROCESSED_MAX_DIM))
+        gray_pil.save(io.BytesIO(), format='JPEG')
+
+    def save_log():
+        state['data']['log_id'] = app.save_prediction_log(state['data'], 'stage_bench.jpg')
+
+    def to_json():
+        json.dumps(state['data'])
+
+    steps = (decode, rgb2gray, graycomatrix, graycoprops, predict_proba,
+             chart, jpeg_encode, save_log, to_json)
+    for name, step in zip(STAGES, steps):
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            return timings, f"{name}: {type(e).__name__}: {e}"
+        timings[name] = time.perf_counter() - start
+
+    return timings, None
+
+
+def bench_case(app, megapixels, mode, repeat):
+    """Median ms per tahap untuk satu kombinasi ukuran + mode"""
+    image_bytes = synthetic_leaf(megapixels, mode)
+    runs = []
+    error = None
+    for _ in range(repeat):
+        timings, error = run_stages(app, image_bytes)
+        runs.append(timings)
+        if error:
+            break
+
+    stages = {name: statistics.median(run[name] for run in runs) * 1000
+              for name in STAGES if all(name in run for run in runs)}
+    result = {"bytes": len(image_bytes), "stages_ms": stages,
+              "total_ms": sum(stages.values())}
+    if error:
+        result["error"] = error
+    return result
+
+
+def run_suite(sizes, modes, repeat):
+    app = _load_app()
+    app.warmup()
+
+    results = {}
+    for megapixels in sizes:
+        for mode in modes:
+            key = f"{mode}_{megapixels}mp"
+            results[key] = bench_case(app, megapixels, mode, repeat)
+            status = f"  ⚠️  {results[key]['error']}" if 'error' in results[key] else ''
+            print(f"  {key:<12} {results[key]['total_ms']:9.1f} ms{status}", file=sys.stderr)
+
+    app.log_writer.flush(5)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, max_slowdown, min_delta_ms=MIN_DELTA_MS):
+    """
+    Bandingkan hasil dengan baseline. Return list regresi (kosong kalau lolos):
+    tahap yang lebih lambat dari (1 + max_slowdown) x baseline dan selisih
+    >= min_delta_ms, atau tahap yang dulu jalan tetapi sekarang gagal.
+    """
+    regressions = []
+    for key, base in baseline["results"].items():
+        if key not in current["results"]:
+            continue
+        now = current["results"][key]
+        for stage, base_ms in base["stages_ms"].items():
+            if stage not in now["stages_ms"]:
+                regressions.append(f"{key} {stage}: gagal ({now.get('error')})")
+                continue
+            now_ms = now["stages_ms"][stage]
+            if now_ms > base_ms * (1 + max_slowdown) and now_ms - base_ms >= min_delta_ms:
+                regressions.append(f"{key} {stage}: {base_ms:.2f} -> {now_ms:.2f} ms "
+                                   f"(+{(now_ms / base_ms - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_table(report, baseline=None):
+    for key, result in report["results"].items():
+        print(f"\n{key} ({result['bytes'] / 1024:.0f} KB)")
+        base = baseline["results"].get(key, {}).get("stages_ms", {}) if baseline else {}
+        for stage, ms in result["stages_ms"].items():
+            line = f"  {stage:<14} {ms:9.2f} ms"
+            if stage in base and base[stage]:
+                line += f"   baseline {base[stage]:9.2f} ms ({(ms / base[stage] - 1) * 100:+.0f}%)"
+            print(line)
+        if 'error' in result:
+            print(f"  ⚠️  {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pipeline /predict")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in SIZES_MP),
+                        help='Ukuran gambar dalam megapixel, pisahkan dengan koma')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', help='Simpan hasil sebagai baseline JSON')
+    parser.add_argument('--compare', help='Bandingkan dengan baseline JSON')
+    parser.add_argument('--max-slowdown', type=float, default=0.25,
+                        help='Batas perlambatan relatif per tahap (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=MIN_DELTA_MS)
+    args = parser.parse_args()
+
+    sizes = [float(s) for s in args.sizes.split(',')]
+    modes = [m.strip() for m in args.modes.split(',')]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"mode tidak dikenal: {', '.join(unknown)}")
+
+    report = run_suite(sizes, modes, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print_table(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Baseline disimpan ke {args.save}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.max_slowdown, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regresi (> {args.max_slowdown * 100:.0f}%):")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print(f"\n✅ Tidak ada regresi (> {args.max_slowdown * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark cold start API: waktu import app.py, load model, warmup, dan
+latency request /predict pertama & kedua.
+
+Setiap run memakai proses Python baru dan database sementara, jadi
+prediction_logs.db tidak tersentuh.
+
+Contoh:
+    python startup_bench.py --runs 5
+    python startup_bench.py --no-warmup     # bandingkan tanpa warmup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Dijalankan di proses anak; mencetak satu baris JSON
+CHILD_SCRIPT = r'''
+import io, json, sys, time
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+
+if WARMUP:
+    app.warmup()
+
+import numpy as np
+from PIL import Image
+
+def synthetic_jpeg(seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+client = app.app.test_client()
+latencies = []
+for seed in (1, 2):
+    image = synthetic_jpeg(seed)
+    start = time.perf_counter()
+    response = client.post('/predict', data={'image': (io.BytesIO(image), 'bench.jpg')},
+                           content_type='multipart/form-data')
+    latencies.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+print(json.dumps({
+    "import_app": import_seconds,
+    "model_load": app.startup_timings.get('model_load'),
+    "warmup": app.startup_timings.get('warmup', 0.0),
+    "first_request": latencies[0],
+    "second_request": latencies[1],
+}))
+'''
+
+
+def run_once(warmup):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   PREDICTION_DB=os.path.join(tmp, 'bench.db'),
+                   PROCESSED_DIR=os.path.join(tmp, 'processed'))
+        script = f"WARMUP = {bool(warmup)}\n" + CHILD_SCRIPT
+        output = subprocess.run([sys.executable, '-c', script], env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start API")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-warmup', action='store_true', help='Lewati warmup sebelum request')
+    parser.add_argument('--json', help='Simpan hasil ke file JSON')
+    args = parser.parse_args()
+
+    runs = [run_once(not args.no_warmup) for _ in range(args.runs)]
+    summary = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+    print(f"⏱️  Cold start ({args.runs} run, median, warmup={'off' if args.no_warmup else 'on'})")
+    for key, seconds in summary.items():
+        print(f"  {key:<15} {seconds * 1000:9.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"runs": runs, "median": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Agregat (rollup) log prediksi yang diperbarui setiap insert.
+
+Trigger AFTER INSERT pada setiap partisi log (log_partitions.py) menambah
+jumlah & total confidence per label, serta jumlah per kelas per jam dan
+per hari.
+/stats cukup membaca tabel kecil ini (O(jumlah kelas)) tanpa scan tabel log.
+
+Hitung ulang rollup dari log mentah:
+    python stats_rollup.py --rebuild
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+# Panjang prefix timestamp ISO untuk tiap granularitas bucket
+BUCKETS = {
+    "hour": 13,   # 2026-10-18T11
+    "day": 10,    # 2026-10-18
+}
+
+ROLLUP_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS prediction_label_stats (
+        prediction_label TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        confidence_sum REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS prediction_time_buckets (
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        prediction_label TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        confidence_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket, prediction_label)
+    )
+    ''',
+]
+
+_BUCKET_UPSERTS = '\n'.join(f'''
+        INSERT INTO prediction_time_buckets
+            (granularity, bucket, prediction_label, count, confidence_sum)
+        VALUES ('{name}', substr(NEW.timestamp, 1, {length}), NEW.prediction_label, 1, NEW.confidence)
+        ON CONFLICT (granularity, bucket, prediction_label) DO UPDATE SET
+            count = count + 1,
+            confidence_sum = confidence_sum + excluded.confidence_sum;''' for name, length in BUCKETS.items())
+
+
+def rollup_trigger(table):
+    """SQL trigger rollup untuk satu tabel log (satu trigger per partisi)"""
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup
+    AFTER INSERT ON {table}
+    WHEN NEW.prediction_label IS NOT NULL AND NEW.timestamp IS NOT NULL
+    BEGIN
+        INSERT INTO prediction_label_stats (prediction_label, count, confidence_sum)
+        VALUES (NEW.prediction_label, 1, NEW.confidence)
+        ON CONFLICT (prediction_label) DO UPDATE SET
+            count = count + 1,
+            confidence_sum = confidence_sum + excluded.confidence_sum;
+        {_BUCKET_UPSERTS}
+    END
+    '''
+
+
+def init_rollups(cursor):
+    """
+    Buat tabel rollup (trigger dipasang per partisi oleh log_partitions).
+    Kalau tabel rollup baru dibuat sementara log sudah berisi data, rollup
+    langsung dihitung dari log yang ada.
+    """
+    existing = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prediction_label_stats'"
+    ).fetchone()
+
+    for sql in ROLLUP_SCHEMA:
+        cursor.execute(sql)
+
+    if not existing:
+        rebuild_rollups(cursor)
+
+
+def rebuild_rollups(cursor, source="predictions"):
+    """
+    Hitung ulang semua rollup dari log mentah (view predictions). Partisi yang
+    sudah dihapus / diarsip tidak lagi ikut terhitung.
+    """
+    cursor.execute("DELETE FROM prediction_label_stats")
+    cursor.execute("DELETE FROM prediction_time_buckets")
+
+    cursor.execute(f'''
+        INSERT INTO prediction_label_stats (prediction_label, count, confidence_sum)
+        SELECT prediction_label, COUNT(*), TOTAL(confidence)
+        FROM {source}
+        WHERE prediction_label IS NOT NULL
+        GROUP BY prediction_label
+    ''')
+
+    for name, length in BUCKETS.items():
+        cursor.execute(f'''
+            INSERT INTO prediction_time_buckets
+                (granularity, bucket, prediction_label, count, confidence_sum)
+            SELECT '{name}', substr(timestamp, 1, {length}), prediction_label,
+                   COUNT(*), TOTAL(confidence)
+            FROM {source}
+            WHERE prediction_label IS NOT NULL AND timestamp IS NOT NULL
+            GROUP BY substr(timestamp, 1, {length}), prediction_label
+        ''')
+
+
+def read_totals(cursor):
+    """Return (total, rata-rata confidence, [(label, count), ...] urut count terbesar)"""
+    class_counts = cursor.execute('''
+        SELECT prediction_label, count
+        FROM prediction_label_stats
+        WHERE count > 0
+        ORDER BY count DESC
+    ''').fetchall()
+
+    total, confidence_sum = cursor.execute(
+        'SELECT TOTAL(count), TOTAL(confidence_sum) FROM prediction_label_stats'
+    ).fetchone()
+    total = int(total)
+
+    return total, (confidence_sum / total if total else 0), class_counts
+
+
+def read_time_series(cursor, granularity="day", since=None, until=None):
+    """
+    Jumlah per kelas per bucket waktu, urut dari bucket terlama.
+    since/until: timestamp ISO (until eksklusif).
+    """
+    if granularity not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+
+    length = BUCKETS[granularity]
+    clauses = ["granularity = ?"]
+    params = [granularity]
+    if since:
+        clauses.append("bucket >= ?")
+        params.append(since[:length])
+    if until:
+        clauses.append("bucket < ?")
+        params.append(until[:length])
+
+    rows = cursor.execute(f'''
+        SELECT bucket, prediction_label, count, confidence_sum
+        FROM prediction_time_buckets
+        WHERE {' AND '.join(clauses)}
+        ORDER BY bucket
+    ''', params).fetchall()
+
+    series = []
+    for bucket, label, count, confidence_sum in rows:
+        if not series or series[-1]["bucket"] != bucket:
+            series.append({"bucket": bucket, "total": 0, "confidence_sum": 0.0, "counts": {}})
+        point = series[-1]
+        point["counts"][label] = count
+        point["total"] += count
+        point["confidence_sum"] += confidence_sum
+
+    for point in series:
+        point["average_confidence"] = point.pop("confidence_sum") / point["total"]
+
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola rollup statistik prediksi")
+    parser.add_argument('--db', default=os.environ.get('PREDICTION_DB', 'prediction_logs.db'))
+    parser.add_argument('--rebuild', action='store_true', help='Hitung ulang rollup dari log mentah')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    with conn:
+        init_rollups(conn.cursor())
+        if args.rebuild:
+            start = datetime.now()
+            rebuild_rollups(conn.cursor())
+            print(f"✅ Rollup dihitung ulang dalam {(datetime.now() - start).total_seconds():.2f} s")
+
+    total, avg_confidence, class_counts = read_totals(conn.cursor())
+    print(f"Total prediksi: {total}, rata-rata confidence: {avg_confidence:.3f}")
+    for label, count in class_counts:
+        print(f"  {label}: {count}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
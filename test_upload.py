@@ -1,6 +1,6 @@
 from flask import Flask, render_template_string, request, redirect, url_for, flash
 import requests
-import base64
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime
 import os
@@ -11,6 +11,15 @@ app.secret_key = 'your-secret-key-here'
 # URL API utama
 API_BASE_URL = 'http://127.0.0.1:5000'
 
+# Cara kirim gambar ke /predict: 'raw' (body application/octet-stream / image/*)
+# atau 'multipart' (field 'image'). Keduanya tanpa base64.
+UPLOAD_MODE = os.environ.get('UPLOAD_MODE', 'raw')
+
+# Satu session untuk semua request: koneksi keep-alive dipakai ulang (connection pool)
+api_session = requests.Session()
+api_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+api_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
 # Template HTML untuk upload
 UPLOAD_TEMPLATE = '''
 <!DOCTYPE html>
@@ -210,17 +219,10 @@ UPLOAD_TEMPLATE = '''
         
         {% if result %}
         <div class="result">
-            <h2>🖼️ Perbandingan Gambar</h2>
+            <h2>🖼️ Hasil Preprocessing</h2>
             <div class="image-comparison">
                 <div class="image-container">
-                    <img src="data:image/jpeg;base64,{{ result.original_image }}" alt="Gambar Asli">
-                    <div class="image-label">📸 Gambar Input</div>
-                </div>
-                
-                <div class="arrow">➡️</div>
-                
-                <div class="image-container">
-                    <img src="data:image/jpeg;base64,{{ result.processed_image }}" alt="Gambar Grayscale">
+                    <img src="{{ API_BASE_URL }}{{ result.processed_image_url }}" alt="Gambar Grayscale">
                     <div class="image-label">⚫ Hasil Preprocessing</div>
                 </div>
             </div>
@@ -333,22 +335,26 @@ def test_upload():
                 flash('Tidak ada file yang dipilih!')
                 return redirect(request.url)
             
-            # Konversi gambar ke base64
-            image_data = file.read()
-            base64_image = base64.b64encode(image_data).decode('utf-8')
-            
-            # Kirim ke API predict
-            response = requests.post(
-                f'{API_BASE_URL}/predict',
-                headers={'Content-Type': 'application/json'},
-                json={'image_base64': base64_image},
-                timeout=30
-            )
+            # Kirim bytes gambar apa adanya (stream file upload, tanpa base64)
+            params = {'include': 'processed_image'}
+            if UPLOAD_MODE == 'multipart':
+                response = api_session.post(
+                    f'{API_BASE_URL}/predict',
+                    params=params,
+                    files={'image': (file.filename, file.stream, file.mimetype)},
+                    timeout=30
+                )
+            else:
+                response = api_session.post(
+                    f'{API_BASE_URL}/predict',
+                    params=params,
+                    headers={'Content-Type': file.mimetype or 'application/octet-stream'},
+                    data=file.stream,
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
-                # Tambahkan gambar original untuk ditampilkan
-                result['original_image'] = base64_image
                 flash(f'✅ Prediksi berhasil! Hasil: {result["prediction_label"]} (Confidence: {result["confidence"]*100:.1f}%)')
                 return render_template_string(UPLOAD_TEMPLATE, result=result, API_BASE_URL=API_BASE_URL)
             else:
@@ -366,7 +372,7 @@ def test_upload():
 def view_logs():
     """Lihat semua log dari database via API"""
     try:
-        response = requests.get(f'{API_BASE_URL}/logs', timeout=10)
+        response = api_session.get(f'{API_BASE_URL}/logs', timeout=10)
         if response.status_code == 200:
             data = response.json()
             logs = data.get('logs', [])
@@ -380,7 +386,7 @@ def view_logs():
 def view_stats():
     """Lihat statistik dari database via API"""
     try:
-        response = requests.get(f'{API_BASE_URL}/stats', timeout=10)
+        response = api_session.get(f'{API_BASE_URL}/stats', timeout=10)
         if response.status_code == 200:
             data = response.json()
             
@@ -438,7 +444,7 @@ def view_stats():
 def test_api():
     """Test koneksi ke API utama"""
     try:
-        response = requests.get(f'{API_BASE_URL}/', timeout=5)
+        response = api_session.get(f'{API_BASE_URL}/', timeout=5)
         if response.status_code == 200:
             return f"✅ API Connected: {response.text}"
         else:
@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Modul aplikasi berada di root repo (tanpa package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """Import app dengan database log & direktori cache sementara (bukan milik repo)"""
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ["PREDICTION_DB"] = str(tmp / "prediction_logs.db")
+    os.environ["PROCESSED_DIR"] = str(tmp / "processed_cache")
+    os.environ["LOG_ARCHIVE_DIR"] = str(tmp / "log_archive")
+    os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+    # Path model di app relatif terhadap root repo
+    os.chdir(ROOT)
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
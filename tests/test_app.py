@@ -0,0 +1,676 @@
+import io
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+@pytest.mark.parametrize("endpoint", ["/predict", "/predict/batch"])
+@pytest.mark.parametrize("body", ['[1, 2, 3]', '"text"', '42', 'null'])
+def test_json_body_must_be_object(client, endpoint, body):
+    response = client.post(endpoint, data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "JSON body must be an object", "status": "error"}
+
+
+def _jpeg_bytes(size=(64, 64), seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (*size, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def test_single_and_batch_results_have_same_shape(app_module):
+    image = _jpeg_bytes()
+    single = app_module.classify_image(image)
+    batch = app_module.extract_features_batch([image])[0]
+    loaded = app_module.current_model()
+    probabilities = loaded.model.predict_proba([batch])[0]
+    expected = app_module.build_prediction_data(batch, probabilities, loaded)
+
+    assert {key: single[key] for key in expected} == expected
+    assert single["status"] == "success"
+
+
+def _sources(store):
+    return {name for name in os.listdir(store.directory) if name.endswith('.src')}
+
+
+def _predict_raw(client, image):
+    response = client.post('/predict?include=processed_image', data=image,
+                           content_type='application/octet-stream')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_identical_uploads_share_one_stored_source(app_module, client):
+    image = _jpeg_bytes(seed=6)
+    store = app_module.processed_store
+    before = _sources(store)
+
+    first = _predict_raw(client, image)
+    added = _sources(store) - before
+    assert first["cache_hit"] is False and len(added) == 1
+    source = os.path.join(store.directory, added.pop())
+    mtime = os.stat(source).st_mtime_ns
+
+    # Cache hit: tidak ada file sumber baru dan sumber tidak ditulis ulang
+    second = _predict_raw(client, image)
+    assert second["cache_hit"] is True
+    assert _sources(store) - before == {os.path.basename(source)}
+    assert os.stat(source).st_mtime_ns == mtime
+
+    # Kedua URL per log_id menunjuk ke sumber dan render yang sama
+    first_image = client.get(first["processed_image_url"])
+    second_image = client.get(second["processed_image_url"])
+    assert first_image.status_code == second_image.status_code == 200
+    assert first_image.data == second_image.data
+
+
+def test_processed_url_by_log_id_for_fresh_prediction(client):
+    body = _predict_raw(client, _jpeg_bytes(seed=8))
+    url = f"/predictions/{body['log_id']}/processed"
+    assert body["processed_image_url"] == url
+
+    response = client.get(url, query_string={'max_dim': 32})
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert max(Image.open(io.BytesIO(response.data)).size) <= 32
+    revalidated = client.get(url, query_string={'max_dim': 32},
+                             headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_processed_url_for_unknown_log_id(client):
+    assert client.get('/predictions/not-a-uuid/processed').status_code == 400
+    assert client.get('/predictions/00000000-0000-0000-0000-000000000000/processed').status_code == 404
+
+
+def test_processed_route_rejects_invalid_digest(client):
+    assert client.get('/processed/not-a-digest').status_code == 400
+    assert client.get('/processed/' + '0' * 32).status_code == 404
+
+
+@pytest.fixture
+def batch_pool_limits(app_module, monkeypatch):
+    """/predict/batch lewat process pool (2 worker) dengan batas piksel kecil"""
+    monkeypatch.setattr(app_module, "BATCH_WORKERS", 2)
+    monkeypatch.setattr(app_module, "MAX_IMAGE_PIXELS", 100_000)
+    # Konfigurasi dikirim sebagai argumen ke worker (forkserver tidak meng-import app)
+    app_module._batch_pool = None
+    yield app_module
+    if app_module._batch_pool is not None:
+        app_module._batch_pool.shutdown()
+    app_module._batch_pool = None
+
+
+def test_oversized_image_in_process_pool_batch(batch_pool_limits, client):
+    images = [_jpeg_bytes(seed=1), _jpeg_bytes((300, 400), seed=2), _jpeg_bytes(seed=3)]
+    for _ in range(2):
+        data = {'images': [(io.BytesIO(image), f'{i}.jpg') for i, image in enumerate(images)]}
+        response = client.post('/predict/batch', data=data, content_type='multipart/form-data')
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == ["success", "error", "success"]
+        assert "maximum is 100000" in results[1]["error"]
+    assert not batch_pool_limits._batch_pool._broken
+
+
+def test_process_pool_batch_matches_in_process(batch_pool_limits, monkeypatch):
+    images = [_jpeg_bytes(seed=20 + i) for i in range(4)] + [b'not an image']
+    pooled = batch_pool_limits.extract_features_batch(images)
+    assert batch_pool_limits._batch_pool._mp_context.get_start_method() != 'fork'
+
+    monkeypatch.setattr(batch_pool_limits, "BATCH_WORKERS", 1)
+    local = batch_pool_limits.extract_features_batch(images)
+    assert pooled[:4] == local[:4]
+    assert isinstance(pooled[4], Exception) and isinstance(local[4], Exception)
+
+
+def test_memory_header_is_labelled_as_estimate(client):
+    response = client.post('/predict?include=', data=_jpeg_bytes(seed=7),
+                           content_type='application/octet-stream')
+    assert response.status_code == 200
+    assert int(response.headers['X-Peak-Memory-Estimate']) > 0
+    assert 'X-Peak-Memory' not in response.headers
+
+
+def test_concurrent_predicts_share_a_micro_batch(app_module, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from admission import AdmissionController
+    from micro_batch import MicroBatcher
+
+    # Seperti gunicorn.conf.py default di mesin 1 core: satu slot CPU per worker
+    monkeypatch.setattr(app_module, "admission", AdmissionController(max_workers=1, max_queue=16))
+    batcher = MicroBatcher(max_size=8, max_wait=0.25)
+    monkeypatch.setattr(app_module, "micro_batcher", batcher)
+    images = [_jpeg_bytes(seed=100 + i) for i in range(6)]
+
+    def predict(image):
+        with app_module.app.test_client() as client:
+            return client.post('/predict?include=', data=image,
+                               content_type='application/octet-stream')
+
+    with ThreadPoolExecutor(max_workers=len(images)) as pool:
+        responses = list(pool.map(predict, images))
+
+    assert [response.status_code for response in responses] == [200] * len(images)
+    stats = batcher.stats()
+    assert stats["rows"] == len(images)
+    assert stats["average_batch_size"] > 1
+
+
+def test_chart_is_memoised_and_cache_bounded_by_bytes(app_module, client, monkeypatch):
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache(max_entries=100, max_bytes=200_000, ttl=float('inf'))
+    monkeypatch.setattr(app_module, "chart_cache", cache)
+    image = _jpeg_bytes(seed=30)
+
+    first = client.post('/predict?include=chart', data=image,
+                        content_type='application/octet-stream').get_json()
+    second = client.post('/predict?include=chart', data=image,
+                         content_type='application/octet-stream').get_json()
+    assert first["probability_chart"] == second["probability_chart"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Banyak grafik berbeda: batas jumlah entri tidak tercapai, tapi total byte tetap dijaga
+    classes = app_module.current_model().model.classes_
+    for i in range(12):
+        probabilities = [{"class": cls, "probability": (i + j) / 40} for j, cls in enumerate(classes)]
+        app_module.create_probability_chart(probabilities, classes)
+    stats = cache.stats()
+    assert 0 < stats["bytes"] <= 200_000
+    assert stats["evictions"] > 0 and stats["entries"] < 13
+
+
+def _predict_logged(app_module, client, seeds):
+    """Prediksi beberapa gambar lalu tunggu sampai log-nya tertulis; return response JSON"""
+    results = [_predict_raw(client, _jpeg_bytes(seed=seed)) for seed in seeds]
+    assert app_module.log_writer.flush(timeout=10)
+    return results
+
+
+def test_logs_keyset_pagination_and_min_probability(app_module, client):
+    since = datetime.now().isoformat()
+    results = _predict_logged(app_module, client, range(40, 45))
+    expected = [result["log_id"] for result in reversed(results)]
+
+    # Halaman demi halaman lewat next_cursor: urutan terbaru dulu, tanpa duplikat
+    seen, cursor = [], None
+    while True:
+        args = {'since': since, 'limit': 2, 'fields': 'id,timestamp'}
+        if cursor:
+            args['cursor'] = cursor
+        body = client.get('/logs', query_string=args).get_json()
+        assert body["status"] == "success" and len(body["logs"]) <= 2
+        seen.extend(log["id"] for log in body["logs"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    class_name = results[0]["probabilities"][0]["class"]
+    probability = {result["log_id"]: result["probabilities"][0]["probability"] for result in results}
+    threshold = sorted(probability.values())[2]
+    body = client.get('/logs', query_string={
+        'since': since, 'fields': 'id', 'min_probability': f'{class_name}:{threshold}'}).get_json()
+    assert {log["id"] for log in body["logs"]} == {
+        log_id for log_id, value in probability.items() if value >= threshold}
+
+    assert client.get('/logs', query_string={'cursor': 'bogus'}).status_code == 400
+    assert client.get('/logs', query_string={'min_probability': 'no-value'}).status_code == 400
+
+
+def test_fast_ingest_downscales_before_glcm(app_module, client, monkeypatch):
+    import glcm
+    from ingest import decode_grayscale
+
+    monkeypatch.setattr(app_module, "FAST_INGEST_MAX_DIM", 64)
+    image = _jpeg_bytes((384, 512), seed=50)
+    body = _predict_raw(client, image)
+
+    # Draft JPEG + reduce: sisi terpanjang <= 64 sebelum GLCM dihitung
+    small = decode_grayscale(image, 64)
+    assert max(small.shape) <= 64
+    expected = dict(zip(("contrast", "correlation", "energy", "homogeneity"),
+                        glcm.glcm_features(small)))
+    assert body["glcm_features"] == pytest.approx(expected)
+    full = glcm.glcm_features(decode_grayscale(image))
+    assert body["glcm_features"]["contrast"] != pytest.approx(full[0])
+
+
+def _class_counts(stats):
+    return {row["class"]: row["count"] for row in stats["class_distribution"]}
+
+
+def _series_total(stats):
+    return sum(point["total"] for point in stats["time_series"])
+
+
+def test_stats_rollups_follow_new_predictions(app_module, client):
+    import sqlite3
+
+    since = datetime.now().isoformat()
+    query = {'bucket': 'hour', 'since': since}
+    assert app_module.log_writer.flush(timeout=10)
+    before = client.get('/stats', query_string=query).get_json()
+
+    results = _predict_logged(app_module, client, range(60, 63))
+    after = client.get('/stats', query_string=query).get_json()
+
+    assert after["total_predictions"] == before["total_predictions"] + 3
+    counts_before, counts_after = _class_counts(before), _class_counts(after)
+    for label in {result["prediction_label"] for result in results}:
+        added = sum(result["prediction_label"] == label for result in results)
+        assert counts_after[label] == counts_before.get(label, 0) + added
+    assert _series_total(after) == _series_total(before) + 3
+
+    # Rollup (dipelihara trigger) sama dengan hitungan langsung dari log mentah
+    conn = sqlite3.connect(app_module.DB_PATH)
+    raw = dict(conn.execute(
+        'SELECT prediction_label, COUNT(*) FROM predictions GROUP BY prediction_label').fetchall())
+    conn.close()
+    assert counts_after == raw
+
+    assert client.get('/stats', query_string={'bucket': 'week'}).status_code == 400
+
+
+def test_logs_export_streams_csv_and_ndjson(app_module, client):
+    import csv
+    import json
+
+    from log_query import encode_cursor
+
+    since = datetime.now().isoformat()
+    results = _predict_logged(app_module, client, range(70, 73))
+    expected = [result["log_id"] for result in reversed(results)]
+    query = {'since': since, 'fields': 'id,prediction_label,all_probabilities'}
+
+    response = client.get('/logs/export', query_string=dict(query, format='csv'))
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row["id"] for row in rows] == expected
+    assert json.loads(rows[0]["all_probabilities"]) == {
+        p["class"]: pytest.approx(p["probability"]) for p in results[-1]["probabilities"]}
+
+    response = client.get('/logs/export', query_string=dict(query, format='ndjson'))
+    assert response.status_code == 200 and response.is_streamed
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["id"] for line in lines] == expected
+
+    # Export yang terputus dilanjutkan dari baris terakhir yang diterima
+    cursor = encode_cursor(lines[0]["timestamp"], lines[0]["id"])
+    resumed = client.get('/logs/export', query_string=dict(query, format='ndjson', cursor=cursor))
+    assert [json.loads(line)["id"] for line in resumed.get_data(as_text=True).splitlines()] == expected[1:]
+
+    assert client.get('/logs/export', query_string={'format': 'xml'}).status_code == 400
+
+
+def test_stage_bench_runs_every_stage_and_flags_regressions(app_module):
+    import stage_bench
+
+    result = stage_bench.bench_case(app_module, 0.05, 'RGB', repeat=1)
+    assert "error" not in result
+    assert list(result["stages_ms"]) == list(stage_bench.STAGES)
+    assert all(ms >= 0 for ms in result["stages_ms"].values())
+
+    baseline = {"results": {"RGB_0.05mp": result}}
+    slower = dict(result["stages_ms"], decode=result["stages_ms"]["decode"] * 2 + 10)
+    current = {"results": {"RGB_0.05mp": dict(result, stages_ms=slower)}}
+    regressions = stage_bench.compare(current, baseline, max_slowdown=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("RGB_0.05mp decode:")
+    assert stage_bench.compare(baseline, baseline, max_slowdown=0.25) == []
+
+
+def _metric_value(client, sample):
+    """Nilai satu sample (nama + label persis) dari /metrics; 0 kalau belum ada"""
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    for line in response.get_data(as_text=True).splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == sample:
+            return float(value)
+    return 0.0
+
+
+def test_server_timing_and_metrics_cover_predict_stages(client):
+    glcm_count = 'predict_stage_seconds_count{stage="glcm"}'
+    requests_ok = 'http_request_duration_seconds_count{endpoint="predict",method="POST",status="200"}'
+    before = {sample: _metric_value(client, sample) for sample in (glcm_count, requests_ok)}
+
+    response = client.post('/predict?include=', data=_jpeg_bytes(seed=80),
+                           content_type='application/octet-stream')
+    assert response.status_code == 200
+    timings = dict(item.split(';dur=') for item in response.headers['Server-Timing'].split(', '))
+    assert {'decode', 'grayscale', 'glcm', 'inference', 'db_write', 'total'} <= set(timings)
+    assert all(float(duration) >= 0 for duration in timings.values())
+
+    for sample, value in before.items():
+        assert _metric_value(client, sample) == value + 1
+
+    errors = 'app_errors_total{endpoint="predict",exception="UnidentifiedImageError"}'
+    failed_before = _metric_value(client, errors)
+    response = client.post('/predict', data=b'not an image', content_type='application/octet-stream')
+    assert response.status_code == 500
+    assert _metric_value(client, errors) == failed_before + 1
+
+
+def test_classify_dir_matches_predict_and_resumes(client, tmp_path):
+    import csv
+
+    import classify_dir
+
+    root = tmp_path / "images"
+    (root / "sub").mkdir(parents=True)
+    images = {"a.jpg": _jpeg_bytes(seed=90), "sub/b.jpg": _jpeg_bytes(seed=91),
+              "sub/c.jpg": _jpeg_bytes((80, 60), seed=92)}
+    for name, image in images.items():
+        (root / name).write_bytes(image)
+    (root / "broken.jpg").write_bytes(b'not an image')
+    output = str(tmp_path / "hasil.csv")
+
+    summary = classify_dir.classify_directory(str(root), output, workers=2, chunk_size=2)
+    assert (summary["processed"], summary["errors"], summary["skipped_done"]) == (4, 1, 0)
+
+    with open(output, newline='') as f:
+        rows = {row["path"]: row for row in csv.DictReader(f)}
+    assert rows["broken.jpg"]["error"]
+    for name, image in images.items():
+        expected = _predict_raw(client, image)
+        row = rows[os.path.join(*name.split('/'))]
+        assert row["prediction_label"] == expected["prediction_label"]
+        assert float(row["confidence"]) == pytest.approx(expected["confidence"])
+
+    # Run ulang: yang sudah ada di checkpoint dilewati, hanya gambar baru yang diproses
+    (root / "d.jpg").write_bytes(_jpeg_bytes(seed=93))
+    summary = classify_dir.classify_directory(str(root), output, workers=2, chunk_size=2)
+    assert (summary["processed"], summary["skipped_done"]) == (1, 4)
+    with open(output, newline='') as f:
+        assert sorted(row["path"] for row in csv.DictReader(f)) == sorted([*rows, "d.jpg"])
+
+
+def _texture_jpeg(level, seed):
+    """Gambar dengan tekstur berbeda per level (noise makin kasar), untuk dataset sintetis"""
+    rng = np.random.default_rng(seed)
+    base = np.linspace(60, 190, 64, dtype=np.float32)[None, :, None].repeat(64, axis=0)
+    noise = rng.normal(0, 8 + 25 * level, (64, 64, 1))
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8).repeat(3, axis=2)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def _write_dataset(root, categories, seeds):
+    for level, label in enumerate(categories):
+        (root / label).mkdir(parents=True, exist_ok=True)
+        for seed in seeds:
+            (root / label / f"{seed}.jpg").write_bytes(_texture_jpeg(level, 1000 * level + seed))
+
+
+def test_train_model_caches_features_and_updates_incrementally(tmp_path):
+    import train_model
+    from nb_scorer import load_model
+
+    categories = train_model.CATEGORIES
+    dataset = tmp_path / "dataset"
+    model_path = str(tmp_path / "models" / "model.pkl")
+    cache_path = str(tmp_path / "features.db")
+    _write_dataset(dataset, categories, range(8))
+
+    def run(**kwargs):
+        return train_model.train(str(dataset), model_path, cache_path=cache_path,
+                                 workers=2, **kwargs)
+
+    first = run()
+    assert first["mode"] == "full" and first["saved"]
+    assert first["extraction"]["extracted"] == 32 and first["extraction"]["cache_hits"] == 0
+    assert 0 < first["evaluation"]["test_samples"] < 32
+    model, _ = load_model(model_path)
+    assert [str(c) for c in model.classes_] == sorted(categories)
+
+    # Tanpa perubahan dataset: semua fitur dari cache, model tidak disentuh
+    second = run()
+    assert second["mode"] == "unchanged"
+    assert second["extraction"]["cache_hits"] == 32 and second["extraction"]["extracted"] == 0
+
+    # Sampel baru saja: partial_fit hanya dengan sampel train yang baru
+    _write_dataset(dataset, categories, range(8, 10))
+    third = run()
+    assert third["mode"] == "incremental"
+    assert third["extraction"]["extracted"] == 8
+    assert third["fit_samples"] == third["train_samples"] - first["train_samples"] > 0
+
+    assert run(full=True)["fit_samples"] == third["train_samples"]
+
+
+@pytest.fixture
+def reloadable_model(app_module, monkeypatch, tmp_path):
+    """Salinan model di folder sementara dengan reloader sendiri dan token admin"""
+    import shutil
+
+    from model_reload import ModelReloader
+
+    model_path = str(tmp_path / "model.pkl")
+    shutil.copy(app_module.MODEL_PATH, model_path)
+    reloader = ModelReloader(model_path, on_swap=lambda loaded: app_module.prediction_cache.clear())
+    reloader.load_initial()
+    monkeypatch.setattr(app_module, "model_reloader", reloader)
+    monkeypatch.setattr(app_module, "MODEL_RELOAD_TOKEN", "rahasia")
+    return model_path
+
+
+def _fit_model(classes, n_features=4, seed=0):
+    from sklearn.naive_bayes import GaussianNB
+
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 1, (len(classes) * 10, n_features))
+    return GaussianNB().fit(X, np.repeat(classes, 10))
+
+
+def test_model_hot_reload_swaps_version_without_restart(app_module, client, reloadable_model):
+    import joblib
+
+    reload_url = '/admin/reload-model'
+    token = {'X-Admin-Token': 'rahasia'}
+    assert client.post(reload_url).status_code == 403
+    unchanged = client.post(reload_url, headers=token).get_json()
+    assert unchanged["model_status"] == "unchanged"
+
+    image = _jpeg_bytes(seed=95)
+    old = _predict_raw(client, image)
+    assert _predict_raw(client, image)["cache_hit"] is True
+
+    classes = [str(c) for c in app_module.current_model().model.classes_]
+    joblib.dump(_fit_model(classes), reloadable_model)
+    response = client.post(reload_url, headers=token)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["model_status"] == "reloaded" and body["previous_version"] == old["model_version"]
+
+    # Request berikutnya memakai model baru; cache hasil model lama tidak dipakai
+    new = _predict_raw(client, image)
+    assert new["model_version"] == body["model_version"] != old["model_version"]
+    assert new["cache_hit"] is False
+
+    # Model yang gagal validasi ditolak, model aktif tetap melayani
+    joblib.dump(_fit_model(classes, n_features=3), reloadable_model)
+    response = client.post(reload_url, headers=token)
+    assert response.status_code == 422
+    rejected = response.get_json()
+    assert rejected["status"] == "error" and rejected["model_status"] == "rejected"
+    assert rejected["model_version"] == new["model_version"]
+    assert _predict_raw(client, image)["model_version"] == new["model_version"]
+
+
+def test_admission_control_rejects_with_429_and_expires_with_504(app_module, client, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from admission import AdmissionController
+
+    admission = AdmissionController(max_workers=1, max_queue=1, deadline=10)
+    monkeypatch.setattr(app_module, "admission", admission)
+    started, release = threading.Event(), threading.Event()
+    extract = app_module.extract_features_from_bytes
+
+    def blocking_extract(image_bytes):
+        started.set()
+        release.wait(10)
+        return extract(image_bytes)
+
+    monkeypatch.setattr(app_module, "extract_features_from_bytes", blocking_extract)
+
+    def predict(seed, headers=None):
+        with app_module.app.test_client() as own_client:
+            return own_client.post('/predict?include=', data=_jpeg_bytes(seed=seed),
+                                   content_type='application/octet-stream', headers=headers)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        running = pool.submit(predict, 110)
+        assert started.wait(10)
+
+        # Menunggu di antrian lebih lama dari X-Request-Timeout: 504, slot antrian dilepas
+        expired = predict(111, headers={'X-Request-Timeout': '0.2'})
+        assert expired.status_code == 504 and expired.get_json()["status"] == "error"
+        assert admission.stats()["in_flight"] == 1
+
+        queued = pool.submit(predict, 112)
+        deadline = time.monotonic() + 10
+        while admission.stats()["in_flight"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Worker + antrian penuh: langsung 429 dengan Retry-After
+        rejected = predict(113)
+        assert rejected.status_code == 429
+        assert int(rejected.headers['Retry-After']) >= 1
+        assert rejected.get_json()["retry_after"] == int(rejected.headers['Retry-After'])
+
+        release.set()
+        assert running.result().status_code == queued.result().status_code == 200
+
+    stats = admission.stats()
+    assert (stats["rejected"], stats["expired"], stats["completed"]) == (1, 1, 2)
+    assert client.post('/predict', data=_jpeg_bytes(seed=114), content_type='application/octet-stream',
+                       headers={'X-Request-Timeout': '-1'}).status_code == 400
+
+
+def test_raw_body_upload_matches_multipart_and_base64(app_module, client, monkeypatch):
+    import base64
+
+    from prediction_cache import PredictionCache
+
+    # Tanpa cache supaya setiap cara upload benar-benar decode + GLCM sendiri
+    monkeypatch.setattr(app_module, "prediction_cache", PredictionCache(max_entries=0))
+    image = _jpeg_bytes(seed=120)
+    uploads = {
+        "octet-stream": dict(data=image, content_type='application/octet-stream'),
+        "image/jpeg": dict(data=image, content_type='image/jpeg'),
+        "multipart": dict(data={'image': (io.BytesIO(image), 'daun.jpg')},
+                          content_type='multipart/form-data'),
+        "base64": dict(json={'image_base64': base64.b64encode(image).decode('ascii')}),
+    }
+    keys = ("prediction_label", "confidence", "probabilities", "glcm_features", "model_version")
+    results = {}
+    for name, kwargs in uploads.items():
+        response = client.post('/predict?include=', **kwargs)
+        assert response.status_code == 200, name
+        body = response.get_json()
+        assert body["cache_hit"] is False
+        results[name] = {key: body[key] for key in keys}
+    assert all(result == results["multipart"] for result in results.values())
+
+    empty = client.post('/predict', data=b'', content_type='application/octet-stream')
+    assert empty.status_code == 400
+    assert empty.get_json() == {"error": "Empty request body", "status": "error"}
+
+
+@pytest.fixture
+def live_server(app_module):
+    """App di server HTTP lokal (port acak) untuk client yang memakai requests"""
+    import threading
+
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.port}'
+    server.shutdown()
+    thread.join()
+
+
+def test_load_test_reports_percentiles_against_live_app(live_server):
+    import load_test
+
+    assert load_test.percentile(list(range(1, 101)), 95) == 95
+    assert load_test.percentile([0.5], 99) == 0.5
+    assert load_test.percentile([], 50) is None
+
+    images, weights = load_test.synthetic_corpus([(0.05, 1.0)], variants=2)
+    client = load_test.Client(live_server, images, weights, upload='raw', timeout=30, seed=0)
+    recorder = load_test.Recorder()
+    mix = load_test.parse_weights('predict=2,logs=1,stats=1', allowed=load_test.ENDPOINTS)
+    start = time.perf_counter()
+    load_test.run_closed(client, recorder, mix, users=2, duration=1.0)
+    summary = load_test.summarize(recorder, time.perf_counter() - start, {"mode": "closed"})
+
+    overall = summary["overall"]
+    assert overall["requests"] > 0 and overall["errors"] == 0
+    assert overall["p50_ms"] <= overall["p95_ms"] <= overall["p99_ms"] <= overall["max_ms"]
+    assert set(summary["endpoints"]) <= set(load_test.ENDPOINTS)
+    assert sum(endpoint["requests"] for endpoint in summary["endpoints"].values()) == overall["requests"]
+    # Dua varian gambar: request predict berikutnya kena cache prediksi
+    if summary["endpoints"].get("predict", {}).get("requests", 0) > 2:
+        assert summary["predict_cache_hit_rate"] > 0
+
+
+def _legacy_row(log_id, timestamp, label, probabilities):
+    # Format database sebelum partisi: all_probabilities berisi repr list dict (scalar numpy)
+    probability_repr = '[' + ', '.join(
+        f"{{'class': np.str_('{name}'), 'probability': np.float64({value})}}"
+        for name, value in probabilities.items()) + ']'
+    return (log_id, timestamp, label, label, max(probabilities.values()),
+            1.0, 0.5, 0.1, 0.6, f'{log_id}.jpg', probability_repr)
+
+
+def test_legacy_database_is_migrated_to_partitions_on_startup(app_module, client, monkeypatch, tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE predictions (
+            id TEXT PRIMARY KEY, timestamp TEXT, prediction_class TEXT, prediction_label TEXT,
+            confidence REAL, contrast REAL, correlation REAL, energy REAL, homogeneity REAL,
+            image_name TEXT, all_probabilities TEXT
+        )
+    ''')
+    conn.executemany('INSERT INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+        _legacy_row('a', '2026-09-03T10:00:00', 'sehat', {'sehat': 0.8, 'hama_kutu': 0.2}),
+        _legacy_row('b', '2026-10-01T09:00:00', 'hama_kutu', {'sehat': 0.3, 'hama_kutu': 0.7}),
+        _legacy_row('c', '2026-10-02T08:00:00', 'sehat', {'sehat': 0.6, 'hama_kutu': 0.4}),
+    ])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(app_module, "DB_PATH", db_path)
+    app_module.init_database()
+    # Startup kedua tidak memindahkan / menghitung ulang baris yang sama
+    app_module.init_database()
+
+    stats = client.get('/stats').get_json()
+    assert stats["total_predictions"] == 3
+    assert _class_counts(stats) == {'sehat': 2, 'hama_kutu': 1}
+    assert {'2026-09', '2026-10'} <= set(stats["log_storage"]["partitions"])
+
+    logs = client.get('/logs', query_string={'fields': 'id,model_version'}).get_json()["logs"]
+    assert logs == [{'id': 'c', 'model_version': None}, {'id': 'b', 'model_version': None},
+                    {'id': 'a', 'model_version': None}]
+    probable = client.get('/logs', query_string={'fields': 'id', 'min_probability': 'hama_kutu:0.4'})
+    assert [log["id"] for log in probable.get_json()["logs"]] == ['c', 'b']
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("skimage")
+from skimage.feature import graycomatrix
+
+import glcm
+
+
+def _texture(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return (np.cumsum(rng.integers(-3, 4, shape), axis=1) % glcm.LEVELS).astype(np.uint8)
+
+
+def _assert_parity(img):
+    ours = np.array(glcm.glcm_features(img))
+    ref = np.array(glcm.skimage_glcm_features(img))
+    # atol untuk nilai yang seharusnya nol (mis. correlation ~1e-17 beda tanda)
+    np.testing.assert_allclose(ours, ref, rtol=glcm.PARITY_RTOL, atol=1e-12)
+
+
+@pytest.mark.parametrize("shape", [(480, 640), (37, 53), (64, 3)])
+def test_counts_match_graycomatrix_per_angle(shape):
+    # Distance 1 dan keempat sudut yang dipakai model, tanpa normalisasi
+    img = _texture(shape)
+    ref = graycomatrix(img, distances=[1], angles=glcm.ANGLES, symmetric=True, normed=False)
+    counts = glcm.glcm_counts(img)
+    for a in range(len(glcm.ANGLES)):
+        symmetric = counts[a] + counts[a].T
+        np.testing.assert_array_equal(symmetric, ref[:, :, 0, a])
+
+
+@pytest.mark.parametrize("shape", [(480, 640), (101, 7)])
+def test_features_match_skimage_on_texture_and_noise(shape):
+    rng = np.random.default_rng(1)
+    _assert_parity(_texture(shape))
+    _assert_parity(rng.integers(0, glcm.LEVELS, shape, dtype=np.uint8))
+
+
+@pytest.mark.parametrize("value", [0, 1, 128, 254, 255])
+def test_constant_images(value):
+    _assert_parity(np.full((10, 10), value, np.uint8))
+
+
+def test_uint8_extremes():
+    checker = (np.indices((16, 16)).sum(axis=0) % 2 * 255).astype(np.uint8)
+    stripes = np.tile(np.array([0, 255], np.uint8), (9, 5))
+    _assert_parity(checker)
+    _assert_parity(stripes)
+    _assert_parity(np.array([[0, 255], [255, 0]], np.uint8))
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (1, 2), (1, 9), (9, 1), (2, 2), (2, 1)])
+def test_tiny_and_single_row_images(shape):
+    _assert_parity(_texture(shape, seed=2))
+
+
+def test_rejects_non_uint8_or_non_2d():
+    with pytest.raises(ValueError):
+        glcm.glcm_counts(np.zeros((4, 4), np.float64))
+    with pytest.raises(ValueError):
+        glcm.glcm_counts(np.zeros((4, 4, 3), np.uint8))
+
+
+@pytest.mark.parametrize("workers", [2, 3, 7])
+def test_tiled_counts_identical_to_single_thread(workers):
+    # Lebih besar dari PARALLEL_MIN_PIXELS dan dari satu pita (BAND_PIXELS)
+    img = _texture((1203, 1001), seed=4)
+    assert img.size >= glcm.PARALLEL_MIN_PIXELS and img.size > glcm.BAND_PIXELS
+    single = glcm.glcm_counts(img, workers=1)
+    np.testing.assert_array_equal(glcm.glcm_counts(img, workers=workers), single)
+    assert glcm.glcm_features(img, workers=workers) == glcm.glcm_features(img, workers=1)
+
+
+def test_tiled_counts_identical_with_small_tiles_and_bands(monkeypatch):
+    # Banyak tile dan pita kecil pada gambar kecil: batas tile/pita di mana-mana
+    monkeypatch.setattr(glcm, "PARALLEL_MIN_PIXELS", 1)
+    monkeypatch.setattr(glcm, "BAND_PIXELS", 64)
+    img = _texture((97, 31), seed=5)
+    single = glcm.glcm_counts(img, workers=1)
+    for workers in (2, 5, 96, 200):
+        np.testing.assert_array_equal(glcm.glcm_counts(img, workers=workers), single)
+
+
+def test_growing_pool_shuts_down_previous_pool(monkeypatch):
+    monkeypatch.setattr(glcm, "PARALLEL_MIN_PIXELS", 1)
+    glcm.glcm_counts(_texture((4, 4)), workers=2)
+    old_pool, grown = glcm._pool, glcm._pool_workers + 2
+    # Jumlah tile dibatasi jumlah baris: gambar harus punya cukup baris
+    glcm.glcm_counts(_texture((grown, 4), seed=6), workers=grown)
+    assert glcm._pool is not old_pool
+    assert old_pool._shutdown
@@ -0,0 +1,63 @@
+import io
+import pickle
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ingest import WIDE_MODES, ImageTooLarge, decode_grayscale
+
+
+def _png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _gray_pair(shape=(96, 128), seed=0):
+    """Konten sama: PNG 8 bit (L) dan PNG 16 bit (I;16) dengan 8 bit teratas = nilai L"""
+    rng = np.random.default_rng(seed)
+    gray8 = rng.integers(0, 256, shape, dtype=np.uint8)
+    # Byte bawah acak: tidak boleh mempengaruhi hasil
+    gray16 = (gray8.astype(np.uint16) << 8) | rng.integers(0, 256, shape, dtype=np.uint16)
+    return gray8, _png(Image.fromarray(gray8)), _png(Image.fromarray(gray16))
+
+
+def test_image_too_large_pickles():
+    error = pickle.loads(pickle.dumps(ImageTooLarge(10, 5)))
+    assert isinstance(error, ImageTooLarge)
+    assert (error.pixels, error.max_pixels) == (10, 5)
+    assert str(error) == "Image has 10 pixels, maximum is 5"
+
+
+def test_sixteen_bit_png_is_decoded_as_wide_mode():
+    _, _, png16 = _gray_pair()
+    assert Image.open(io.BytesIO(png16)).mode in WIDE_MODES
+
+
+@pytest.mark.parametrize("max_dim, mode", [(0, 'L'), (128, 'L'), (128, 'RGB')])
+def test_sixteen_bit_takes_high_byte_on_every_path(max_dim, mode):
+    gray8, png8, png16 = _gray_pair()
+    np.testing.assert_array_equal(decode_grayscale(png16, max_dim, mode), gray8)
+    np.testing.assert_array_equal(decode_grayscale(png8, max_dim, mode), gray8)
+
+
+@pytest.mark.parametrize("mode", ['L', 'RGB'])
+def test_fast_ingest_reduces_sixteen_bit_like_eight_bit(mode):
+    # factor > 1: Image.reduce tidak mendukung I;16, harus tetap jalan dan konsisten
+    _, png8, png16 = _gray_pair((400, 300), seed=1)
+    reduced8 = decode_grayscale(png8, 100, mode)
+    reduced16 = decode_grayscale(png16, 100, mode)
+    assert reduced16.shape == reduced8.shape and max(reduced16.shape) <= 100
+    assert np.max(np.abs(reduced16.astype(int) - reduced8.astype(int))) <= 1
+
+
+@pytest.mark.parametrize("image_mode", ['P', '1'])
+def test_fast_ingest_reduces_palette_and_bilevel(image_mode):
+    rng = np.random.default_rng(2)
+    rgb = Image.fromarray(rng.integers(0, 256, (200, 240, 3), dtype=np.uint8))
+    image = rgb.convert(image_mode)
+    full = decode_grayscale(_png(image))
+    reduced = decode_grayscale(_png(image), 60)
+    assert max(reduced.shape) <= 60
+    assert full.dtype == reduced.dtype == np.uint8
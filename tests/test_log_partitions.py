@@ -0,0 +1,148 @@
+import gzip
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import log_partitions as lp
+from stats_rollup import init_rollups, read_totals
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def _row(row_id, timestamp, label="sehat"):
+    values = dict.fromkeys(name for name, _ in lp.PREDICTION_COLUMNS)
+    values.update(id=row_id, timestamp=timestamp, prediction_class=label,
+                  prediction_label=label, confidence=0.9, all_probabilities='{}')
+    return tuple(values[name] for name, _ in lp.PREDICTION_COLUMNS)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "logs.db")
+    # Urutan sama seperti app.init_database
+    lp.init_partitions(conn)
+    init_rollups(conn.cursor())
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _insert_months(conn, months, per_month=2):
+    rows = [_row(f"{month}-{i}", f"{month}-1{i}T10:00:00")
+            for month in months for i in range(per_month)]
+    lp.insert_rows(conn, rows)
+
+
+def _view_count(conn):
+    return conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+
+def test_retention_drops_whole_old_partitions(conn, tmp_path):
+    _insert_months(conn, ['2025-01', '2026-03', '2026-09', '2026-10'])
+    result = lp.maintain(conn, retention_months=6, archive_dir=str(tmp_path / "archive"), now=NOW)
+
+    assert result["dropped"] == ['2026-03', '2025-01']
+    assert lp.list_partitions(conn) == ['2026-10', '2026-09']
+    assert _view_count(conn) == 4
+    assert result["freed_pages"] > 0
+    # Rollup /stats tetap mencakup baris yang sudah dihapus
+    assert read_totals(conn.cursor())[0] == 8
+
+
+def test_archive_moves_partition_to_gzip_database(conn, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    _insert_months(conn, ['2026-05', '2026-10'], per_month=3)
+    result = lp.maintain(conn, archive_after_months=3, archive_dir=archive_dir, now=NOW)
+
+    assert result["archived"] == {'2026-05': 3}
+    assert lp.list_partitions(conn) == ['2026-10']
+    assert lp.list_archives(archive_dir) == ['2026-05']
+
+    restored = tmp_path / "restored.db"
+    with gzip.open(lp.archive_path(archive_dir, '2026-05')) as src, open(restored, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    ids = sqlite3.connect(restored).execute('SELECT id FROM predictions ORDER BY id').fetchall()
+    assert ids == [('2026-05-0',), ('2026-05-1',), ('2026-05-2',)]
+
+
+def test_retention_deletes_expired_archives(conn, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    _insert_months(conn, ['2025-01', '2026-10'])
+    lp.maintain(conn, archive_after_months=1, archive_dir=archive_dir, now=NOW)
+    assert lp.list_archives(archive_dir) == ['2025-01']
+
+    result = lp.maintain(conn, retention_months=12, archive_dir=archive_dir, now=NOW)
+    assert result["deleted_archives"] == ['2025-01']
+    assert lp.list_archives(archive_dir) == []
+
+
+def test_every_partition_expired_keeps_view_usable(conn, tmp_path):
+    # Satu-satunya partisi lebih tua dari cutoff (mis. server lama mati)
+    _insert_months(conn, ['2026-10'])
+    for month in lp.list_partitions(conn):
+        if month != '2026-10':
+            lp.drop_partition(conn, month)
+
+    result = lp.maintain(conn, retention_months=1, archive_dir=str(tmp_path / "archive"),
+                         now=datetime(2027, 6, 1))
+    assert '2026-10' in result["dropped"]
+    assert lp.list_partitions(conn) == ['2027-06']
+    assert _view_count(conn) == 0
+
+    lp.insert_rows(conn, [_row("new", "2027-06-01T08:00:00")])
+    assert _view_count(conn) == 1
+
+
+def test_view_with_zero_partitions(conn):
+    for month in lp.list_partitions(conn):
+        lp.drop_partition(conn, month)
+    assert lp.list_partitions(conn) == []
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(predictions)')]
+    assert columns == [name for name, _ in lp.PREDICTION_COLUMNS]
+    assert _view_count(conn) == 0
+
+
+def test_interrupted_archive_is_recovered(conn, tmp_path):
+    archive_dir = tmp_path / "archive"
+    archive_dir.mkdir()
+    _insert_months(conn, ['2026-02', '2026-10'])
+
+    # Proses mati setelah commit DROP tetapi sebelum gzip: file .db milik pid yang sudah mati
+    dead_pid = 2 ** 22 + 12345
+    tmp_db = archive_dir / f"predictions_2026_02.{dead_pid}.db"
+    conn.execute('ATTACH DATABASE ? AS archive', (str(tmp_db),))
+    assert lp._move_to_archive(conn, 'predictions_2026_02') == 2
+    conn.execute('DETACH DATABASE archive')
+    # Sisa transaksi yang tidak sempat commit: data masih di database utama -> dibuang
+    stale = archive_dir / f"predictions_2026_10.{dead_pid}.db"
+    stale.write_bytes(b'')
+
+    lp.maintain(conn, archive_dir=str(archive_dir), now=NOW)
+    assert lp.list_archives(str(archive_dir)) == ['2026-02']
+    assert not tmp_db.exists() and not stale.exists()
+    assert lp.list_partitions(conn) == ['2026-10']
+
+
+def test_legacy_table_is_migrated_to_monthly_partitions(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    columns = ', '.join(f'{name} {kind}' for name, kind in lp.PREDICTION_COLUMNS)
+    conn.execute(f'CREATE TABLE predictions ({columns})')
+    conn.executemany(f'INSERT INTO predictions VALUES ({", ".join("?" * len(lp.PREDICTION_COLUMNS))})',
+                     [_row("a", "2025-12-01T00:00:00"), _row("b", "2026-01-05T00:00:00"),
+                      _row("c", "2026-01-06T00:00:00"), _row("d", None)])
+    init_rollups(conn.cursor())
+    conn.commit()
+    totals_before = read_totals(conn.cursor())[0]
+
+    assert lp.is_legacy(conn)
+    assert lp.init_partitions(conn) >= 2
+    assert not lp.is_legacy(conn)
+    assert {'2025-12', '2026-01'} <= set(lp.list_partitions(conn))
+    assert sorted(r[0] for r in conn.execute('SELECT id FROM predictions')) == ['a', 'b', 'c', 'd']
+    # Baris lama tidak terhitung dua kali oleh trigger rollup
+    assert read_totals(conn.cursor())[0] == totals_before
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from log_writer import _STOP, PredictionLogWriter
+
+
+def _insert(conn, rows):
+    conn.execute('CREATE TABLE IF NOT EXISTS logs (value INTEGER)')
+    for row in rows:
+        if not isinstance(row, int):
+            raise TypeError(f"bad row {row!r}")
+    conn.executemany('INSERT INTO logs VALUES (?)', [(row,) for row in rows])
+
+
+def test_bad_batch_does_not_kill_writer(tmp_path):
+    db = tmp_path / "logs.db"
+    writer = PredictionLogWriter(str(db), _insert, flush_interval=0.01).start()
+    try:
+        writer.submit(["not-an-int"])
+        assert writer.flush(timeout=5)
+        assert writer.stats()["failed"] == 1
+        assert writer._thread.is_alive()
+
+        writer.submit([1, 2])
+        assert writer.flush(timeout=5)
+        assert writer.stats()["written"] == 2
+    finally:
+        writer.close()
+    assert sqlite3.connect(db).execute('SELECT count(*) FROM logs').fetchone()[0] == 2
+
+
+def test_close_with_full_queue_and_dead_thread_returns(tmp_path):
+    writer = PredictionLogWriter(str(tmp_path / "logs.db"), _insert, max_queue=2,
+                                 flush_interval=0.01).start()
+    # Thread writer berhenti, lalu antrian terisi penuh tanpa ada yang mengosongkan
+    thread = writer._thread
+    writer._queue.put(_STOP)
+    thread.join(5)
+    assert not thread.is_alive()
+    writer.submit([1, 2])
+    assert writer._queue.full()
+
+    started = time.monotonic()
+    writer.close(timeout=1.0)
+    assert time.monotonic() - started < 2.0
+    assert writer._thread is None
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.naive_bayes import GaussianNB
+
+from export_model import PROBA_ATOL, check_parity, parity_inputs
+from nb_scorer import GaussianNBScorer, load_model
+
+CLASSES = np.array(["hama_keong", "hama_kutu", "hama_ulat", "sehat"])
+
+
+def _fit(X, y):
+    estimator = GaussianNB().fit(X, y)
+    return estimator, GaussianNBScorer.from_estimator(estimator)
+
+
+def _synthetic(seed=0, n=200):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 50, (len(CLASSES), 4))
+    X = np.vstack([rng.normal(center, 1 + i, (n, 4)) for i, center in enumerate(centers)])
+    y = np.repeat(CLASSES, n)
+    return X, y
+
+
+def _assert_same(estimator, scorer, X):
+    np.testing.assert_allclose(scorer.predict_proba(X), estimator.predict_proba(X),
+                               rtol=0, atol=PROBA_ATOL)
+    np.testing.assert_array_equal(scorer.predict(X), estimator.predict(X))
+    np.testing.assert_array_equal(np.argmax(scorer.predict_proba(X), axis=1),
+                                  np.argmax(estimator.predict_proba(X), axis=1))
+
+
+def test_fixed_inputs():
+    estimator, scorer = _fit(*_synthetic())
+    X = np.array([
+        [0.0, 0.0, 0.0, 0.0],
+        [10.0, 20.0, 30.0, 40.0],
+        estimator.theta_[0],
+        estimator.theta_[3],
+        (estimator.theta_[1] + estimator.theta_[2]) / 2,
+    ])
+    _assert_same(estimator, scorer, X)
+    np.testing.assert_array_equal(scorer.classes_, estimator.classes_)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_inputs(seed):
+    estimator, scorer = _fit(*_synthetic(seed))
+    _assert_same(estimator, scorer, parity_inputs(estimator, n_per_class=200, seed=seed))
+    assert check_parity(estimator, scorer, parity_inputs(estimator, seed=seed)) == []
+
+
+def test_zero_variance_feature():
+    # Fitur konstan dalam satu kelas: var_ hanya berisi epsilon var_smoothing
+    X, y = _synthetic()
+    X[y == "sehat", 2] = 7.0
+    estimator, scorer = _fit(X, y)
+    assert estimator.var_[list(estimator.classes_).index("sehat"), 2] < 1e-6
+
+    rng = np.random.default_rng(3)
+    probes = np.vstack([X[::17], X[y == "sehat"][:5],
+                        rng.normal(7.0, 1e-4, (5, 4))])
+    _assert_same(estimator, scorer, probes)
+
+
+@pytest.mark.parametrize("value", [1e6, -1e6, 1e150, -1e150])
+def test_extreme_values(value):
+    estimator, scorer = _fit(*_synthetic())
+    X = np.full((3, 4), value)
+    X[1, 0] = 0.0
+    X[2] = estimator.theta_[1]
+    X[2, 3] = value
+    proba = scorer.predict_proba(X)
+    assert np.all(np.isfinite(proba))
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, atol=1e-12)
+    _assert_same(estimator, scorer, X)
+
+
+def test_single_row_matches_batch():
+    estimator, scorer = _fit(*_synthetic())
+    X = parity_inputs(estimator, n_per_class=10)
+    batch = scorer.predict_proba(X)
+    for i in range(0, len(X), 7):
+        np.testing.assert_array_equal(scorer.predict_proba(X[i])[0], batch[i])
+
+
+def test_rejects_wrong_feature_count():
+    _, scorer = _fit(*_synthetic())
+    with pytest.raises(ValueError):
+        scorer.predict_proba(np.zeros((2, 3)))
+
+
+def test_npz_round_trip(tmp_path):
+    estimator, scorer = _fit(*_synthetic())
+    path = tmp_path / "model.npz"
+    scorer.save(path)
+    _assert_same(estimator, GaussianNBScorer.load(path), parity_inputs(estimator, 100))
+
+
+def test_shipped_model_matches_sklearn():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = os.path.join(root, "models", "naive_bayes_glcm.pkl")
+    if not os.path.exists(model_path):
+        pytest.skip("model belum dilatih")
+    estimator, _ = load_model(model_path, use_fast=False)
+    scorer, warning = load_model(model_path, use_fast=True)
+    assert warning is None and isinstance(scorer, GaussianNBScorer)
+    _assert_same(estimator, scorer, parity_inputs(estimator))
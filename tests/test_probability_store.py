@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+import pytest
+
+from probability_store import (SCHEMA_VERSION_JSON_PROBABILITIES, class_probability_means,
+                               count_min_probability, ensure_json_probabilities)
+
+# Persis seperti yang tersimpan di prediction_logs.db lama (str() dari list of dict numpy)
+LEGACY_NUMPY = ("[{'class': np.str_('hama_keong'), 'probability': 0.2600987552134412}, "
+                "{'class': np.str_('hama_kutu'), 'probability': 0.015323479994050477}, "
+                "{'class': np.str_('hama_ulat'), 'probability': 0.12831586762481167}, "
+                "{'class': np.str_('sehat'), 'probability': 0.5962618971676968}]")
+LEGACY_NUMPY_FLOATS = ("[{'class': np.str_('sehat'), 'probability': np.float64(0.75)}, "
+                       "{'class': 'hama_ulat', 'probability': np.float64(0.25)}]")
+LEGACY_PLAIN = "[{'class': 'sehat', 'probability': 0.9}, {'class': 'hama_kutu', 'probability': 0.1}]"
+UNREADABLE = "[{'class': os.system('true'), 'probability': 1.0}]"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE predictions (id TEXT PRIMARY KEY, all_probabilities TEXT)')
+    yield conn
+    conn.close()
+
+
+def _stored(conn, row_id):
+    return conn.execute('SELECT all_probabilities FROM predictions WHERE id = ?',
+                        (row_id,)).fetchone()[0]
+
+
+def _version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def test_migrates_real_legacy_numpy_repr(conn):
+    conn.executemany('INSERT INTO predictions VALUES (?, ?)',
+                     [('a', LEGACY_NUMPY), ('b', LEGACY_NUMPY_FLOATS), ('c', LEGACY_PLAIN)])
+
+    assert ensure_json_probabilities(conn) == (3, 0)
+    assert json.loads(_stored(conn, 'a')) == {
+        "hama_keong": 0.2600987552134412, "hama_kutu": 0.015323479994050477,
+        "hama_ulat": 0.12831586762481167, "sehat": 0.5962618971676968}
+    assert json.loads(_stored(conn, 'b')) == {"sehat": 0.75, "hama_ulat": 0.25}
+    assert json.loads(_stored(conn, 'c')) == {"sehat": 0.9, "hama_kutu": 0.1}
+    assert _version(conn) == SCHEMA_VERSION_JSON_PROBABILITIES
+    assert count_min_probability(conn, 'sehat', 0.5) == 3
+
+
+def test_unreadable_rows_are_left_untouched(conn):
+    conn.executemany('INSERT INTO predictions VALUES (?, ?)',
+                     [('a', LEGACY_NUMPY), ('bad', UNREADABLE)])
+
+    assert ensure_json_probabilities(conn) == (1, 1)
+    assert _stored(conn, 'bad') == UNREADABLE
+    # Belum tuntas: versi tidak dinaikkan supaya dicoba lagi nanti
+    assert _version(conn) == 0
+
+    # Query JSON melewati baris yang tidak valid tanpa error
+    assert count_min_probability(conn, 'sehat', 0.5) == 1
+    assert class_probability_means(conn, ['sehat'])['sehat'] == pytest.approx(0.5962618971676968)
+
+    # Migrasi ulang tidak mengubah baris yang sudah JSON dan tetap tidak menimpa yang rusak
+    assert ensure_json_probabilities(conn) == (0, 1)
+    assert _stored(conn, 'bad') == UNREADABLE
@@ -0,0 +1,353 @@
+"""
+Training ulang GaussianNB dari folder dataset (pengganti notebook Colab).
+
+Struktur dataset sama seperti di notebook: satu subfolder per kelas
+    dataset/sehat/*.jpg, dataset/hama_keong/*.jpg, ...
+
+- Fitur GLCM diekstrak paralel dengan jalur yang sama seperti /predict, lalu
+  di-cache di SQLite dengan key hash isi file; run berikutnya hanya
+  memproses gambar baru / yang berubah.
+- Pembagian train/test ditentukan dari hash file (stabil antar run), jadi
+  gambar yang sudah masuk test set tidak pernah ikut training.
+- Kalau sejak training terakhir hanya ada sampel baru (tidak ada yang
+  dihapus / pindah kelas), model lama cukup di-update dengan partial_fit;
+  selain itu model di-fit ulang dari awal.
+- Model (.pkl), parameter scorer (.npz), smoke set untuk validasi hot
+  reload (.smoke.npz, dari test set), manifest dan laporan evaluasi
+  ditulis secara atomik (file sementara + rename).
+
+Contoh:
+    python train_model.py dataset/
+    python train_model.py dataset/ --full             # paksa fit ulang
+    python train_model.py dataset/ --min-accuracy 0.8 # jangan simpan kalau akurasi turun
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.naive_bayes import GaussianNB
+
+from classify_dir import FEATURE_NAMES, extract_features_from_path
+from export_model import check_parity, parity_inputs
+from model_reload import smoke_set_path
+from nb_scorer import GaussianNBScorer, file_sha256
+
+CATEGORIES = ["sehat", "hama_keong", "hama_kutu", "hama_ulat"]
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Naikkan kalau preprocessing / ekstraksi fitur berubah (cache lama diabaikan)
+FEATURE_VERSION = 2
+
+TEST_FRACTION = 0.2
+
+
+# ====================================
+# Dataset + cache fitur
+# ====================================
+def list_dataset(root, categories):
+    """Return list (path, label) untuk semua gambar di subfolder kelas"""
+    samples = []
+    for label in categories:
+        folder = os.path.join(root, label)
+        if not os.path.isdir(folder):
+            print(f"⚠️  Folder {folder} tidak ditemukan!", file=sys.stderr)
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(folder, filename), label))
+    return samples
+
+
+class FeatureCache:
+    """Fitur GLCM per hash isi file (sha256 + versi ekstraksi)"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS glcm_features (
+                sha256 TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                contrast REAL, correlation REAL, energy REAL, homogeneity REAL,
+                PRIMARY KEY (sha256, version)
+            )
+        ''')
+
+    def get_many(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self.conn.execute(f'''
+                SELECT sha256, contrast, correlation, energy, homogeneity
+                FROM glcm_features
+                WHERE version = ? AND sha256 IN ({', '.join('?' * len(chunk))})
+            ''', [FEATURE_VERSION] + chunk).fetchall()
+            found.update((row[0], list(row[1:])) for row in rows)
+        return found
+
+    def put_many(self, items):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO glcm_features VALUES (?, ?, ?, ?, ?, ?)',
+                [(sha, FEATURE_VERSION, *features) for sha, features in items])
+
+    def close(self):
+        self.conn.close()
+
+
+def load_features(samples, cache, workers=None):
+    """
+    Hitung / ambil dari cache fitur semua sampel.
+    Return (hashes, X, statistik) untuk sampel yang berhasil; yang gagal dilewati.
+    """
+    start = time.perf_counter()
+    hashes = [file_sha256(path) for path, _ in samples]
+    cached = cache.get_many(set(hashes))
+
+    # Satu kali ekstraksi per isi file, meskipun ada file duplikat
+    missing = {}
+    for (path, _), sha in zip(samples, hashes):
+        if sha not in cached and sha not in missing:
+            missing[sha] = path
+
+    extracted = {}
+    failed = {}
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {sha: pool.submit(extract_features_from_path, path)
+                       for sha, path in missing.items()}
+            for sha, future in futures.items():
+                try:
+                    extracted[sha] = [float(v) for v in future.result()]
+                except Exception as e:
+                    failed[sha] = f"{missing[sha]}: {type(e).__name__}: {e}"
+        cache.put_many(extracted.items())
+
+    features = {**cached, **extracted}
+    for message in failed.values():
+        print(f"⚠️  Gagal diekstrak, dilewati: {message}", file=sys.stderr)
+
+    stats = {
+        "images": len(samples),
+        "cache_hits": sum(1 for sha in hashes if sha in cached),
+        "extracted": len(extracted),
+        "failed": len(failed),
+        "seconds": time.perf_counter() - start,
+    }
+    return hashes, features, stats
+
+
+def is_test_sample(sha, test_fraction=TEST_FRACTION):
+    """Pembagian train/test dari hash file: stabil antar run dan antar mesin"""
+    return int(sha[:8], 16) / 0xFFFFFFFF < test_fraction
+
+
+# ====================================
+# Training
+# ====================================
+def manifest_path(model_path):
+    return os.path.splitext(model_path)[0] + '.manifest.json'
+
+
+def report_path(model_path):
+    return os.path.splitext(model_path)[0] + '.report.json'
+
+
+def read_manifest(model_path):
+    path = manifest_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    # Manifest hanya berlaku untuk file model yang ditulis bersamanya
+    if manifest.get("model_sha256") != file_sha256(model_path):
+        return None
+    return manifest
+
+
+def plan_training(train_samples, manifest, full=False):
+    """
+    Tentukan mode training. Return (mode, sampel yang dipakai fit/partial_fit).
+    train_samples: dict sha -> label untuk train set sekarang.
+    """
+    if full or manifest is None:
+        return "full", train_samples
+
+    previous = manifest["train"]
+    changed = [sha for sha, label in previous.items() if train_samples.get(sha) != label]
+    new_labels = set(train_samples.values()) - set(manifest["classes"])
+    if changed or new_labels or manifest.get("feature_version") != FEATURE_VERSION:
+        return "full", train_samples
+
+    new = {sha: label for sha, label in train_samples.items() if sha not in previous}
+    return ("incremental" if new else "unchanged"), new
+
+
+def evaluate(model, X_test, y_test):
+    if not len(X_test):
+        return {"test_samples": 0}
+    y_pred = model.predict(X_test)
+    labels = [str(c) for c in model.classes_]
+    return {
+        "test_samples": len(y_test),
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "labels": labels,
+        "confusion_matrix": confusion_matrix(y_test, y_pred, labels=labels).tolist(),
+        "classification_report": classification_report(
+            y_test, y_pred, labels=labels, output_dict=True, zero_division=0),
+        "classification_report_text": classification_report(
+            y_test, y_pred, labels=labels, zero_division=0),
+    }
+
+
+def atomic_write(path, write):
+    """Panggil write(path_sementara) lalu rename ke path (atomik di filesystem yang sama)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+    atomic_write(path, write)
+
+
+def save_model(model, model_path):
+    """Tulis .pkl lalu .npz (scorer NumPy) yang sudah dicek kesamaannya dengan sklearn"""
+    atomic_write(model_path, lambda tmp_path: joblib.dump(model, tmp_path))
+
+    scorer = GaussianNBScorer.from_estimator(model, file_sha256(model_path))
+    errors = check_parity(model, scorer, parity_inputs(model))
+    if errors:
+        # Tanpa .npz yang cocok, app.py otomatis memakai GaussianNB sklearn
+        print(f"⚠️  Scorer NumPy tidak diekspor: {'; '.join(errors)}", file=sys.stderr)
+        return
+    npz_path = os.path.splitext(model_path)[0] + '.npz'
+    atomic_write(npz_path, scorer.save)
+
+
+def train(root, model_path, categories=CATEGORIES, cache_path='feature_cache.db',
+          workers=None, full=False, min_accuracy=None):
+    samples = list_dataset(root, categories)
+    if not samples:
+        raise SystemExit("❌ Tidak ada gambar di dataset")
+
+    cache = FeatureCache(cache_path)
+    try:
+        hashes, features, extract_stats = load_features(samples, cache, workers)
+    finally:
+        cache.close()
+    print(f"🔍 {extract_stats['images']} gambar: {extract_stats['cache_hits']} dari cache, "
+          f"{extract_stats['extracted']} diekstrak, {extract_stats['failed']} gagal "
+          f"({extract_stats['seconds']:.1f} s)", file=sys.stderr)
+
+    train_samples, test_samples = {}, {}
+    for (_, label), sha in zip(samples, hashes):
+        if sha in features:
+            (test_samples if is_test_sample(sha) else train_samples)[sha] = label
+
+    manifest = read_manifest(model_path)
+    mode, fit_samples = plan_training(train_samples, manifest, full)
+
+    if mode == "unchanged":
+        print("✅ Tidak ada sampel baru, model tidak diubah", file=sys.stderr)
+        return {"mode": mode, "extraction": extract_stats}
+
+    X_fit = np.array([features[sha] for sha in fit_samples])
+    y_fit = np.array(list(fit_samples.values()))
+    if mode == "full":
+        model = GaussianNB()
+        model.fit(X_fit, y_fit)
+    else:
+        model = joblib.load(model_path)
+        model.partial_fit(X_fit, y_fit)
+
+    X_test = np.array([features[sha] for sha in test_samples]).reshape(-1, len(FEATURE_NAMES))
+    y_test = np.array(list(test_samples.values()))
+    evaluation = evaluate(model, X_test, y_test)
+
+    report = {
+        "mode": mode,
+        "trained_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "dataset": os.path.abspath(root),
+        "feature_version": FEATURE_VERSION,
+        "train_samples": len(train_samples),
+        "fit_samples": len(fit_samples),
+        "class_counts": {label: int(np.sum(np.array(list(train_samples.values())) == label))
+                         for label in sorted(set(train_samples.values()))},
+        "extraction": extract_stats,
+        "evaluation": evaluation,
+    }
+
+    if min_accuracy is not None and evaluation.get("accuracy", 0.0) < min_accuracy:
+        print(f"❌ Akurasi {evaluation.get('accuracy', 0.0):.3f} < {min_accuracy}, "
+              f"model tidak disimpan", file=sys.stderr)
+        report["saved"] = False
+        return report
+
+    # Smoke set ditulis sebelum model, supaya server yang me-reload model baru
+    # langsung memvalidasinya dengan test set yang sesuai
+    atomic_write(smoke_set_path(model_path),
+                 lambda tmp_path: np.savez(tmp_path, X=X_test, y=y_test.astype(str)))
+    save_model(model, model_path)
+    report["saved"] = True
+    report["model_sha256"] = file_sha256(model_path)
+    write_json(manifest_path(model_path), {
+        "model_sha256": report["model_sha256"],
+        "feature_version": FEATURE_VERSION,
+        "classes": [str(c) for c in model.classes_],
+        "train": train_samples,
+    })
+    write_json(report_path(model_path), report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training GaussianNB + GLCM dari folder dataset")
+    parser.add_argument('dataset', help='Folder dataset (subfolder per kelas)')
+    parser.add_argument('--model', default='models/naive_bayes_glcm.pkl')
+    parser.add_argument('--categories', default=','.join(CATEGORIES))
+    parser.add_argument('--cache', default='feature_cache.db', help='Database cache fitur GLCM')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--full', action='store_true', help='Fit ulang dari awal')
+    parser.add_argument('--min-accuracy', type=float, default=None,
+                        help='Jangan simpan model kalau akurasi test di bawah nilai ini')
+    args = parser.parse_args()
+
+    categories = [c.strip() for c in args.categories.split(',') if c.strip()]
+    report = train(args.dataset, args.model, categories, args.cache, args.workers,
+                   args.full, args.min_accuracy)
+
+    evaluation = report.get("evaluation")
+    if evaluation and evaluation.get("test_samples"):
+        print(f"\nMode: {report['mode']} ({report['fit_samples']} sampel di-fit, "
+              f"{report['train_samples']} total train)")
+        print("Akurasi:", evaluation["accuracy"])
+        print("\nConfusion Matrix:\n", np.array(evaluation["confusion_matrix"]))
+        print("\nClassification Report:\n", evaluation["classification_report_text"])
+    if report.get("saved"):
+        print(f"✅ Model disimpan ke {args.model}, laporan: {report_path(args.model)}")
+    elif report.get("saved") is False:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,73 @@
+"""
+Export log prediksi dari database secara streaming (NDJSON / CSV).
+
+Baris dibaca per chunk dengan fetchmany, jadi memori tetap kecil
+berapa pun ukuran tabel predictions.
+
+Contoh:
+    python view_db.py                                  # CSV semua log ke layar
+    python view_db.py --format ndjson -o logs.ndjson
+    python view_db.py --label hama_kutu --min-confidence 0.8 --since 2026-01-01
+    python view_db.py --cursor <cursor>                # lanjutkan export yang terputus
+"""
+import argparse
+import os
 import sqlite3
-import pandas as pd
+import sys
+
+from log_query import (EXPORT_FIELDS, EXPORT_FORMATS, QueryError, encode_cursor,
+                       iter_export, iter_log_rows, parse_log_query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export log prediksi (streaming)")
+    parser.add_argument('--db', default=os.environ.get('PREDICTION_DB', 'prediction_logs.db'))
+    parser.add_argument('--format', default='csv', choices=EXPORT_FORMATS)
+    parser.add_argument('-o', '--output', help='File tujuan (default: stdout)')
+    parser.add_argument('--label', help='Satu atau beberapa label, pisahkan dengan koma')
+    parser.add_argument('--min-confidence')
+    parser.add_argument('--max-confidence')
+    parser.add_argument('--min-probability', help='Mis. hama_kutu:0.4 (pisahkan dengan koma)')
+    parser.add_argument('--since', help='Timestamp ISO (inklusif)')
+    parser.add_argument('--until', help='Timestamp ISO (eksklusif)')
+    parser.add_argument('--fields', help=f"Pilihan: {', '.join(EXPORT_FIELDS)}")
+    parser.add_argument('--cursor', help='Lanjutkan setelah baris ini (dari export sebelumnya)')
+    parser.add_argument('--limit')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        query = parse_log_query(vars(args), default_limit=None, max_limit=None,
+                                allowed_fields=EXPORT_FIELDS)
+    except QueryError as e:
+        raise SystemExit(f"❌ {e}")
+
+    conn = sqlite3.connect(args.db)
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+
+    # Lacak baris terakhir yang sudah ditulis supaya bisa dilanjutkan kalau terputus
+    last_row = None
+
+    def tracked_rows():
+        nonlocal last_row
+        for columns, rows in iter_log_rows(conn, query, args.chunk_size):
+            yield columns, rows
+            last_row = rows[-1]
+
+    try:
+        for chunk in iter_export(conn, query, args.format, args.chunk_size,
+                                 chunks=tracked_rows()):
+            out.write(chunk)
+    except (KeyboardInterrupt, BrokenPipeError):
+        if last_row is not None:
+            cursor = encode_cursor(last_row[0], last_row[1])
+            print(f"\n⚠️  Export terputus, lanjutkan dengan: --cursor {cursor}", file=sys.stderr)
+        raise SystemExit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        conn.close()
+
 
-conn = sqlite3.connect('prediction_logs.db')
-df = pd.read_sql_query("SELECT * FROM predictions", conn)
-print(df)
-conn.close()
\ No newline at end of file
+if __name__ == "__main__":
+    main()